@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
 from .forms import CustomUserChangeForm, CustomUserCreationForm
-from .models import CustomUser, OtpCode
+from .models import CustomUser, OtpCode, SmsMessage
 
 
 @admin.register(CustomUser)
@@ -37,4 +37,9 @@ class CustomUserAdmin(UserAdmin):
 
 @admin.register(OtpCode)
 class OtpCodeAdmin(admin.ModelAdmin):
-    list_display = ['code', 'phone', 'created_at']
\ No newline at end of file
+    list_display = ['code', 'phone', 'created_at', 'expires_at', 'attempts']
+
+@admin.register(SmsMessage)
+class SmsMessageAdmin(admin.ModelAdmin):
+    list_display = ['phone', 'status', 'attempts', 'next_attempt_at', 'created_at']
+    list_filter = ['status']
@@ -1,4 +1,5 @@
 from . models import CustomUser
+from .user_cache import get_cached_user
 
 
 class MobileBackend:
@@ -10,7 +11,4 @@ class MobileBackend:
             return None
         
     def get_user(self, user_id):
-        try:
-            return CustomUser.objects.get(pk=user_id)
-        except CustomUser.DoesNotExist:
-            return None
\ No newline at end of file
+        return get_cached_user(user_id)
@@ -2,7 +2,7 @@ from django.contrib.auth.forms import UserChangeForm, UserCreationForm
 from django.forms import ModelForm
 from django import forms
 
-from . models import CustomUser, OtpCode
+from . models import CustomUser
 
 
 class CustomUserCreationForm(UserCreationForm):
@@ -17,10 +17,8 @@ class CustomUserChangeForm(UserChangeForm):
         fields = ['phone']
 
 
-class SendOtpCodeForm(forms.ModelForm):
-    class Meta:
-        model = OtpCode
-        fields = ['phone']
+class SendOtpCodeForm(forms.Form):
+    phone = forms.CharField(max_length=11)
 
     def clean_phone(self):
         phone = self.cleaned_data.get('phone')
@@ -31,7 +29,5 @@ class SendOtpCodeForm(forms.ModelForm):
         return phone
 
 
-class VerifyOtpCodeForm(forms.ModelForm):
-    class Meta:
-        model = OtpCode
-        fields = ['code']
\ No newline at end of file
+class VerifyOtpCodeForm(forms.Form):
+    code = forms.IntegerField(min_value=0)
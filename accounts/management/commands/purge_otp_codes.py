@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from accounts.otp import get_otp_store
+
+
+class Command(BaseCommand):
+    help = 'Delete the expired OTP codes. Meant to run every few minutes.'
+
+    def handle(self, *args, **options):
+        total = get_otp_store().purge()
+        self.stdout.write(self.style.SUCCESS(f'{total} expired OTP code(s) purged.'))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.sms import send_pending_sms
+
+
+class Command(BaseCommand):
+    help = 'Send the messages waiting in the SMS outbox.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument(
+            '--loop', type=int, metavar='SECONDS',
+            help='Keep running, checking for new messages every SECONDS.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            total = send_pending_sms(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'{total} message(s) sent.'))
+            if not options['loop']:
+                return
+            time.sleep(options['loop'])
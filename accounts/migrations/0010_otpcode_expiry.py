@@ -0,0 +1,25 @@
+# Generated by Django 5.1.1 on 2026-10-16 10:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_alter_customuser_phone_alter_otpcode_phone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='otpcode',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='otpcode',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.1 on 2026-10-16 11:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_otpcode_expiry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SmsMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phone', models.CharField(max_length=11)),
+                ('text', models.TextField()),
+                ('status', models.CharField(choices=[('p', 'pending'), ('f', 'failed')], default='p', max_length=1)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status', 'p')), fields=['next_attempt_at', 'id'], name='sms_outbox_due_idx')],
+            },
+        ),
+    ]
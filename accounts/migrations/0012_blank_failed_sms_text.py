@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+def blank_failed_texts(apps, schema_editor):
+    SmsMessage = apps.get_model('accounts', 'SmsMessage')
+    SmsMessage.objects.filter(status='f').exclude(text='').update(text='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_smsmessage'),
+    ]
+
+    operations = [
+        migrations.RunPython(blank_failed_texts, migrations.RunPython.noop),
+    ]
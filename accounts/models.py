@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 
 
 from .managers import CustomUserManager
@@ -19,8 +20,40 @@ class CustomUser(AbstractUser):
 class OtpCode(models.Model):
     phone = models.CharField(max_length=11, unique=True)
     code = models.PositiveIntegerField()
+    attempts = models.PositiveSmallIntegerField(default=0)
     created_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField(db_index=True)
 
     def __str__(self):
         return str(self.code)
     
+
+
+class SmsMessage(models.Model):
+    PENDING = 'p'
+    FAILED = 'f'
+
+    SEND_STATUS = [
+        (PENDING, 'pending'),
+        (FAILED, 'failed'),
+    ]
+
+    phone = models.CharField(max_length=11)
+    text = models.TextField()
+    status = models.CharField(max_length=1, choices=SEND_STATUS, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['next_attempt_at', 'id'],
+                condition=models.Q(status='p'),
+                name='sms_outbox_due_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.phone}: {self.text}'
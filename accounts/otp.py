@@ -0,0 +1,122 @@
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OtpCode
+
+
+def generate_code():
+    return secrets.randbelow(900000) + 100000
+
+
+class OtpStore:
+    """
+    Keeps at most one code per phone. A code expires
+    ``ACCOUNTS_OTP_TTL`` seconds after it was issued, or once
+    ``ACCOUNTS_OTP_MAX_ATTEMPTS`` wrong guesses were made against it.
+    """
+    def __init__(self):
+        self.ttl = settings.ACCOUNTS_OTP_TTL
+        self.max_attempts = settings.ACCOUNTS_OTP_MAX_ATTEMPTS
+
+    def issue(self, phone):
+        """
+        Replace any code the phone had with a new one and return it.
+        """
+        raise NotImplementedError
+
+    def verify(self, phone, code):
+        """
+        Return True and use up the code if it matches the phone's
+        current code, otherwise count a failed attempt.
+        """
+        raise NotImplementedError
+
+    def purge(self):
+        """
+        Delete the expired codes. Returns the number deleted.
+        """
+        return 0
+
+
+class DatabaseOtpStore(OtpStore):
+    """
+    Codes in the OtpCode table, one row per phone that is overwritten
+    on every request. ``purge_otp_codes`` sweeps the expired rows so
+    the table only ever holds the codes in flight.
+    """
+    def issue(self, phone):
+        code = generate_code()
+        OtpCode.objects.update_or_create(
+            phone=phone,
+            defaults={
+                'code': code,
+                'attempts': 0,
+                'expires_at': timezone.now() + timedelta(seconds=self.ttl),
+            },
+        )
+        return code
+
+    def verify(self, phone, code):
+        with transaction.atomic():
+            otp = (
+                OtpCode.objects.filter(phone=phone, expires_at__gt=timezone.now())
+                .select_for_update().first()
+            )
+            if otp is None:
+                return False
+            if secrets.compare_digest(str(otp.code), str(code)):
+                otp.delete()
+                return True
+            otp.attempts += 1
+            if otp.attempts >= self.max_attempts:
+                otp.delete()
+            else:
+                otp.save(update_fields=['attempts'])
+            return False
+
+    def purge(self):
+        deleted, _ = OtpCode.objects.filter(expires_at__lte=timezone.now()).delete()
+        return deleted
+
+
+class CacheOtpStore(OtpStore):
+    """
+    Codes in the cache, which expires them by itself. Every code gets
+    its own attempt counter, so overwriting a code resets the count.
+    Needs a cache shared by all the processes, not the local memory one.
+    """
+    def code_key(self, phone):
+        return f'accounts:otp:{phone}'
+
+    def attempts_key(self, phone, nonce):
+        return f'accounts:otp:{phone}:{nonce}:attempts'
+
+    def issue(self, phone):
+        code = generate_code()
+        cache.set(self.code_key(phone), (code, secrets.token_hex(8)), self.ttl)
+        return code
+
+    def verify(self, phone, code):
+        entry = cache.get(self.code_key(phone))
+        if entry is None:
+            return False
+        expected, nonce = entry
+        attempts_key = self.attempts_key(phone, nonce)
+        cache.add(attempts_key, 0, self.ttl)
+        if cache.incr(attempts_key) > self.max_attempts:
+            cache.delete(self.code_key(phone))
+            return False
+        if secrets.compare_digest(str(expected), str(code)):
+            cache.delete_many([self.code_key(phone), attempts_key])
+            return True
+        return False
+
+
+def get_otp_store():
+    return import_string(settings.ACCOUNTS_OTP_STORE)()
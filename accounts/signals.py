@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import CustomUser
+from .user_cache import invalidate_user
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def user_changed(sender, instance, **kwargs):
+    # Covers password changes and deactivation, which both save the user.
+    # Invalidated on commit, so no request can cache the old row under
+    # the new version in the meantime.
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_user(user_id))
@@ -0,0 +1,122 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import SmsMessage
+
+logger = logging.getLogger(__name__)
+
+
+class SmsError(Exception):
+    """
+    Raised by a gateway when a message could not be sent.
+    """
+
+
+class SmsGateway:
+    """
+    Base class of the SMS gateways. ``send()`` either delivers the
+    message to the provider or raises SmsError.
+    """
+    def send(self, phone, text):
+        raise NotImplementedError
+
+
+class ConsoleGateway(SmsGateway):
+    """
+    Print messages instead of sending them, for local development.
+    """
+    def send(self, phone, text):
+        print(f'SMS to {phone}: {text}')
+
+
+class FakeGateway(SmsGateway):
+    """
+    Keep sent messages in ``sent`` for tests. Sending to a phone
+    in ``failing`` raises SmsError.
+    """
+    sent = []
+    failing = set()
+
+    def send(self, phone, text):
+        if phone in self.failing:
+            raise SmsError(f'{phone} is unreachable')
+        self.sent.append((phone, text))
+
+
+def get_sms_gateway():
+    return import_string(settings.ACCOUNTS_SMS_GATEWAY)()
+
+
+def enqueue_sms(phone, text):
+    """
+    Add a message to the outbox. Call it inside the transaction that
+    makes the message necessary, so both are committed or neither is.
+    """
+    return SmsMessage.objects.create(phone=phone, text=text)
+
+
+def retry_delay(attempts):
+    """
+    Seconds to wait after the given number of failed attempts,
+    doubling every time up to ``ACCOUNTS_SMS_MAX_RETRY_DELAY``.
+    """
+    return min(settings.ACCOUNTS_SMS_RETRY_DELAY * 2 ** (attempts - 1), settings.ACCOUNTS_SMS_MAX_RETRY_DELAY)
+
+
+def send_pending_sms(batch_size=100, gateway=None):
+    """
+    Send every message that is due, a batch at a time. A batch is
+    claimed for ``ACCOUNTS_SMS_LEASE`` seconds, so other workers skip
+    it and a crashed worker's batch is picked up again later. Every
+    message is deleted as soon as it is sent, so a crash never sends
+    it twice. Failed ones are retried with backoff until
+    ``ACCOUNTS_SMS_MAX_ATTEMPTS``, then kept without their text.
+    Returns the number sent.
+    """
+    gateway = gateway or get_sms_gateway()
+    total = 0
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            messages = list(
+                        SmsMessage.objects.filter(status=SmsMessage.PENDING, next_attempt_at__lte=now)
+                        .order_by('next_attempt_at', 'id')
+                        .select_for_update(skip_locked=True)[:batch_size]
+                        )
+            if not messages:
+                return total
+            SmsMessage.objects.filter(pk__in=[message.pk for message in messages]).update(
+                next_attempt_at=now + timedelta(seconds=settings.ACCOUNTS_SMS_LEASE)
+            )
+
+        # The gateway is called outside the transaction, so no locks
+        # are held while waiting on the provider.
+        for message in messages:
+            try:
+                gateway.send(message.phone, message.text)
+            except SmsError as error:
+                record_failure(message, str(error))
+            except Exception as error:
+                # A bad row must not keep the rest of the batch from going out.
+                logger.exception('Could not send SMS %s', message.pk)
+                record_failure(message, repr(error))
+            else:
+                SmsMessage.objects.filter(pk=message.pk).delete()
+                total += 1
+
+
+def record_failure(message, error):
+    message.attempts += 1
+    message.last_error = error
+    if message.attempts >= settings.ACCOUNTS_SMS_MAX_ATTEMPTS:
+        message.status = SmsMessage.FAILED
+        # The text may hold a login code, which must not outlive the message.
+        message.text = ''
+    else:
+        message.next_attempt_at = timezone.now() + timedelta(seconds=retry_delay(message.attempts))
+    message.save(update_fields=['text', 'attempts', 'last_error', 'status', 'next_attempt_at'])
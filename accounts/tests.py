@@ -1,3 +1,242 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .authenticate import MobileBackend
+from .models import CustomUser, OtpCode, SmsMessage
+from .otp import CacheOtpStore, DatabaseOtpStore
+from .sms import FakeGateway, enqueue_sms, retry_delay, send_pending_sms
+from .user_cache import get_user_version
+
+
+class SendOtpCodeViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('accounts:registration')
+
+    @override_settings(ACCOUNTS_OTP_PHONE_RATE=(1, 600))
+    def test_otp_requests_are_rate_limited_per_phone(self):
+        self.client.post(self.url, data={'phone': '09120000000'})
+
+        # A bot without a session cookie costs no queries at all.
+        with self.assertNumQueries(0):
+            response = Client().post(self.url, data={'phone': '09120000000'})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(OtpCode.objects.count(), 1)
+
+        response = self.client.post(self.url, data={'phone': '09120000001'})
+        self.assertEqual(response.status_code, 302)
+
+    @override_settings(ACCOUNTS_OTP_IP_RATE=(2, 3600))
+    def test_otp_requests_are_rate_limited_per_ip(self):
+        for phone in ('09120000000', '09120000001'):
+            self.client.post(self.url, data={'phone': phone})
+
+        response = self.client.post(self.url, data={'phone': '09120000002'})
+        self.assertEqual(response.status_code, 429)
+
+
+class OtpStoreTestMixin:
+    """
+    Behaviour every OTP store has to share.
+    """
+    store_class = None
+
+    def setUp(self):
+        cache.clear()
+        self.store = self.store_class()
+
+    def test_code_verifies_once(self):
+        code = self.store.issue('09120000000')
+        self.assertFalse(self.store.verify('09120000001', code))
+        self.assertTrue(self.store.verify('09120000000', code))
+        self.assertFalse(self.store.verify('09120000000', code))
+
+    def test_reissue_replaces_the_code(self):
+        first = self.store.issue('09120000000')
+        second = self.store.issue('09120000000')
+        if first != second:
+            self.assertFalse(self.store.verify('09120000000', first))
+        self.assertTrue(self.store.verify('09120000000', second))
+
+    @override_settings(ACCOUNTS_OTP_MAX_ATTEMPTS=2)
+    def test_code_is_dropped_after_too_many_attempts(self):
+        self.store = self.store_class()
+        code = self.store.issue('09120000000')
+        self.assertFalse(self.store.verify('09120000000', code + 1))
+        self.assertFalse(self.store.verify('09120000000', code + 1))
+        self.assertFalse(self.store.verify('09120000000', code))
+
+    def test_reissue_resets_the_attempts(self):
+        code = self.store.issue('09120000000')
+        for _ in range(self.store.max_attempts - 1):
+            self.store.verify('09120000000', code + 1)
+        code = self.store.issue('09120000000')
+        self.store.verify('09120000000', code + 1)
+        self.assertTrue(self.store.verify('09120000000', code))
+
+
+class DatabaseOtpStoreTest(OtpStoreTestMixin, TestCase):
+    store_class = DatabaseOtpStore
+
+    def test_one_row_per_phone(self):
+        for _ in range(3):
+            self.store.issue('09120000000')
+        self.assertEqual(OtpCode.objects.count(), 1)
+
+    def test_expired_code_fails_and_is_purged(self):
+        code = self.store.issue('09120000000')
+        self.store.issue('09120000001')
+        OtpCode.objects.filter(phone='09120000000').update(expires_at=timezone.now())
+
+        self.assertFalse(self.store.verify('09120000000', code))
+        call_command('purge_otp_codes', stdout=StringIO())
+        self.assertQuerySetEqual(OtpCode.objects.values_list('phone', flat=True), ['09120000001'])
+
+
+class CacheOtpStoreTest(OtpStoreTestMixin, TestCase):
+    store_class = CacheOtpStore
+
+    def test_nothing_is_written_to_the_database(self):
+        with self.assertNumQueries(0):
+            self.store.verify('09120000000', self.store.issue('09120000000'))
+
+
+class VerifyOtpCodeViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_request_twice_then_log_in(self):
+        url = reverse('accounts:registration')
+        for _ in range(2):
+            response = self.client.post(url, data={'phone': '09120000000'})
+            self.assertRedirects(response, reverse('accounts:verify'), fetch_redirect_response=False)
+        code = OtpCode.objects.get(phone='09120000000').code
+
+        response = self.client.post(reverse('accounts:verify'), data={'code': code})
+        self.assertRedirects(response, reverse('products:home'), fetch_redirect_response=False)
+        self.assertEqual(int(self.client.session['_auth_user_id']), CustomUser.objects.get(phone='09120000000').pk)
+        self.assertFalse(OtpCode.objects.exists())
+
+
+@override_settings(ACCOUNTS_SMS_GATEWAY='accounts.sms.FakeGateway')
+class SmsOutboxTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        FakeGateway.sent = []
+        FakeGateway.failing = set()
+
+    def test_otp_request_only_enqueues_the_message(self):
+        self.client.post(reverse('accounts:registration'), data={'phone': '09120000000'})
+        code = OtpCode.objects.get(phone='09120000000').code
+
+        message = SmsMessage.objects.get()
+        self.assertEqual(message.phone, '09120000000')
+        self.assertIn(str(code), message.text)
+        self.assertEqual(FakeGateway.sent, [])
+
+    def test_worker_sends_and_deletes_messages(self):
+        enqueue_sms('09120000000', 'one')
+        enqueue_sms('09120000001', 'two')
+
+        out = StringIO()
+        call_command('send_sms', batch_size=1, stdout=out)
+        self.assertIn('2 message(s) sent.', out.getvalue())
+        self.assertEqual(FakeGateway.sent, [('09120000000', 'one'), ('09120000001', 'two')])
+        self.assertFalse(SmsMessage.objects.exists())
+
+    @override_settings(ACCOUNTS_SMS_RETRY_DELAY=10, ACCOUNTS_SMS_MAX_ATTEMPTS=2)
+    def test_failed_messages_back_off_then_give_up(self):
+        FakeGateway.failing = {'09120000000'}
+        message = enqueue_sms('09120000000', 'one')
+
+        self.assertEqual(send_pending_sms(), 0)
+        message.refresh_from_db()
+        self.assertEqual(message.attempts, 1)
+        self.assertEqual(message.status, SmsMessage.PENDING)
+        self.assertGreater(message.next_attempt_at, timezone.now() + timedelta(seconds=5))
+        self.assertEqual(send_pending_sms(), 0)
+
+        SmsMessage.objects.update(next_attempt_at=timezone.now())
+        send_pending_sms()
+        message.refresh_from_db()
+        self.assertEqual(message.status, SmsMessage.FAILED)
+        self.assertEqual(message.last_error, '09120000000 is unreachable')
+        self.assertEqual(message.text, '')
+
+    def test_each_message_is_deleted_once_sent(self):
+        enqueue_sms('09120000000', 'one')
+        broken = enqueue_sms('09120000001', 'two')
+        enqueue_sms('09120000002', 'three')
+        queued = []
+
+        class BrokenGateway(FakeGateway):
+            def send(self, phone, text):
+                if phone == broken.phone:
+                    queued.extend(SmsMessage.objects.values_list('phone', flat=True))
+                    raise RuntimeError('unexpected')
+                super().send(phone, text)
+
+        with self.assertLogs('accounts.sms', 'ERROR'):
+            self.assertEqual(send_pending_sms(gateway=BrokenGateway()), 2)
+        self.assertNotIn('09120000000', queued)
+        self.assertEqual(FakeGateway.sent, [('09120000000', 'one'), ('09120000002', 'three')])
+        broken.refresh_from_db()
+        self.assertEqual((broken.attempts, broken.status), (1, SmsMessage.PENDING))
+        self.assertEqual(list(SmsMessage.objects.all()), [broken])
+
+    def test_retry_delay_doubles_up_to_the_cap(self):
+        with self.settings(ACCOUNTS_SMS_RETRY_DELAY=5, ACCOUNTS_SMS_MAX_RETRY_DELAY=30):
+            self.assertEqual([retry_delay(attempts) for attempts in range(1, 6)], [5, 10, 20, 30, 30])
+
+
+class MobileBackendTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(phone='09120000000', password='12345')
+        self.backend = MobileBackend()
+
+    def test_warm_user_costs_no_queries(self):
+        self.backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.backend.get_user(self.user.pk), self.user)
+
+    def test_saving_the_user_invalidates_the_entry(self):
+        self.backend.get_user(self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('54321')
+            self.user.save()
+        self.assertTrue(self.backend.get_user(self.user.pk).check_password('54321'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertFalse(self.backend.get_user(self.user.pk).is_active)
+
+    def test_entry_is_invalidated_on_commit(self):
+        version = get_user_version(self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+            self.assertEqual(get_user_version(self.user.pk), version)
+        self.assertGreater(get_user_version(self.user.pk), version)
+
+    def test_deleted_user_is_not_served(self):
+        user_id = self.user.pk
+        self.backend.get_user(user_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertIsNone(self.backend.get_user(user_id))
+
+    def test_authenticated_page_view_skips_the_user_query(self):
+        self.client.force_login(self.user, backend='accounts.authenticate.MobileBackend')
+        url = reverse('accounts:registration')
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            # Only the session is read.
+            self.client.get(url)
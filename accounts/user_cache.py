@@ -0,0 +1,59 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import CustomUser
+
+
+def user_version_key(user_id):
+    return f'accounts:user:{user_id}:version'
+
+
+def user_key(user_id, version):
+    return f'accounts:user:{user_id}:{version}'
+
+
+def _initial_version():
+    # Time based, so a version key that was evicted or expired never
+    # comes back with a number an old entry is still stored under.
+    return time.time_ns() // 1_000_000
+
+
+def get_user_version(user_id):
+    key = user_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = _initial_version()
+        if not cache.add(key, version, settings.ACCOUNTS_USER_CACHE_TIMEOUT):
+            version = cache.get(key, version)
+    return version
+
+
+def invalidate_user(user_id):
+    """
+    Bump the user's version so the cached copy stops being used.
+    """
+    key = user_version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), settings.ACCOUNTS_USER_CACHE_TIMEOUT)
+
+
+def get_cached_user(user_id):
+    """
+    Return the user with the given id, or None, from a short-lived
+    cache entry that is dropped whenever the user is saved or deleted.
+    Changes made with ``QuerySet.update()`` send no signals and show
+    up once the entry times out.
+    """
+    key = user_key(user_id, get_user_version(user_id))
+    user = cache.get(key)
+    if user is None:
+        try:
+            user = CustomUser.objects.get(pk=user_id)
+        except CustomUser.DoesNotExist:
+            return None
+        cache.set(key, user, settings.ACCOUNTS_USER_CACHE_TIMEOUT)
+    return user
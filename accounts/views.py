@@ -1,18 +1,28 @@
-import secrets
+from django.conf import settings
+from django.db import DatabaseError, transaction
 from django.shortcuts import redirect, render
 from django.http import HttpResponse
 from django.contrib import messages
-from django.views.generic import CreateView
+from django.views.generic import FormView
 from django.contrib.auth import authenticate, login, logout
 
+from core.ratelimit import RateLimit, RateLimitMixin, client_ip, post_field
+
 from .forms import SendOtpCodeForm, VerifyOtpCodeForm
-from .models import CustomUser, OtpCode
+from .models import CustomUser
+from .otp import get_otp_store
+from .sms import enqueue_sms
 
-class SendOtpCodeView(CreateView):
-    model = OtpCode
+class SendOtpCodeView(RateLimitMixin, FormView):
     form_class = SendOtpCodeForm
     template_name = 'accounts/registration.html'
 
+    def get_rate_limits(self):
+        return [
+            RateLimit('otp:phone', *settings.ACCOUNTS_OTP_PHONE_RATE, key=post_field('phone')),
+            RateLimit('otp:ip', *settings.ACCOUNTS_OTP_IP_RATE, key=client_ip),
+        ]
+
     def dispatch(self, request, *args, **kwargs):
         if request.user.is_authenticated:
 
@@ -23,30 +33,25 @@ class SendOtpCodeView(CreateView):
     
     def post(self, request, *args, **kwargs):
         form = self.get_form()
-        otp_code = secrets.randbelow(900000) + 100000
 
         if form.is_valid():
             phone = form.cleaned_data['phone']
 
             try:
-                otp = OtpCode.objects.create(phone=phone, code=otp_code)
-                # TODO
-                # send otp function instead of print
-                print(otp)
+                with transaction.atomic():
+                    otp_code = get_otp_store().issue(phone)
+                    enqueue_sms(phone, settings.ACCOUNTS_OTP_MESSAGE.format(code=otp_code))
                 request.session['user_phone'] = {
                     'phone_number': phone
                 }
                 messages.success(request, 'OTP code has been sent to your phone.')
                 return redirect('accounts:verify')
-            # TODO
-            # replace with sms service problems
-            except Exception:
+            except DatabaseError:
                 messages.error(request, 'A problem occurred while processing your request. Please try again.')
         return render(request, self.template_name, {'form':form})
         
 
-class VerifyOTPCodeView(CreateView):
-    model = OtpCode
+class VerifyOTPCodeView(FormView):
     form_class = VerifyOtpCodeForm
     template_name = 'accounts/verify.html'
 
@@ -65,27 +70,16 @@ class VerifyOTPCodeView(CreateView):
         if form.is_valid():
             input_code = form.cleaned_data['code']
 
-            try:
-                otp_instance = OtpCode.objects.get(phone=phone)
-            except OtpCode.DoesNotExist:
-                messages.error(request, 'invalid code')
+            if not get_otp_store().verify(phone, input_code):
+                messages.error(request, 'Invalide code')
                 return redirect('accounts:verify')
-            
-            if input_code == otp_instance.code:
-                user, created = CustomUser.objects.get_or_create(phone=phone)
-                if created:
-                    login(request, user, backend='accounts.authenticate.MobileBackend')
-                    otp_instance.delete()
-                    messages.success(request, 'you register successfully')
-                    return redirect('products:home')
-                else:
-                    login(request, user, backend='accounts.authenticate.MobileBackend')
-                    otp_instance.delete()
-                    messages.success(request, 'you login successfully')
-                    return redirect('products:home')
 
+            user, created = CustomUser.objects.get_or_create(phone=phone)
+            login(request, user, backend='accounts.authenticate.MobileBackend')
+            if created:
+                messages.success(request, 'you register successfully')
             else:
-                messages.error(request, 'Invalide code')
-                return redirect('accounts:verify')
-                
+                messages.success(request, 'you login successfully')
+            return redirect('products:home')
+
         return redirect('products:home')
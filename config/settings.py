@@ -54,6 +54,7 @@ INSTALLED_APPS = [
     # 'debug_toolbar',
 
     # My Apps
+    'core.apps.CoreConfig',
     'accounts.apps.AccountsConfig',
     'products.apps.ProductsConfig',
 ]
@@ -73,6 +74,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -96,7 +98,6 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
-                'products.context_processors.category_context_processor'
             ],
         },
     },
@@ -120,6 +121,17 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Version counters, rate limits and view counts are shared through the
+# default cache, so outside DEBUG it must be shared between processes,
+# e.g. CACHE_URL=redis://redis:6379/0 (system check core.E001).
+
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -157,11 +169,31 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [str(BASE_DIR.joinpath('static'))]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+# Serve STATIC_ROOT from the app when no front proxy does.
+STATIC_SERVE = env.bool('STATIC_SERVE', default=False)
+STATIC_MAX_AGE = 60 * 60
+
+# Storefront assets, preloaded and inlined as critical CSS
+STOREFRONT_STYLESHEETS = ['css/_base.css', 'css/vendor.css', 'css/main.css']
+STOREFRONT_SCRIPTS = ['js/vendor.js', 'js/main.js']
+CRITICAL_CSS_TEMPLATES = ['products/list.html', 'products/detail.html']
+# Rendered into the header of every page by template tags.
+CRITICAL_CSS_SHARED_TEMPLATES = ['products/category_menu.html']
+CRITICAL_CSS_DIR = os.path.join(BASE_DIR, 'critical_css')
 
 # media config
 MEDIA_URL = '/media/'
 MEDIA_ROOT = str(BASE_DIR.joinpath('media'))
 
+STORAGES = {
+    'default': {
+        'BACKEND': 'core.storage.ContentHashStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'core.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -175,3 +207,56 @@ AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',
 ]
 
+ACCOUNTS_USER_CACHE_TIMEOUT = 60
+
+# OTP settings
+ACCOUNTS_OTP_STORE = 'accounts.otp.DatabaseOtpStore'
+ACCOUNTS_OTP_TTL = 60 * 2
+ACCOUNTS_OTP_MAX_ATTEMPTS = 5
+ACCOUNTS_OTP_MESSAGE = 'Your verification code: {code}'
+
+# SMS outbox settings
+ACCOUNTS_SMS_GATEWAY = 'accounts.sms.ConsoleGateway'
+ACCOUNTS_SMS_LEASE = 60
+ACCOUNTS_SMS_MAX_ATTEMPTS = 5
+ACCOUNTS_SMS_RETRY_DELAY = 5
+ACCOUNTS_SMS_MAX_RETRY_DELAY = 60 * 5
+
+# Product listing settings
+PRODUCT_PRICE_FACET_BUCKETS = [0, 100, 500, 1000, 5000]
+PRODUCT_FACET_CACHE_TIMEOUT = 60 * 60
+PRODUCT_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+PRODUCT_PAGE_CACHE_TIMEOUT = 60 * 5
+PRODUCT_PAGE_CACHE_STALE_TIMEOUT = 60 * 60 * 24
+PRODUCT_MENU_COUNTS_TIMEOUT = 60 * 10
+PRODUCT_MENU_COUNTS_STALE_TIMEOUT = 60 * 60 * 24
+PRODUCT_VIEW_FLUSH_THRESHOLD = 20
+PRODUCT_COMMENTS_PER_PAGE = 10
+PRODUCT_MODERATION_PER_PAGE = 100
+PRODUCT_MODERATION_CHUNK_SIZE = 500
+
+# Comment scoring settings
+PRODUCT_COMMENT_SCORERS = [
+    'products.scoring.DuplicateScorer',
+    'products.scoring.LinkDensityScorer',
+    'products.scoring.UserRateScorer',
+    'products.scoring.BannedPhraseScorer',
+]
+PRODUCT_COMMENT_BANNED_PHRASES = []
+PRODUCT_COMMENT_RATE_LIMIT = 10
+PRODUCT_COMMENT_PUBLISH_SCORE = 0.1
+PRODUCT_COMMENT_CANCEL_SCORE = 0.9
+PRODUCT_SEARCH_CONFIG = 'simple'
+
+# Product image settings
+PRODUCT_IMAGE_WIDTHS = [160, 320, 640, 1280]
+PRODUCT_IMAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Names of the product URLs served by their async views under ASGI,
+# e.g. home,product_list,product_list_by_brand,product_details,comment_create
+PRODUCT_ASYNC_VIEWS = env.list('PRODUCT_ASYNC_VIEWS', default=[])
+
+# Rate limits, as (requests, seconds)
+PRODUCT_COMMENT_POST_RATE = (5, 60)
+ACCOUNTS_OTP_PHONE_RATE = (3, 60 * 10)
+ACCOUNTS_OTP_IP_RATE = (20, 60 * 60)
@@ -5,10 +5,13 @@ from django.urls import path, include
 
 from debug_toolbar.toolbar import debug_toolbar_urls
 
+from core.views import csrf_token
+
 urlpatterns = debug_toolbar_urls() + [
     path('admin/', admin.site.urls),
     path('', include('products.urls')),
     path('accounts/', include('accounts.urls')),
+    path('csrf-token/', csrf_token, name='csrf_token'),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+LOCMEM_BACKEND = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    The version counters, page cache, rate limits and view counts are
+    shared between worker processes through the default cache, which
+    a per-process local-memory cache silently breaks.
+    """
+    if settings.DEBUG or settings.CACHES['default']['BACKEND'] != LOCMEM_BACKEND:
+        return []
+    return [
+        Error(
+            'The default cache is a local-memory cache, which is not shared between processes.',
+            hint='Point CACHE_URL at a shared cache, e.g. redis://redis:6379/0.',
+            id='core.E001',
+        )
+    ]
@@ -0,0 +1,237 @@
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.template.loader import get_template
+
+BASE_TEMPLATE = '_base.html'
+# Anything after this comment in a template is left out of its critical CSS.
+BELOW_THE_FOLD = '{# below the fold #}'
+
+template_syntax = re.compile(r'{%.*?%}|{{.*?}}|{#.*?#}', re.DOTALL)
+class_attribute = re.compile(r'\bclass\s*=\s*["\']([^"\']*)["\']', re.IGNORECASE)
+id_attribute = re.compile(r'\bid\s*=\s*["\']([^"\']*)["\']', re.IGNORECASE)
+tag_name = re.compile(r'<([a-zA-Z][a-zA-Z0-9-]*)')
+
+selector_classes = re.compile(r'\.(-?[_a-zA-Z][\w-]*)')
+selector_ids = re.compile(r'#(-?[_a-zA-Z][\w-]*)')
+selector_tags = re.compile(r'(?:^|[\s>+~(])([a-zA-Z][a-zA-Z0-9-]*)')
+negations = re.compile(r':not\([^)]*\)')
+css_url = re.compile(r'url\(\s*(["\']?)([^"\')]+)\1\s*\)')
+
+
+class UsedSelectors:
+    """
+    The classes, ids and tag names that appear in some markup.
+    """
+    def __init__(self):
+        self.classes = set()
+        self.ids = set()
+        self.tags = {'html', 'body'}
+
+    def add_markup(self, markup):
+        # Keep the literal parts of attributes that mix in template code.
+        markup = template_syntax.sub(' ', markup)
+        for value in class_attribute.findall(markup):
+            self.classes.update(value.split())
+        for value in id_attribute.findall(markup):
+            self.ids.update(value.split())
+        self.tags.update(name.lower() for name in tag_name.findall(markup))
+
+    def matches(self, selector):
+        selector = negations.sub('', selector)
+        selector = re.sub(r'\[[^\]]*\]|"[^"]*"|\'[^\']*\'', '', selector)
+        selector = re.sub(r'::?[\w-]+(\([^)]*\))?', '', selector)
+        return (
+            set(selector_classes.findall(selector)) <= self.classes
+            and set(selector_ids.findall(selector)) <= self.ids
+            and {name.lower() for name in selector_tags.findall(selector)} <= self.tags
+        )
+
+
+def above_the_fold(source, start=None, end=None):
+    if start is not None and start in source:
+        source = source.split(start, 1)[1]
+    if end is not None and end in source:
+        source = source.split(end, 1)[0]
+    return source.split(BELOW_THE_FOLD, 1)[0]
+
+
+def used_selectors(template_name):
+    """
+    Collect what the page template, the header of the base template
+    and the shared header templates put above the fold.
+    """
+    used = UsedSelectors()
+    used.add_markup(above_the_fold(get_template(BASE_TEMPLATE).template.source, end='{% block content %}'))
+    for name in settings.CRITICAL_CSS_SHARED_TEMPLATES:
+        used.add_markup(above_the_fold(get_template(name).template.source))
+    used.add_markup(above_the_fold(get_template(template_name).template.source, start='{% block content %}'))
+    return used
+
+
+def parse_css(css):
+    """
+    Split a stylesheet into ``(prelude, body)`` pairs, where body is
+    None for statements such as ``@import`` and the raw text between
+    the braces for blocks. Comments are dropped.
+    """
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+    items = []
+    position = 0
+    length = len(css)
+    while position < length:
+        start = position
+        quote = None
+        while position < length:
+            char = css[position]
+            if quote:
+                if char == '\\':
+                    position += 1
+                elif char == quote:
+                    quote = None
+            elif char in '"\'':
+                quote = char
+            elif char in '{;}':
+                break
+            position += 1
+        prelude = css[start:position].strip()
+        if position >= length:
+            break
+        if css[position] != '{':
+            if prelude:
+                items.append((prelude, None))
+            position += 1
+            continue
+
+        depth = 0
+        body_start = position + 1
+        quote = None
+        while position < length:
+            char = css[position]
+            if quote:
+                if char == '\\':
+                    position += 1
+                elif char == quote:
+                    quote = None
+            elif char in '"\'':
+                quote = char
+            elif char == '{':
+                depth += 1
+            elif char == '}':
+                depth -= 1
+                if depth == 0:
+                    break
+            position += 1
+        items.append((prelude, css[body_start:position].strip()))
+        position += 1
+    return items
+
+
+def split_selectors(prelude):
+    selectors, depth, current = [], 0, ''
+    for char in prelude:
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        if char == ',' and not depth:
+            selectors.append(current.strip())
+            current = ''
+        else:
+            current += char
+    selectors.append(current.strip())
+    return [selector for selector in selectors if selector]
+
+
+def critical_rules(items, used):
+    rules, font_faces = [], []
+    for prelude, body in items:
+        if body is None:
+            continue
+        keyword = prelude.split(None, 1)[0].lower() if prelude.startswith('@') else None
+        if keyword in ('@media', '@supports'):
+            if 'print' in prelude.lower() and 'screen' not in prelude.lower():
+                continue
+            nested, nested_fonts = critical_rules(parse_css(body), used)
+            font_faces.extend(nested_fonts)
+            if nested:
+                rules.append(f'{prelude}{{{"".join(nested)}}}')
+        elif keyword == '@font-face':
+            font_faces.append(f'@font-face{{{body}}}')
+        elif keyword is None:
+            selectors = [selector for selector in split_selectors(prelude) if used.matches(selector)]
+            if selectors:
+                rules.append(f'{",".join(selectors)}{{{body}}}')
+        # Other at-rules, e.g. @keyframes, are not needed for first paint.
+    return rules, font_faces
+
+
+def absolute_urls(css, stylesheet):
+    """
+    Point the stylesheet's relative url()s at the static files, since
+    inlined rules resolve them against the page instead.
+    """
+    directory = posixpath.dirname(stylesheet)
+
+    def replace(match):
+        url = match.group(2).strip()
+        if url.startswith(('/', 'data:', 'http:', 'https:', '#')):
+            return match.group(0)
+        path, _, suffix = url.partition('?')
+        path, _, fragment = path.partition('#')
+        name = posixpath.normpath(posixpath.join(directory, path))
+        url = staticfiles_storage.url(name)
+        if suffix:
+            url += f'?{suffix}'
+        if fragment:
+            url += f'#{fragment}'
+        return f'url("{url}")'
+
+    return css_url.sub(replace, css)
+
+
+def extract_critical_css(template_name):
+    """
+    Return the rules of the storefront stylesheets that the template
+    uses above the fold, in their original order, and the font faces
+    those rules refer to.
+    """
+    used = used_selectors(template_name)
+    output = []
+    for stylesheet in settings.STOREFRONT_STYLESHEETS:
+        with open(finders.find(stylesheet), encoding='utf-8') as file:
+            rules, font_faces = critical_rules(parse_css(file.read()), used)
+        css = ''.join(rules)
+        css = ''.join(
+            face for face in font_faces
+            if any(family.strip('"\' ') in css for family in re.findall(r'font-family\s*:\s*([^;}]+)', face))
+        ) + css
+        output.append(absolute_urls(css, stylesheet))
+    css = re.sub(r'\s+', ' ', ''.join(output))
+    # Never let a stylesheet close the inline <style> element.
+    return css.replace('</', '<\\/')
+
+
+def critical_css_path(template_name):
+    return os.path.join(settings.CRITICAL_CSS_DIR, f'{os.path.splitext(template_name)[0]}.css')
+
+
+_critical_css = {}
+
+
+def get_critical_css(template_name):
+    """
+    Return the built critical CSS of a template, or None if it has
+    none. Read once per process, so rebuilding needs a restart.
+    """
+    if template_name not in _critical_css:
+        try:
+            with open(critical_css_path(template_name), encoding='utf-8') as file:
+                _critical_css[template_name] = file.read()
+        except OSError:
+            _critical_css[template_name] = None
+    return _critical_css[template_name]
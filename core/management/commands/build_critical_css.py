@@ -0,0 +1,20 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.critical_css import critical_css_path, extract_critical_css
+
+
+class Command(BaseCommand):
+    help = 'Extract the above-the-fold CSS of the storefront templates, to be inlined.'
+
+    def handle(self, *args, **options):
+        for template_name in settings.CRITICAL_CSS_TEMPLATES:
+            css = extract_critical_css(template_name)
+            path = critical_css_path(template_name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(css)
+            self.stdout.write(f'{template_name}: {len(css.encode()) // 1024} KB')
+        self.stdout.write(self.style.SUCCESS('Critical CSS built. Restart the app to pick it up.'))
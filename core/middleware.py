@@ -0,0 +1,114 @@
+import mimetypes
+import os
+import re
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+
+def accepted_encodings(header):
+    """
+    Return the content codings an Accept-Encoding header allows.
+    """
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        quality = params.strip().replace(' ', '')
+        if quality.startswith('q='):
+            try:
+                if not float(quality[2:]):
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticFilesMiddleware:
+    """
+    Serve collected static files from STATIC_ROOT when there is no
+    front proxy to do it, enabled with ``STATIC_SERVE``. Clients get the
+    brotli or gzip sibling they accept, and fingerprinted names are
+    cached for a year as immutable.
+    """
+    encodings = (('br', '.br'), ('gzip', '.gz'))
+    hashed_name = re.compile(r'\.[0-9a-f]{12}\.[^/.]+$')
+    immutable_max_age = 60 * 60 * 24 * 365
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.STATIC_SERVE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = urlsplit(settings.STATIC_URL).path
+        # Stay async under ASGI, so async views aren't run in a thread.
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.serve_static(request)
+        if response is not None:
+            return response
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        response = self.serve_static(request)
+        if response is not None:
+            return response
+        return await self.get_response(request)
+
+    def serve_static(self, request):
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefix):
+            return self.serve(request, request.path_info[len(self.prefix):])
+        return None
+
+    def serve(self, request, name):
+        try:
+            path = safe_join(settings.STATIC_ROOT, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path) or path.endswith(tuple(suffix for _, suffix in self.encodings)):
+            return None
+
+        stat = os.stat(path)
+        if not was_modified_since(request.headers.get('If-Modified-Since'), stat.st_mtime):
+            return self.cache_headers(HttpResponseNotModified(), name)
+
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        siblings = [(coding, path + suffix) for coding, suffix in self.encodings if os.path.isfile(path + suffix)]
+        served, encoding = path, None
+        for coding, sibling in siblings:
+            if coding in accepted:
+                served, encoding = sibling, coding
+                break
+
+        content_type, _ = mimetypes.guess_type(path)
+        response = FileResponse(
+                                open(served, 'rb'),
+                                content_type=content_type or 'application/octet-stream',
+                                filename=os.path.basename(path)
+                                )
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if siblings:
+            patch_vary_headers(response, ['Accept-Encoding'])
+        response.headers['Last-Modified'] = http_date(stat.st_mtime)
+        return self.cache_headers(response, name)
+
+    def cache_headers(self, response, name):
+        if self.hashed_name.search(name):
+            response.headers['Cache-Control'] = f'public, max-age={self.immutable_max_age}, immutable'
+        else:
+            response.headers['Cache-Control'] = f'public, max-age={settings.STATIC_MAX_AGE}'
+        return response
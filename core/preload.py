@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.templatetags.static import static
+
+
+class PreloadLinksMixin:
+    """
+    Announce the storefront stylesheets and scripts in a ``Link``
+    header, so the browser starts fetching them before it has parsed
+    the page, and a proxy can turn them into early hints.
+    """
+    def get_preload_links(self):
+        return [
+            *((static(name), 'style') for name in settings.STOREFRONT_STYLESHEETS),
+            *((static(name), 'script') for name in settings.STOREFRONT_SCRIPTS),
+        ]
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self.apreload_dispatch(request, *args, **kwargs)
+        return self.add_preload_links(super().dispatch(request, *args, **kwargs))
+
+    async def apreload_dispatch(self, request, *args, **kwargs):
+        return self.add_preload_links(await super().dispatch(request, *args, **kwargs))
+
+    def add_preload_links(self, response):
+        if response.status_code == 200 and not response.has_header('Link'):
+            response.headers['Link'] = ', '.join(
+                f'<{url}>; rel=preload; as={kind}' for url, kind in self.get_preload_links()
+            )
+        return response
@@ -0,0 +1,162 @@
+import hashlib
+import math
+import time
+
+from django.core.cache import cache
+from django.http import HttpResponse
+
+
+def client_ip(request):
+    # Only REMOTE_ADDR; X-Forwarded-For is whatever the client says
+    # unless a trusted proxy rewrites it.
+    return request.META.get('REMOTE_ADDR')
+
+
+def user_or_ip(request):
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'ip:{client_ip(request)}'
+
+
+def post_field(name):
+    """
+    Key on a raw POST field, e.g. the phone number an OTP is sent to.
+    Requests without the field are not limited by this key.
+    """
+    def key(request):
+        return request.POST.get(name, '').strip() or None
+    return key
+
+
+class RateLimit:
+    """
+    Allow ``limit`` requests per ``period`` seconds for every value the
+    ``key`` callable returns for a request, or None to skip the limit.
+
+    Requests are counted with ``cache.incr`` in fixed windows, and the
+    previous window is weighted by how much of it still overlaps the
+    sliding window ending now. The increments are atomic, so concurrent
+    requests never get more than ``limit`` through between them.
+    Rejected requests are handed back and don't use up the allowance.
+    """
+    def __init__(self, scope, limit, period, key=client_ip):
+        self.scope = scope
+        self.limit = limit
+        self.period = period
+        self.key = key
+
+    def cache_key(self, value, window):
+        digest = hashlib.md5(str(value).encode()).hexdigest()
+        return f'ratelimit:{self.scope}:{digest}:{window}'
+
+    def _incr(self, key):
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # The window is new, or its counter expired.
+            if cache.add(key, 1, self.period * 2):
+                return 1
+            return cache.incr(key)
+
+    async def _aincr(self, key):
+        try:
+            return await cache.aincr(key)
+        except ValueError:
+            if await cache.aadd(key, 1, self.period * 2):
+                return 1
+            return await cache.aincr(key)
+
+    def hit(self, request):
+        """
+        Count the request. Returns None when it is allowed, or the
+        number of seconds to wait before trying again.
+        """
+        value = self.key(request)
+        if value is None:
+            return None
+
+        window, elapsed = divmod(time.time(), self.period)
+        current_key = self.cache_key(value, int(window))
+        count = self._incr(current_key)
+        previous = cache.get(self.cache_key(value, int(window) - 1), 0) if count <= self.limit else 0
+        wait = self._wait(count, previous, elapsed)
+        if wait is not None:
+            try:
+                cache.decr(current_key)
+            except ValueError:
+                pass
+        return wait
+
+    async def ahit(self, request):
+        """
+        Async version of ``hit()``.
+        """
+        value = self.key(request)
+        if value is None:
+            return None
+
+        window, elapsed = divmod(time.time(), self.period)
+        current_key = self.cache_key(value, int(window))
+        count = await self._aincr(current_key)
+        previous = await cache.aget(self.cache_key(value, int(window) - 1), 0) if count <= self.limit else 0
+        wait = self._wait(count, previous, elapsed)
+        if wait is not None:
+            try:
+                await cache.adecr(current_key)
+            except ValueError:
+                pass
+        return wait
+
+    def _wait(self, count, previous, elapsed):
+        """
+        Return None if the request that brought the current window to
+        ``count`` is allowed, or else the seconds to wait once it has
+        been handed back.
+        """
+        remaining = self.period - elapsed
+        # Scaled by the period, so the weights stay exact.
+        if count <= self.limit and previous * remaining + count * self.period <= self.limit * self.period:
+            return None
+
+        count -= 1
+        if count < self.limit:
+            # Wait until enough of the previous window has slid out.
+            wait = remaining - (self.limit - count - 1) * self.period / previous
+        else:
+            # The current window is full, so wait for the next one and
+            # then until enough of this one has slid out of it.
+            wait = remaining + self.period - (self.limit - 1) * self.period / count
+        return max(math.ceil(wait), 1)
+
+
+class RateLimitMixin:
+    """
+    Answer requests over any of the view's rate limits with a 429 and
+    a Retry-After header, before the view does any work.
+    """
+    rate_limits = ()
+    rate_limit_methods = ('POST',)
+
+    def get_rate_limits(self):
+        return self.rate_limits
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self.arate_limit_dispatch(request, *args, **kwargs)
+        if request.method in self.rate_limit_methods:
+            waits = [wait for wait in (limit.hit(request) for limit in self.get_rate_limits()) if wait]
+            if waits:
+                return self.rate_limited(waits)
+        return super().dispatch(request, *args, **kwargs)
+
+    async def arate_limit_dispatch(self, request, *args, **kwargs):
+        if request.method in self.rate_limit_methods:
+            waits = [wait for wait in [await limit.ahit(request) for limit in self.get_rate_limits()] if wait]
+            if waits:
+                return self.rate_limited(waits)
+        return await super().dispatch(request, *args, **kwargs)
+
+    def rate_limited(self, waits):
+        response = HttpResponse('Too many requests, please try again later.', status=429)
+        response.headers['Retry-After'] = str(max(waits))
+        return response
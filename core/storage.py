@@ -0,0 +1,100 @@
+import gzip
+import hashlib
+import logging
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+
+class ContentHashStorage(FileSystemStorage):
+    """
+    Name uploads after the hash of their content, keeping the directory
+    and extension, and skip the write when the same content is already
+    stored. One file can then back several rows, so files must never be
+    deleted along with a row.
+    """
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        name = os.path.join(directory, f'{digest.hexdigest()[:32]}{extension}')
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Fingerprint static files into the manifest as usual, then write a
+    gzip sibling, and a brotli one when the package is installed, next
+    to every hashed text asset so they can be served precompressed.
+    """
+    compressible_extensions = ('.css', '.js', '.map', '.svg', '.json', '.txt', '.xml', '.html', '.eot', '.otf', '.ttf')
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Not collected yet, e.g. in development or in tests.
+            return name
+
+    def url_converter(self, name, hashed_files, template=None):
+        """
+        Leave references to files that don't exist as they are, since
+        the vendored stylesheets point at images that were never
+        shipped. The browser gets the same 404 it got before.
+        """
+        converter = super().url_converter(name, hashed_files, template)
+
+        def convert(matchobj):
+            try:
+                return converter(matchobj)
+            except ValueError as error:
+                logger.warning('Keeping unresolvable reference in %s: %s', name, error)
+                return matchobj['matched']
+
+        return convert
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(self.hashed_files.values())):
+            if name.lower().endswith(self.compressible_extensions):
+                for compressed in self.compress(name):
+                    yield name, compressed, True
+
+    def compress(self, name):
+        """
+        Write the compressed siblings of a stored file that come out
+        smaller than the file itself. Returns their names.
+        """
+        with self.open(name) as file:
+            content = file.read()
+        encoders = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            encoders.append(('.br', lambda data: brotli.compress(data, quality=11)))
+
+        written = []
+        for suffix, encode in encoders:
+            compressed = encode(content)
+            if len(compressed) >= len(content):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            written.append(self._save(name + suffix, ContentFile(compressed)))
+        return written
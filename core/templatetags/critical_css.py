@@ -0,0 +1,22 @@
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.safestring import mark_safe
+
+from ..critical_css import get_critical_css
+
+
+register = template.Library()
+
+
+@register.inclusion_tag('core/stylesheets.html', takes_context=True)
+def stylesheets(context):
+    """
+    Link the storefront stylesheets. Pages with built critical CSS get
+    it inlined and load the full stylesheets without blocking render.
+    """
+    css = context.template.name and get_critical_css(context.template.name)
+    return {
+        'critical_css': mark_safe(css) if css else '',
+        'stylesheets': [static(name) for name in settings.STOREFRONT_STYLESHEETS],
+    }
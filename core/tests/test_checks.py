@@ -0,0 +1,23 @@
+from django.test import SimpleTestCase, override_settings
+
+from ..checks import check_shared_cache
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+REDIS = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://redis:6379/0'}}
+
+
+class SharedCacheCheckTest(SimpleTestCase):
+    """
+    Tests for the system check that requires a shared cache.
+    """
+    @override_settings(DEBUG=False, CACHES=LOCMEM)
+    def test_local_memory_cache_fails_outside_debug(self):
+        self.assertEqual([error.id for error in check_shared_cache(None)], ['core.E001'])
+
+    @override_settings(DEBUG=True, CACHES=LOCMEM)
+    def test_local_memory_cache_is_fine_in_debug(self):
+        self.assertEqual(check_shared_cache(None), [])
+
+    @override_settings(DEBUG=False, CACHES=REDIS)
+    def test_shared_cache_passes(self):
+        self.assertEqual(check_shared_cache(None), [])
@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from .. import critical_css
+from ..critical_css import UsedSelectors, critical_rules, extract_critical_css, parse_css
+
+
+class CriticalCssTest(SimpleTestCase):
+    """
+    Tests for extracting and inlining the above-the-fold CSS.
+    """
+    def setUp(self):
+        self.used = UsedSelectors()
+        self.used.add_markup('<div class="card {% if x %}active{% endif %}" id="top"><a href="#">x</a></div>')
+
+    def test_selectors_match_the_markup(self):
+        self.assertTrue(self.used.matches('.card > a:hover'))
+        self.assertTrue(self.used.matches('#top .card::before'))
+        self.assertTrue(self.used.matches('body .card:not(.hidden)'))
+        self.assertFalse(self.used.matches('.card .title'))
+        self.assertFalse(self.used.matches('table .card'))
+
+    def test_unused_rules_are_dropped(self):
+        css = '''
+            /* comment { } */
+            @import url("other.css");
+            .card, .footer { color: red; }
+            .footer { content: "}"; }
+            @media (min-width: 768px) { .card { margin: 0; } .footer { margin: 1px; } }
+            @media print { .card { display: none; } }
+            @keyframes spin { from { opacity: 0; } }
+        '''
+        rules, _ = critical_rules(parse_css(css), self.used)
+        self.assertEqual(rules, ['.card{color: red;}', '@media (min-width: 768px){.card{margin: 0;}}'])
+
+    def test_extracted_css_for_a_template(self):
+        css = extract_critical_css('products/list.html')
+        self.assertIn('.breadcrumb{', css)
+        self.assertNotIn('.footer', css)
+        # Relative urls point at the static files.
+        self.assertNotIn('url("../', css)
+        self.assertNotIn("url('../", css)
+
+
+class StylesheetsTagTest(SimpleTestCase):
+    template = Template('{% load critical_css %}{% stylesheets %}')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.addCleanup(critical_css._critical_css.clear)
+        critical_css._critical_css.clear()
+
+    def render(self, name):
+        self.template.name = name
+        return self.template.render(Context())
+
+    def test_pages_without_critical_css_block_on_stylesheets(self):
+        with override_settings(CRITICAL_CSS_DIR=self.directory):
+            html = self.render('products/list.html')
+        self.assertInHTML('<link rel="stylesheet" href="/static/css/main.css">', html)
+        self.assertNotIn('<style>', html)
+
+    def test_critical_css_is_inlined(self):
+        os.makedirs(os.path.join(self.directory, 'products'))
+        with open(os.path.join(self.directory, 'products', 'list.css'), 'w') as file:
+            file.write('.card{color:red}')
+        with override_settings(CRITICAL_CSS_DIR=self.directory):
+            html = self.render('products/list.html')
+        self.assertIn('<style>.card{color:red}</style>', html)
+        self.assertIn('<link rel="preload" href="/static/css/main.css" as="style"', html)
+        self.assertInHTML('<noscript><link rel="stylesheet" href="/static/css/main.css"></noscript>', html)
+
+    def test_build_command_writes_the_templates(self):
+        with override_settings(CRITICAL_CSS_DIR=self.directory, CRITICAL_CSS_TEMPLATES=['products/detail.html']):
+            call_command('build_critical_css', stdout=StringIO())
+            html = self.render('products/detail.html')
+        self.assertTrue(os.path.exists(os.path.join(self.directory, 'products', 'detail.css')))
+        self.assertIn('<style>', html)
@@ -0,0 +1,116 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+from django.views import View
+
+from ..ratelimit import RateLimit, RateLimitMixin, client_ip, post_field, user_or_ip
+
+
+class LimitedView(RateLimitMixin, View):
+    rate_limits = [RateLimit('test', 2, 60)]
+
+    def post(self, request):
+        return HttpResponse('ok')
+
+
+class RateLimitTest(SimpleTestCase):
+    """
+    Tests for the cache-backed sliding window rate limiter.
+    """
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def request(self, ip='10.0.0.1', **data):
+        request = self.factory.post('/', data, REMOTE_ADDR=ip)
+        request.user = AnonymousUser()
+        return request
+
+    def test_limit_is_per_key(self):
+        limit = RateLimit('test', 2, 60)
+        self.assertIsNone(limit.hit(self.request()))
+        self.assertIsNone(limit.hit(self.request()))
+        self.assertIsNotNone(limit.hit(self.request()))
+        self.assertIsNone(limit.hit(self.request(ip='10.0.0.2')))
+
+    def test_rejected_requests_are_not_counted(self):
+        limit = RateLimit('test', 2, 60)
+        with mock.patch('core.ratelimit.time.time', return_value=6000.0):
+            for _ in range(2 + 10):
+                limit.hit(self.request())
+        # The next window only carries the two allowed requests over.
+        with mock.patch('core.ratelimit.time.time', return_value=6060.0 + 45):
+            self.assertIsNone(limit.hit(self.request()))
+
+    def test_previous_window_slides_out(self):
+        limit = RateLimit('test', 2, 60)
+        with mock.patch('core.ratelimit.time.time', return_value=6050.0):
+            limit.hit(self.request())
+            limit.hit(self.request())
+        with mock.patch('core.ratelimit.time.time', return_value=6065.0):
+            self.assertEqual(limit.hit(self.request()), 25)
+        with mock.patch('core.ratelimit.time.time', return_value=6090.0):
+            self.assertIsNone(limit.hit(self.request()))
+
+    def test_retry_after_a_full_window_is_allowed(self):
+        limit = RateLimit('test', 3, 60)
+        with mock.patch('core.ratelimit.time.time', return_value=6010.0):
+            for _ in range(3):
+                limit.hit(self.request())
+            wait = limit.hit(self.request())
+        self.assertEqual(wait, 50 + 20)
+        with mock.patch('core.ratelimit.time.time', return_value=6010.0 + wait - 1):
+            self.assertIsNotNone(limit.hit(self.request()))
+        with mock.patch('core.ratelimit.time.time', return_value=6010.0 + wait):
+            self.assertIsNone(limit.hit(self.request()))
+
+    def test_missing_key_is_not_limited(self):
+        limit = RateLimit('test', 1, 60, key=post_field('phone'))
+        for _ in range(3):
+            self.assertIsNone(limit.hit(self.request()))
+        self.assertIsNone(limit.hit(self.request(phone='09120000000')))
+        self.assertIsNotNone(limit.hit(self.request(phone=' 09120000000 ')))
+
+    def test_key_functions(self):
+        request = self.request(ip='10.0.0.9')
+        self.assertEqual(client_ip(request), '10.0.0.9')
+        self.assertEqual(user_or_ip(request), 'ip:10.0.0.9')
+
+    def test_view_answers_429_with_retry_after(self):
+        view = LimitedView.as_view()
+        self.assertEqual(view(self.request()).status_code, 200)
+        self.assertEqual(view(self.request()).status_code, 200)
+        response = view(self.request())
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(1 <= int(response['Retry-After']) <= 120)
+
+    def test_other_methods_are_not_limited(self):
+        view = LimitedView.as_view()
+        for _ in range(3):
+            view(self.request())
+        request = self.factory.get('/', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(view(request).status_code, 405)
+
+    def test_limit_holds_under_concurrent_requests(self):
+        limit = RateLimit('test', 5, 60)
+        threads = 20
+        barrier = threading.Barrier(threads)
+        results = []
+
+        def hit():
+            request = self.request()
+            barrier.wait()
+            results.append(limit.hit(request))
+
+        workers = [threading.Thread(target=hit) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(results.count(None), 5)
+        self.assertEqual(len(results), threads)
@@ -0,0 +1,101 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.test import SimpleTestCase, override_settings
+
+from ..middleware import accepted_encodings
+
+
+class StaticPipelineTest(SimpleTestCase):
+    """
+    Tests for the fingerprinted, precompressed static files and the
+    middleware serving them.
+    """
+    css = 'body { color: red; }\n' * 200
+
+    def setUp(self):
+        source = tempfile.mkdtemp()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source)
+        self.addCleanup(shutil.rmtree, root)
+        os.makedirs(os.path.join(source, 'css'))
+        with open(os.path.join(source, 'css', 'main.css'), 'w') as file:
+            file.write(self.css)
+        with open(os.path.join(source, 'robots.txt'), 'w') as file:
+            file.write('x')
+
+        settings_override = override_settings(
+            STATIC_ROOT=root,
+            STATICFILES_DIRS=[source],
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STATIC_SERVE=True,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.url = static('css/main.css')
+
+    def test_urls_are_fingerprinted(self):
+        self.assertRegex(self.url, r'^/static/css/main\.[0-9a-f]{12}\.css$')
+        self.assertTrue(staticfiles_storage.exists(staticfiles_storage.stored_name('css/main.css') + '.gz'))
+        # Too small to be worth compressing.
+        self.assertFalse(staticfiles_storage.exists(staticfiles_storage.stored_name('robots.txt') + '.gz'))
+
+    def test_uncollected_files_keep_their_name(self):
+        self.assertEqual(static('css/missing.css'), '/static/css/missing.css')
+
+    def test_gzip_is_served_to_clients_that_accept_it(self):
+        response = self.client.get(self.url, headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)).decode(), self.css)
+
+    def test_identity_is_served_otherwise(self):
+        response = self.client.get(self.url, headers={'Accept-Encoding': 'gzip;q=0'})
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(b''.join(response.streaming_content).decode(), self.css)
+
+    async def test_files_are_served_under_asgi(self):
+        response = await self.async_client.get(self.url, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        response.close()
+        self.assertEqual((await self.async_client.get('/static/css/none.css')).status_code, 404)
+
+    def test_unhashed_names_are_cached_briefly(self):
+        response = self.client.get('/static/css/main.css')
+        self.assertEqual(response['Cache-Control'], f'public, max-age={settings.STATIC_MAX_AGE}')
+
+    def test_unknown_files_fall_through(self):
+        self.assertEqual(self.client.get('/static/css/none.css').status_code, 404)
+        self.assertEqual(self.client.get('/static/../manage.py').status_code, 404)
+
+    def test_accepted_encodings(self):
+        self.assertEqual(accepted_encodings('br;q=1.0, gzip;q=0, identity'), {'br', 'identity'})
+
+
+class CollectStaticTest(SimpleTestCase):
+    """
+    Collect the repository's own static files, which reference a few
+    images and source maps that were never shipped.
+    """
+    def test_collects_the_real_assets(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        with override_settings(STATIC_ROOT=root):
+            with self.assertLogs('core.storage', 'WARNING'):
+                call_command('collectstatic', interactive=False, verbosity=0)
+            stored = staticfiles_storage.stored_name('css/vendor.css')
+            with staticfiles_storage.open(stored) as file:
+                css = file.read().decode()
+        self.assertNotEqual(stored, 'css/vendor.css')
+        self.assertIn('images/ui-bg_glass_75_dadada_1x400.png', css)
+        self.assertTrue(os.path.exists(os.path.join(root, stored + '.gz')))
@@ -0,0 +1,31 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+
+from ..storage import ContentHashStorage
+
+
+class ContentHashStorageTest(SimpleTestCase):
+    """
+    Tests for the content-addressed media storage.
+    """
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        self.storage = ContentHashStorage(location=self.location)
+
+    def test_files_are_named_after_their_content(self):
+        name = self.storage.save('photos/Holiday.JPG', ContentFile(b'one'))
+        self.assertRegex(name, r'^photos/[0-9a-f]{32}\.jpg$')
+        self.assertNotEqual(self.storage.save('photos/holiday.jpg', ContentFile(b'two')), name)
+
+    def test_duplicates_are_not_written_again(self):
+        name = self.storage.save('photos/a.jpg', ContentFile(b'same'))
+        with mock.patch('django.core.files.storage.FileSystemStorage._save') as save:
+            self.assertEqual(self.storage.save('photos/b.jpg', ContentFile(b'same')), name)
+        save.assert_not_called()
+        with self.storage.open(name) as file:
+            self.assertEqual(file.read(), b'same')
@@ -0,0 +1,12 @@
+from django.http import JsonResponse
+from django.middleware.csrf import get_token
+from django.views.decorators.cache import never_cache
+
+
+@never_cache
+def csrf_token(request):
+    """
+    Hand the visitor their CSRF token, for the forms on pages served
+    from the shared page cache, which can't carry one.
+    """
+    return JsonResponse({'token': get_token(request)})
@@ -3,7 +3,10 @@ from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib import admin, messages
 from django.db.models import Sum
 from django.utils.html import format_html
-from django.http import HttpResponseRedirect
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponseRedirect
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.urls import path
 from django.template.response import TemplateResponse
 from django.contrib.admin import ModelAdmin, TabularInline
@@ -15,7 +18,11 @@ from . models import (
                     Comment, CategoryType
                     )
 
+from .comments import set_comments_status
 from .forms import ReplyForm
+from .moderation import ModerationQueue, moderate_comments
+from .pagination import InvalidCursor
+from .search import get_search_backend
 
 
 @admin.register(CategoryType)
@@ -44,7 +51,7 @@ class CategoryAdmin(ModelAdmin):
         return obj.parent
 
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('parent__parent__parent')
+        return super().get_queryset(request).select_related('parent', 'category_type')
 
 class VariantInline(TabularInline):
     """
@@ -104,6 +111,15 @@ class ProductAdmin(ModelAdmin):
         qs = super().get_queryset(request)
         return qs.annotate(total_stock=Sum('variants__stock')).prefetch_related('category')
     
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Search with the full-text index instead of
+        ``icontains`` scans over the description.
+        """
+        if not search_term.strip():
+            return queryset, False
+        return get_search_backend().search(queryset, search_term), False
+
     @admin.display(description='Total Stock', ordering='total_stock')
     def total_stock(self, obj):
         """
@@ -142,19 +158,20 @@ class ColorAdmin(ModelAdmin):
 
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
-    list_display = ('user', 'product', 'created_at', 'status', 'reply_button')
+    list_display = ('user', 'product', 'created_at', 'status', 'spam_score', 'reply_button')
     list_filter = ('status', 'created_at')
     search_fields = ('user__username', 'product__name', 'content')
     actions = ['publish_comments', 'cancel_comments']
     list_editable = ['status']
+    show_full_result_count = False
 
     def get_queryset(self, request):
         qs = super().get_queryset(request)
-        return qs.filter(parent__isnull=True).prefetch_related('replies')  # Show all comments, both top-level and replies
+        return qs.filter(parent__isnull=True).select_related('user', 'product')
 
     def reply_button(self, obj):
         # Show "Show Replies" button if the comment has replies
-        if obj.replies.exists():
+        if obj.reply_count:
             return format_html('<a class="button" href="{}">Show Reply</a>', self.get_reply_url(obj))
         # Otherwise, show "Reply" button for the comment
         else:
@@ -162,16 +179,16 @@ class CommentAdmin(admin.ModelAdmin):
 
     def get_reply_url(self, obj):
         # URL to reply or show replies to the comment
-        if obj.replies.exists():
+        if obj.reply_count:
             return f"/admin/{obj._meta.app_label}/{obj._meta.model_name}/{obj.pk}/show_replies/"
         return f"/admin/{obj._meta.app_label}/{obj._meta.model_name}/{obj.pk}/reply/"
 
     def publish_comments(self, request, queryset):
-        update_status = queryset.update(status='p')
+        update_status = set_comments_status(queryset, Comment.PUBLISHED)
         self.message_user(request, f'{update_status} comment(s) changed to published.', messages.SUCCESS)
     
     def cancel_comments(self, request, queryset):
-        update_status = queryset.update(status='c')
+        update_status = set_comments_status(queryset, Comment.CANCELED)
         self.message_user(request, f'{update_status} comment(s) changed to canceled.', messages.SUCCESS)
 
     def get_urls(self):
@@ -184,9 +201,51 @@ class CommentAdmin(admin.ModelAdmin):
             path('<int:comment_id>/reply/', self.reply_view, name='reply'),
             path('reply/<int:reply_id>/update/', self.update_reply, name='update_reply'),
             path('reply/<int:reply_id>/delete/', self.delete_reply, name='delete_reply'),
+            path('moderation/', self.admin_site.admin_view(self.moderation_view), name='comment_moderation'),
         ]
         return custom_urls + urls
 
+    def moderation_view(self, request):
+        """
+        A queue of comments in one status, oldest first, with bulk
+        publish and cancel for the selected rows or the whole queue.
+        """
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        status = request.GET.get('status', Comment.WAITING)
+        if status not in dict(Comment.PUBLISH_STATUS):
+            status = Comment.WAITING
+        queue = ModerationQueue(status)
+
+        if request.method == 'POST':
+            new_status = {'publish': Comment.PUBLISHED, 'cancel': Comment.CANCELED}.get(request.POST.get('action'))
+            until = parse_datetime(request.POST.get('until', ''))
+            if new_status and request.POST.get('scope') == 'all' and until:
+                changed = queue.moderate_all(new_status, until)
+            elif new_status:
+                ids = [pk for pk in request.POST.getlist('ids') if pk.isdigit()]
+                changed = moderate_comments(ids, new_status)
+            else:
+                changed = 0
+            self.message_user(request, f'{changed} comment(s) moderated.', messages.SUCCESS)
+            return HttpResponseRedirect(request.get_full_path())
+
+        try:
+            page = queue.page(request.GET.get('cursor'))
+        except InvalidCursor:
+            raise Http404('Invalid page cursor.')
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Comment moderation',
+            'page': page,
+            'status': status,
+            'statuses': Comment.PUBLISH_STATUS,
+            'estimated_count': queue.estimated_count(),
+            'until': timezone.now().isoformat(),
+        }
+        return TemplateResponse(request, 'admin/comment_moderation.html', context)
+
     def show_replies_view(self, request, comment_id):
         comment = Comment.objects.get(pk=comment_id)
         replies = comment.replies.all()  # Get all replies for the comment
@@ -0,0 +1,175 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.views import redirect_to_login
+from django.http import Http404, HttpResponse
+from django.shortcuts import aget_object_or_404, redirect
+from django.template.loader import render_to_string
+from django.views.generic import View
+
+from core.ratelimit import RateLimit, RateLimitMixin, user_or_ip
+
+from .category_tree import aload_category_context
+from .comments import CommentThread
+from .forms import ReplyForm
+from .images import aload_image_derivatives
+from .listing import arecord_product_view
+from .models import Brand, Category, Product
+from .page_cache import AnonymousPageCacheMixin
+from .pagination import InvalidCursor, KeysetPaginator
+from .versioning import (
+                        CATALOG_VERSION_KEY,
+                        aget_product_versions,
+                        aget_version,
+                        aget_versions,
+                        category_version_key,
+                        product_version_key
+                        )
+from .views import ProductDetailView, ProductListView
+
+
+class AsyncRequestMixin:
+    """
+    Base of the async views, which run on the event loop under ASGI
+    instead of in a thread per request.
+
+    Nothing may touch the database synchronously there, so the user
+    and session are loaded before the view runs, and everything the
+    templates, tags and context processors would query is loaded by
+    the view and the ``context_loaders`` before rendering. Templates
+    still read and write the fragment cache, so they are rendered off
+    the event loop, in the thread that runs the sync parts of the
+    request, where Django closes any connection they open.
+    """
+    context_loaders = [aload_category_context]
+
+    async def dispatch(self, request, *args, **kwargs):
+        request.user = await request.auser()
+        return await super().dispatch(request, *args, **kwargs)
+
+    async def arender_to_response(self, context):
+        for loader in self.context_loaders:
+            await loader(self.request)
+        html = await sync_to_async(render_to_string)(self.template_name, {'view': self, **context}, self.request)
+        return HttpResponse(html)
+
+
+class AsyncHomeView(AsyncRequestMixin, AnonymousPageCacheMixin, View):
+    template_name = 'products/home.html'
+    # The home page doesn't render the category menu.
+    context_loaders = []
+
+    async def get(self, request, *args, **kwargs):
+        return await self.arender_to_response({})
+
+
+class AsyncProductListView(AsyncRequestMixin, ProductListView):
+    """
+    ``ProductListView`` on the async ORM.
+    """
+    async def aget_category(self):
+        if self.category is None:
+            self.category = await aget_object_or_404(Category, slug=self.kwargs['cat_slug'])
+        return self.category
+
+    async def aget_validators(self):
+        await self.aget_category()
+        versions = await aget_versions(self.get_page_cache_version_keys())
+        return ':'.join(str(version) for version in versions.values()), None
+
+    async def aget_queryset(self):
+        category = await self.aget_category() if self.kwargs.get('cat_slug') else None
+        brand_slug = self.kwargs.get('brand_slug')
+        brand = await aget_object_or_404(Brand, slug=brand_slug) if brand_slug else None
+        version = await aget_version(category_version_key(category.pk)) if category else None
+        return self.filter_products(category, brand, version)
+
+    async def get(self, request, *args, **kwargs):
+        paginator = KeysetPaginator(await self.aget_queryset(), self.get_ordering(), self.paginate_by)
+        try:
+            page = await paginator.apage(request.GET.get('cursor'))
+        except InvalidCursor:
+            raise Http404('Invalid page cursor.')
+
+        products = page.object_list
+        versions = await aget_product_versions([product.pk for product in products])
+        for product in products:
+            product.cache_version = versions[product.pk]
+        await aload_image_derivatives([product.cover_image for product in products])
+
+        return await self.arender_to_response({
+            'paginator': paginator,
+            'page_obj': page,
+            'is_paginated': page.has_other_pages(),
+            'object_list': products,
+            'products': products,
+            'category': self.category,
+            'breadcrumbs': await self.category.abreadcrumbs() if self.category else [],
+            'facets': await self.facets.acounts(),
+            **self.get_sort_context(),
+        })
+
+
+class AsyncProductDetailView(AsyncRequestMixin, ProductDetailView):
+    """
+    ``ProductDetailView`` on the async ORM. The variants, attributes
+    and comments are loaded up front, even when their cached fragments
+    would not need them, since the templates can't query them lazily.
+    """
+    async def aget_validators(self):
+        product = await self.get_validators_queryset().afirst()
+        if product is None:
+            return None, None
+        versions = await aget_versions([CATALOG_VERSION_KEY, product_version_key(product['pk'])])
+        return self.build_validators(product, versions)
+
+    async def apage_cache_hit(self, meta):
+        await arecord_product_view(meta['product_id'])
+
+    async def get(self, request, *args, **kwargs):
+        self.object = await aget_object_or_404(Product, slug=self.kwargs['product_slug'])
+        try:
+            comment_thread = CommentThread(self.object, request.GET.get('comments'))
+        except InvalidCursor:
+            raise Http404('Invalid comments cursor.')
+        await comment_thread.aload()
+
+        variants = [variant async for variant in self.object.variants.select_related('color')]
+        await aload_image_derivatives([variant.image for variant in variants])
+        response = await self.arender_to_response({
+            'object': self.object,
+            'product': self.object,
+            'comment_form': ReplyForm(),
+            'comment_thread': comment_thread,
+            'variants': variants,
+            'attribute_values': [value async for value in self.object.attribute_values.select_related('attribute')],
+            'cache_version': await aget_version(product_version_key(self.object.pk)),
+            'fragment_cache_timeout': settings.PRODUCT_FRAGMENT_CACHE_TIMEOUT,
+        })
+        await arecord_product_view(self.object.pk)
+        return response
+
+
+class AsyncCommentCreateView(AsyncRequestMixin, RateLimitMixin, View):
+    """
+    ``CommentCreateView`` on the async ORM. Invalid comments are sent
+    back to the product page with an error message.
+    """
+    def get_rate_limits(self):
+        return [RateLimit('comment', *settings.PRODUCT_COMMENT_POST_RATE, key=user_or_ip)]
+
+    async def post(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        product = await aget_object_or_404(Product, slug=self.kwargs['product_slug'])
+        form = ReplyForm(request.POST)
+        if not form.is_valid():
+            messages.error(request, 'Comment could not be created')
+            return redirect(product)
+
+        comment = form.save(commit=False)
+        comment.user = request.user
+        comment.product = product
+        await comment.asave()
+        messages.success(request, 'Comment successfully created')
+        return redirect(comment)
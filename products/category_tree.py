@@ -0,0 +1,207 @@
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F
+from django.urls import reverse
+from django_cte import CTEQuerySet, With
+
+from .models import Category, Product
+from .versioning import CATALOG_VERSION_KEY, aget_version, get_version
+
+MENU_COUNTS_KEY = 'products:menu:counts'
+MENU_COUNTS_LOCK_KEY = f'{MENU_COUNTS_KEY}:lock'
+MENU_COUNTS_LOCK_TIMEOUT = 30
+MENU_COUNTS_LOCK_WAIT = 2
+MENU_COUNTS_POLL_INTERVAL = 0.05
+
+
+class CategoryNode:
+    """
+    A plain, read-only copy of an active category, with its
+    menu URL computed once when the tree is built.
+    """
+    __slots__ = ('id', 'title', 'slug', 'depth', 'url', 'parent', 'children')
+
+    def __init__(self, category):
+        self.id = category.id
+        self.title = category.title
+        self.slug = category.slug
+        self.depth = category.depth
+        self.url = reverse('products:product_list', kwargs={'cat_slug': category.slug})
+        self.parent = None
+        self.children = []
+
+    def __str__(self):
+        return self.title
+
+
+class CategoryTree:
+    """
+    All active categories, linked to their parents and children.
+    Categories below an inactive parent stay out of ``roots``.
+    """
+    def __init__(self, version, categories):
+        self.version = version
+        self.nodes = [CategoryNode(category) for category in categories]
+        self.by_id = {node.id: node for node in self.nodes}
+        self.by_slug = {node.slug: node for node in self.nodes}
+        self.roots = []
+        for node, category in zip(self.nodes, categories):
+            if category.parent_id is None:
+                self.roots.append(node)
+            elif category.parent_id in self.by_id:
+                node.parent = self.by_id[category.parent_id]
+                node.parent.children.append(node)
+
+    @classmethod
+    def build(cls, version):
+        return cls(version, list(Category.objects.filter(is_active=True)))
+
+    @classmethod
+    async def abuild(cls, version):
+        return cls(version, [category async for category in Category.objects.filter(is_active=True)])
+
+
+_tree = None
+
+
+def get_category_tree():
+    """
+    Return the process-local category tree, rebuilding it when the
+    shared catalog version shows a category changed in any process.
+    """
+    global _tree
+    # Read the version first, so a change made while building is
+    # picked up by the next call. Changes bump it only once they are
+    # committed, so a tree built before that is never tagged with it.
+    version = get_version(CATALOG_VERSION_KEY)
+    tree = _tree
+    if tree is None or tree.version != version:
+        tree = _tree = CategoryTree.build(version)
+    return tree
+
+
+async def aget_category_tree():
+    """
+    Async version of ``get_category_tree()``.
+    """
+    global _tree
+    version = await aget_version(CATALOG_VERSION_KEY)
+    tree = _tree
+    if tree is None or tree.version != version:
+        tree = _tree = await CategoryTree.abuild(version)
+    return tree
+
+
+def count_category_products(tree):
+    """
+    Count the active products filed under every node of the tree or
+    anywhere below it, in one grouped query. A recursive CTE pairs
+    every active category with itself and each active category below
+    it through active parents, which is how the tree links them, so
+    the links never leave the database.
+    """
+    def make_cte(cte):
+        return Category.objects.filter(is_active=True).values(ancestor_id=F('id'), category_id=F('id')).union(
+            cte.join(Category, parent=cte.col.category_id).filter(is_active=True)
+            .values(ancestor_id=cte.col.ancestor_id, category_id=F('id')),
+            all=True,
+        )
+
+    cte = With.recursive(make_cte, name='category_subtrees')
+    links = CTEQuerySet(Product.category.through).filter(product__is_active=True)
+    counts = (
+        cte.join(links, category_id=cte.col.category_id).with_cte(cte)
+        .values(subtree_id=cte.col.ancestor_id)
+        .annotate(products=Count('product_id', distinct=True))
+        .values_list('subtree_id', 'products')
+    )
+    return {category_id: count for category_id, count in counts if category_id in tree.by_id}
+
+
+async def acount_category_products(tree):
+    return await sync_to_async(count_category_products)(tree)
+
+
+def get_category_product_counts():
+    """
+    Return the cached ``{category_id: product_count}`` dict. Once it
+    is older than ``PRODUCT_MENU_COUNTS_TIMEOUT`` seconds, one request
+    takes a short lock and recounts it, while everyone else keeps
+    getting the old counts. When there are none yet, the others wait
+    up to ``MENU_COUNTS_LOCK_WAIT`` seconds for them before counting
+    themselves.
+    """
+    entry = cache.get(MENU_COUNTS_KEY)
+    if entry is not None and entry['expires'] > time.time():
+        return entry['counts']
+    locked = cache.add(MENU_COUNTS_LOCK_KEY, 1, MENU_COUNTS_LOCK_TIMEOUT)
+    if not locked:
+        entry = entry or wait_for_counts()
+        if entry is not None:
+            return entry['counts']
+    try:
+        counts = count_category_products(get_category_tree())
+        cache.set(MENU_COUNTS_KEY, counts_entry(counts), settings.PRODUCT_MENU_COUNTS_STALE_TIMEOUT)
+    finally:
+        if locked:
+            cache.delete(MENU_COUNTS_LOCK_KEY)
+    return counts
+
+
+async def aget_category_product_counts():
+    """
+    Async version of ``get_category_product_counts()``.
+    """
+    entry = await cache.aget(MENU_COUNTS_KEY)
+    if entry is not None and entry['expires'] > time.time():
+        return entry['counts']
+    locked = await cache.aadd(MENU_COUNTS_LOCK_KEY, 1, MENU_COUNTS_LOCK_TIMEOUT)
+    if not locked:
+        entry = entry or await await_for_counts()
+        if entry is not None:
+            return entry['counts']
+    try:
+        counts = await acount_category_products(await aget_category_tree())
+        await cache.aset(MENU_COUNTS_KEY, counts_entry(counts), settings.PRODUCT_MENU_COUNTS_STALE_TIMEOUT)
+    finally:
+        if locked:
+            await cache.adelete(MENU_COUNTS_LOCK_KEY)
+    return counts
+
+
+def wait_for_counts():
+    deadline = time.monotonic() + MENU_COUNTS_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(MENU_COUNTS_POLL_INTERVAL)
+        entry = cache.get(MENU_COUNTS_KEY)
+        if entry is not None:
+            return entry
+    return None
+
+
+async def await_for_counts():
+    deadline = time.monotonic() + MENU_COUNTS_LOCK_WAIT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(MENU_COUNTS_POLL_INTERVAL)
+        entry = await cache.aget(MENU_COUNTS_KEY)
+        if entry is not None:
+            return entry
+    return None
+
+
+async def aload_category_context(request):
+    """
+    Load the category tree and menu counts onto the request before an
+    async view renders, since the category menu tag may not query the
+    database from the event loop.
+    """
+    request.category_tree = await aget_category_tree()
+    request.category_counts = await aget_category_product_counts()
+
+
+def counts_entry(counts):
+    return {'counts': counts, 'expires': time.time() + settings.PRODUCT_MENU_COUNTS_TIMEOUT}
@@ -0,0 +1,173 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils.functional import cached_property
+
+from .models import Comment, Product
+from .pagination import KeysetPaginator
+from .versioning import bump_product_categories, bump_products
+
+
+def attach_replies(comments):
+    """
+    Load the published replies of the given comments in one query and
+    hang them, oldest first, on ``thread_replies`` at every depth.
+    """
+    by_id = {}
+    for comment in comments:
+        comment.thread_replies = []
+        by_id[comment.id] = comment
+    if not by_id:
+        return
+
+    _thread_replies(by_id, list(_replies(by_id)))
+
+
+async def aattach_replies(comments):
+    """
+    Async version of ``attach_replies()``.
+    """
+    by_id = {}
+    for comment in comments:
+        comment.thread_replies = []
+        by_id[comment.id] = comment
+    if not by_id:
+        return
+    _thread_replies(by_id, [reply async for reply in _replies(by_id)])
+
+
+def _replies(by_id):
+    return (
+        Comment.objects.published_replies(list(by_id))
+        .select_related('user')
+        .order_by('created_at', 'id')
+    )
+
+
+def _thread_replies(by_id, replies):
+    for reply in replies:
+        reply.thread_replies = []
+        by_id[reply.id] = reply
+    for reply in replies:
+        by_id[reply.parent_id].thread_replies.append(reply)
+
+
+class CommentThread:
+    """
+    One page of a product's published top-level comments, newest first,
+    with their replies attached. Nothing is queried until ``page`` is
+    read, so a cached template fragment costs no queries at all.
+    """
+    ordering = ('-created_at', '-id')
+
+    def __init__(self, product, cursor=None, per_page=None):
+        queryset = (
+            Comment.published_comments_manager
+            .filter(product=product, parent__isnull=True)
+            .select_related('user')
+        )
+        self.paginator = KeysetPaginator(
+                                        queryset, self.ordering,
+                                        per_page or settings.PRODUCT_COMMENTS_PER_PAGE
+                                        )
+        self.cursor = cursor or ''
+        if cursor:
+            # Fail early on a bad cursor instead of inside the template.
+            self.paginator.decode_cursor(cursor)
+
+    @cached_property
+    def page(self):
+        page = self.paginator.page(self.cursor)
+        attach_replies(page.object_list)
+        return page
+
+    async def aload(self):
+        """
+        Load ``page`` up front, for templates rendered by async views.
+        """
+        if 'page' not in self.__dict__:
+            page = await self.paginator.apage(self.cursor)
+            await aattach_replies(page.object_list)
+            self.page = page
+
+
+def counts_as_review(status, parent_id):
+    """
+    Only published top-level comments count towards
+    ``Product.published_comment_count``; replies don't.
+    """
+    return status == Comment.PUBLISHED and parent_id is None
+
+
+def _adjust(queryset, field, delta):
+    if delta:
+        queryset.update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def adjust_reply_count(comment_id, delta):
+    _adjust(Comment.objects.filter(pk=comment_id), 'reply_count', delta)
+
+
+def adjust_published_comment_count(product_id, delta):
+    _adjust(Product.objects.filter(pk=product_id), 'published_comment_count', delta)
+
+
+def set_comments_status(queryset, status):
+    """
+    Change the status of many comments with a single UPDATE, keeping
+    the product counters and cached pages in step, since the update
+    sends no signals. Returns the number of comments changed.
+    """
+    with transaction.atomic():
+        rows = list(
+                Comment.objects.filter(pk__in=queryset.values('pk'))
+                .exclude(status=status)
+                .select_for_update()
+                .values_list('id', 'product_id', 'parent_id', 'status')
+                )
+        if not rows:
+            return 0
+        Comment.objects.filter(pk__in=[row[0] for row in rows]).update(status=status)
+
+        deltas = Counter()
+        touched = set()
+        for _, product_id, parent_id, previous_status in rows:
+            deltas[product_id] += (
+                counts_as_review(status, parent_id) - counts_as_review(previous_status, parent_id)
+            )
+            if Comment.PUBLISHED in (status, previous_status):
+                touched.add(product_id)
+        # A fixed order keeps concurrent callers from deadlocking.
+        for product_id in sorted(deltas):
+            adjust_published_comment_count(product_id, deltas[product_id])
+        bump_products(touched)
+        # The listings show the review counts on their product cards.
+        bump_product_categories([product_id for product_id, delta in deltas.items() if delta])
+    return len(rows)
+
+
+def reconcile_comment_counts():
+    """
+    Recount every reply and review counter from the comments and fix
+    the ones that drifted. Returns the number of comments and products
+    that were corrected.
+    """
+    replies = (
+        Comment.objects.filter(parent=OuterRef('pk'))
+        .order_by().values('parent').annotate(total=Count('id')).values('total')
+    )
+    reply_count = Coalesce(Subquery(replies), 0)
+    comments = Comment.objects.exclude(reply_count=reply_count).update(reply_count=reply_count)
+
+    reviews = (
+        Comment.objects.filter(product=OuterRef('pk'), status=Comment.PUBLISHED, parent__isnull=True)
+        .order_by().values('product').annotate(total=Count('id')).values('total')
+    )
+    review_count = Coalesce(Subquery(reviews), 0)
+    products = Product.objects.exclude(published_comment_count=review_count).update(
+        published_comment_count=review_count
+    )
+    return comments, products
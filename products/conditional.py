@@ -0,0 +1,80 @@
+import hashlib
+
+from django.contrib.messages import get_messages
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+
+class ConditionalGetMixin:
+    """
+    Answer If-None-Match and If-Modified-Since with a 304 before the
+    view renders anything, from validators the view computes cheaply.
+    Async views compute them in ``aget_validators()`` instead.
+    """
+    def get_validators(self):
+        """
+        Return an ``(etag, last_modified)`` pair, either of which may be
+        None. The etag is any string that changes with the page content.
+        """
+        return None, None
+
+    async def aget_validators(self):
+        return None, None
+
+    def is_conditional(self, request):
+        return request.method in ('GET', 'HEAD') and not len(get_messages(request))
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self.aconditional_dispatch(request, *args, **kwargs)
+        if not self.is_conditional(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        validators = self.get_validators()
+        etag, last_modified = self.prepare_validators(request, *validators)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            return response
+        return self.add_validators(request, super().dispatch(request, *args, **kwargs), *validators)
+
+    async def aconditional_dispatch(self, request, *args, **kwargs):
+        if not self.is_conditional(request):
+            return await super().dispatch(request, *args, **kwargs)
+
+        validators = await self.aget_validators()
+        etag, last_modified = self.prepare_validators(request, *validators)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            return response
+        return self.add_validators(request, await super().dispatch(request, *args, **kwargs), *validators)
+
+    def prepare_validators(self, request, etag, last_modified):
+        if etag is not None:
+            # Pages differ per visitor, e.g. the comment form, and their
+            # forms carry a token that dies when the CSRF secret rotates
+            # on login and logout.
+            csrf_secret = request.META.get('CSRF_COOKIE', '')
+            etag = quote_etag(hashlib.md5(f'{etag}:{request.user.pk}:{csrf_secret}'.encode()).hexdigest())
+        if last_modified is not None:
+            last_modified = int(last_modified.timestamp())
+        return etag, last_modified
+
+    def add_validators(self, request, response, etag, last_modified):
+        """
+        Set the validators once the page is rendered, as rendering a
+        form may create the CSRF secret the etag depends on.
+        """
+        def set_headers(response):
+            if response.status_code != 200:
+                return
+            prepared_etag, prepared_last_modified = self.prepare_validators(request, etag, last_modified)
+            if prepared_etag is not None and not response.has_header('ETag'):
+                response.headers['ETag'] = prepared_etag
+            if prepared_last_modified is not None and not response.has_header('Last-Modified'):
+                response.headers['Last-Modified'] = http_date(prepared_last_modified)
+
+        if getattr(response, 'is_rendered', True):
+            set_headers(response)
+        else:
+            response.add_post_render_callback(set_headers)
+        return response
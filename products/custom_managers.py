@@ -1,6 +1,70 @@
 from django.db import models
+from django.db.models import Exists, OuterRef
+
+from django_cte import CTEManager, CTEQuerySet, With
 
 
 class PublishedCommentsManger(models.Manager):
     def get_queryset(self):
-        return super(PublishedCommentsManger, self).get_queryset().all().filter(status='p')
\ No newline at end of file
+        return super(PublishedCommentsManger, self).get_queryset().all().filter(status='p')
+
+
+class CategoryQuerySet(CTEQuerySet):
+    def subtree(self, category):
+        """
+        Return the category and all of its descendants in a single
+        statement, using a recursive CTE over the parent links.
+        """
+        model = self.model
+
+        def make_cte(cte):
+            return model.objects.filter(pk=category.pk).values('id').union(
+                cte.join(model, parent=cte.col.id).values('id'),
+                all=True,
+            )
+
+        cte = With.recursive(make_cte, name='category_subtree')
+        return cte.join(self._chain(), id=cte.col.id).with_cte(cte)
+
+
+CategoryManager = CTEManager.from_queryset(CategoryQuerySet)
+
+
+class CommentQuerySet(CTEQuerySet):
+    def published_replies(self, comment_ids):
+        """
+        Return the published replies below the given comments, at any
+        depth, in a single statement. Replies under an unpublished reply
+        are left out along with it.
+        """
+        model = self.model
+
+        def make_cte(cte):
+            # Comments have a default ordering, which compound statements reject.
+            return model.objects.filter(parent__in=comment_ids, status=model.PUBLISHED).order_by().values('id').union(
+                cte.join(model, parent=cte.col.id).filter(status=model.PUBLISHED).order_by().values('id'),
+                all=True,
+            )
+
+        cte = With.recursive(make_cte, name='comment_replies')
+        return cte.join(self._chain(), id=cte.col.id).with_cte(cte)
+
+
+CommentManager = CTEManager.from_queryset(CommentQuerySet)
+
+
+class ProductQuerySet(models.QuerySet):
+    def in_category_subtree(self, category):
+        """
+        Filter products filed under the category or any of its
+        descendants. Uses a semi-join so products that belong to
+        several categories of the subtree are returned once, without
+        needing DISTINCT.
+        """
+        category_field = self.model._meta.get_field('category')
+        categories = category_field.related_model.objects.subtree(category).values('id')
+        memberships = category_field.remote_field.through.objects.filter(
+            product_id=OuterRef('pk'),
+            category_id__in=categories,
+        )
+        return self.filter(Exists(memberships))
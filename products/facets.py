@@ -0,0 +1,290 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Exists, OuterRef, Q
+
+from .models import ProductAttributeValue, Variant
+
+
+class ProductFacets:
+    """
+    Filter a product queryset by brand, color, price range, stock and
+    attribute values, and count the products behind every option.
+
+    Counts for a facet ignore the facet's own selection, so choosing a
+    brand still shows how many products the other brands have. Every
+    facet is counted with one grouped or conditional aggregate query,
+    and the unfiltered counts are cached per listing version.
+    """
+    ATTRIBUTE_PREFIX = 'attr_'
+    PARAMS = ('brand', 'color', 'price', 'in_stock')
+
+    def __init__(self, queryset, params, cache_key=None):
+        self.queryset = queryset
+        self.cache_key = cache_key
+        self.price_buckets = self._build_price_buckets()
+        self.selected = self._parse(params)
+
+    @classmethod
+    def is_param(cls, name):
+        """
+        Return True for the query params that select facet options.
+        """
+        if name.startswith(cls.ATTRIBUTE_PREFIX):
+            return name[len(cls.ATTRIBUTE_PREFIX):].isdigit()
+        return name in cls.PARAMS
+
+    def _build_price_buckets(self):
+        bounds = list(settings.PRODUCT_PRICE_FACET_BUCKETS)
+        return [
+                (lower, upper)
+                for lower, upper in zip(bounds, bounds[1:] + [None])
+                ]
+
+    def _parse(self, params):
+        selected = {
+            'brand': set(params.getlist('brand')),
+            'color': {value for value in params.getlist('color') if value.isdigit()},
+            'price': {
+                int(value) for value in params.getlist('price')
+                if value.isdigit() and int(value) < len(self.price_buckets)
+            },
+            'in_stock': params.get('in_stock') == '1',
+        }
+        for name in params:
+            attribute_id = name[len(self.ATTRIBUTE_PREFIX):]
+            if name.startswith(self.ATTRIBUTE_PREFIX) and attribute_id.isdigit():
+                selected[name] = set(params.getlist(name))
+        return selected
+
+    @property
+    def is_filtered(self):
+        return any(self.selected.values())
+
+    def _price_q(self, buckets):
+        condition = Q()
+        for index in buckets:
+            lower, upper = self.price_buckets[index]
+            bucket = Q(price__gte=lower)
+            if upper is not None:
+                bucket &= Q(price__lt=upper)
+            condition |= bucket
+        return condition
+
+    def _conditions(self, exclude=None):
+        """
+        Return the filter conditions of every selected facet
+        except ``exclude``.
+        """
+        conditions = []
+        selected = {name: value for name, value in self.selected.items() if value and name != exclude}
+        variants = Variant.objects.filter(product=OuterRef('pk'))
+
+        if 'brand' in selected:
+            conditions.append(Q(brand__slug__in=selected['brand']))
+        if 'color' in selected:
+            conditions.append(Exists(variants.filter(color_id__in=selected['color'])))
+        if 'price' in selected:
+            conditions.append(Exists(variants.filter(self._price_q(selected['price']))))
+        if 'in_stock' in selected:
+            conditions.append(Exists(variants.filter(stock__gt=0)))
+        for name, values in selected.items():
+            if name.startswith(self.ATTRIBUTE_PREFIX):
+                attribute_values = ProductAttributeValue.objects.filter(
+                    product=OuterRef('pk'),
+                    attribute_id=name[len(self.ATTRIBUTE_PREFIX):],
+                    value__in=values,
+                )
+                conditions.append(Exists(attribute_values))
+        return conditions
+
+    def apply(self, queryset=None):
+        """
+        Return the queryset narrowed down by every selected facet.
+        """
+        queryset = self.queryset if queryset is None else queryset
+        return queryset.filter(*self._conditions())
+
+    def _base(self, exclude):
+        return self.queryset.filter(*self._conditions(exclude=exclude))
+
+    def counts(self):
+        """
+        Return the facets with their option counts for the current filters.
+        """
+        if self.cache_key and not self.is_filtered:
+            facets = cache.get(self.cache_key)
+            if facets is None:
+                facets = self._count()
+                cache.set(self.cache_key, facets, settings.PRODUCT_FACET_CACHE_TIMEOUT)
+            return facets
+        return self._count()
+
+    async def acounts(self):
+        """
+        Async version of ``counts()``.
+        """
+        if self.cache_key and not self.is_filtered:
+            facets = await cache.aget(self.cache_key)
+            if facets is None:
+                facets = await self._acount()
+                await cache.aset(self.cache_key, facets, settings.PRODUCT_FACET_CACHE_TIMEOUT)
+            return facets
+        return await self._acount()
+
+    def _count(self):
+        results = [
+            queryset.aggregate(**aggregates) if aggregates else list(queryset)
+            for queryset, aggregates in self._queries()
+        ]
+        return self._facets(results)
+
+    async def _acount(self):
+        results = [
+            await queryset.aaggregate(**aggregates) if aggregates else [row async for row in queryset]
+            for queryset, aggregates in self._queries()
+        ]
+        return self._facets(results)
+
+    def _queries(self):
+        """
+        Return the count queries of every facet as ``(queryset,
+        aggregates)`` pairs, where aggregates is None for the queries
+        whose rows are read. ``_facets()`` turns the results into facets.
+        """
+        return [
+            self._brand_query(),
+            self._color_query(),
+            self._price_query(),
+            self._stock_query(),
+            *self._attribute_queries(),
+        ]
+
+    def _facets(self, results):
+        brand, color, price, stock, *attributes = results
+        return [
+            self._brand_facet(brand),
+            self._color_facet(color),
+            self._price_facet(price),
+            self._stock_facet(stock),
+            *self._attribute_facets(attributes),
+        ]
+
+    def _option(self, facet, value, label, count):
+        return {
+            'value': value,
+            'label': label,
+            'count': count,
+            'selected': value in self.selected.get(facet, ()),
+        }
+
+    def _brand_query(self):
+        rows = (
+            self._base('brand')
+            .order_by()
+            .values('brand__slug', 'brand__title')
+            .annotate(count=Count('id'))
+            .order_by('brand__title')
+        )
+        return rows, None
+
+    def _brand_facet(self, rows):
+        return {
+            'name': 'brand',
+            'title': 'Brand',
+            'options': [
+                self._option('brand', row['brand__slug'], row['brand__title'], row['count'])
+                for row in rows
+            ],
+        }
+
+    def _color_query(self):
+        rows = (
+            Variant.objects.filter(product__in=self._base('color').values('pk'))
+            .values('color_id', 'color__name', 'color__code')
+            .annotate(count=Count('product', distinct=True))
+            .order_by('color__name')
+        )
+        return rows, None
+
+    def _color_facet(self, rows):
+        options = []
+        for row in rows:
+            option = self._option('color', str(row['color_id']), row['color__name'], row['count'])
+            option['code'] = row['color__code']
+            options.append(option)
+        return {'name': 'color', 'title': 'Color', 'options': options}
+
+    def _price_query(self):
+        aggregates = {
+            f'bucket_{index}': Count('product', distinct=True, filter=self._price_q([index]))
+            for index in range(len(self.price_buckets))
+        }
+        return Variant.objects.filter(product__in=self._base('price').values('pk')), aggregates
+
+    def _price_facet(self, counts):
+        options = []
+        for index, (lower, upper) in enumerate(self.price_buckets):
+            label = f'{lower} - {upper}' if upper is not None else f'{lower}+'
+            option = self._option('price', index, label, counts[f'bucket_{index}'])
+            options.append(option)
+        return {'name': 'price', 'title': 'Price', 'options': options}
+
+    def _stock_query(self):
+        in_stock = Exists(Variant.objects.filter(product=OuterRef('pk'), stock__gt=0))
+        return self._base('in_stock'), {'count': Count('id', filter=Q(in_stock))}
+
+    def _stock_facet(self, counts):
+        option = {
+            'value': '1',
+            'label': 'In stock',
+            'count': counts['count'],
+            'selected': self.selected['in_stock'],
+        }
+        return {'name': 'in_stock', 'title': 'Availability', 'options': [option]}
+
+    def _attribute_queries(self):
+        """
+        Count attribute values with one grouped query for the unselected
+        attributes, plus one per attribute that has a selection.
+        """
+        selected_attributes = [
+            name for name, values in self.selected.items()
+            if name.startswith(self.ATTRIBUTE_PREFIX) and values
+        ]
+        selected_ids = [name[len(self.ATTRIBUTE_PREFIX):] for name in selected_attributes]
+
+        querysets = [
+            ProductAttributeValue.objects.filter(
+                product__in=self._base(None).values('pk'),
+            ).exclude(attribute_id__in=selected_ids)
+        ]
+        for name, attribute_id in zip(selected_attributes, selected_ids):
+            querysets.append(
+                ProductAttributeValue.objects.filter(
+                    product__in=self._base(name).values('pk'),
+                    attribute_id=attribute_id,
+                )
+            )
+        return [
+            (
+                queryset
+                .values('attribute_id', 'attribute__name', 'value')
+                .annotate(count=Count('product'))
+                .order_by('attribute__name', 'value'),
+                None,
+            )
+            for queryset in querysets
+        ]
+
+    def _attribute_facets(self, results):
+        facets = {}
+        for rows in results:
+            for row in rows:
+                name = f"{self.ATTRIBUTE_PREFIX}{row['attribute_id']}"
+                facet = facets.setdefault(name, {
+                    'name': name,
+                    'title': row['attribute__name'],
+                    'options': [],
+                })
+                facet['options'].append(self._option(name, row['value'], row['value'], row['count']))
+        return sorted(facets.values(), key=lambda facet: facet['title'])
@@ -0,0 +1,245 @@
+import hashlib
+import logging
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .models import Brand, ImageDerivative, Product, Variant
+from .versioning import bump_product_categories, bump_products
+
+logger = logging.getLogger(__name__)
+
+# The default of the image fields, which is not a real upload.
+PLACEHOLDER_IMAGE = 'alternative_image'
+
+IMAGE_FIELDS = {
+    Product: 'cover_image',
+    Variant: 'image',
+    Brand: 'logo',
+}
+
+SAVE_OPTIONS = {
+    ImageDerivative.WEBP: {'format': 'WEBP', 'quality': 80, 'method': 4},
+    ImageDerivative.JPEG: {'format': 'JPEG', 'quality': 80, 'optimize': True, 'progressive': True},
+}
+
+EXTENSIONS = {
+    ImageDerivative.WEBP: 'webp',
+    ImageDerivative.JPEG: 'jpg',
+}
+
+
+def read_image_metadata(file):
+    """
+    Return the ``(width, height, color)`` of an image file, where color
+    is its most common color as ``#rrggbb``. Unreadable files give
+    ``(None, None, '')``.
+    """
+    try:
+        file.seek(0)
+        with Image.open(file) as image:
+            image = ImageOps.exif_transpose(image)
+            width, height = image.size
+            sample = image.convert('RGB')
+        sample.thumbnail((64, 64))
+        palette = sample.quantize(colors=4)
+        _, index = max(palette.getcolors())
+        red, green, blue = palette.getpalette()[index * 3:index * 3 + 3]
+        return width, height, f'#{red:02x}{green:02x}{blue:02x}'
+    except (OSError, Image.DecompressionBombError):
+        return None, None, ''
+    finally:
+        file.seek(0)
+
+
+def record_image_metadata(image):
+    """
+    Copy the dimensions and color of a new upload onto the model
+    instance, so nothing has to open the file to get them later.
+    """
+    if not image or image.name == PLACEHOLDER_IMAGE:
+        metadata = None, None, ''
+    elif not image._committed:
+        metadata = read_image_metadata(image.file)
+    else:
+        return
+    for suffix, value in zip(('width', 'height', 'color'), metadata):
+        setattr(image.instance, f'{image.field.name}_{suffix}', value)
+
+
+def image_metadata(image):
+    """
+    Return the recorded ``(width, height, color)`` of an image field.
+    """
+    return tuple(
+        getattr(image.instance, f'{image.field.name}_{suffix}', None)
+        for suffix in ('width', 'height', 'color')
+    )
+
+
+def derivatives_key(source):
+    return f'products:image:{hashlib.md5(source.encode()).hexdigest()}'
+
+
+def enqueue_image_derivatives(source, max_width=None):
+    """
+    Queue every configured width and format of an uploaded image for
+    the worker, skipping widths the original doesn't reach when its
+    width is known. Already queued or generated derivatives are kept.
+    """
+    if not source or source == PLACEHOLDER_IMAGE:
+        return
+    ImageDerivative.objects.bulk_create(
+        [
+            ImageDerivative(source=source, width=width, format=format)
+            for width in settings.PRODUCT_IMAGE_WIDTHS
+            if max_width is None or width < max_width
+            for format, _ in ImageDerivative.FORMATS
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def get_image_derivatives(source):
+    """
+    Return ``{format: [(width, url), ...]}`` for the derivatives of the
+    image that are ready, narrowest first. Cached until the worker
+    finishes more of them.
+    """
+    def load():
+        return group_derivatives(ready_derivatives([source]), [source])[source]
+
+    return cache.get_or_set(derivatives_key(source), load, settings.PRODUCT_IMAGE_CACHE_TIMEOUT)
+
+
+def ready_derivatives(sources):
+    return (
+        ImageDerivative.objects.filter(source__in=sources).exclude(file='')
+        .order_by('width').values_list('source', 'format', 'width', 'file')
+    )
+
+
+def group_derivatives(rows, sources):
+    derivatives = {source: {} for source in sources}
+    for source, format, width, name in rows:
+        derivatives[source].setdefault(format, []).append((width, default_storage.url(name)))
+    return derivatives
+
+
+def load_image_derivatives(images):
+    """
+    Set ``derivatives`` on the given image fields for the
+    ``responsive_image`` tag, so a grid of them costs one cache round
+    trip, and one query for the images that weren't cached, instead
+    of one of each per image.
+    """
+    images = [image for image in images if image]
+    keys = {derivatives_key(image.name): image.name for image in images if image.name != PLACEHOLDER_IMAGE}
+    derivatives = {keys[key]: value for key, value in cache.get_many(keys).items()}
+    missing = set(keys.values()) - derivatives.keys()
+    if missing:
+        loaded = group_derivatives(ready_derivatives(missing), missing)
+        cache.set_many(
+            {derivatives_key(source): value for source, value in loaded.items()},
+            settings.PRODUCT_IMAGE_CACHE_TIMEOUT,
+        )
+        derivatives.update(loaded)
+    for image in images:
+        image.derivatives = derivatives.get(image.name, {})
+
+
+async def aload_image_derivatives(images):
+    """
+    Async version of ``load_image_derivatives()``, which lets an
+    async view render the images without querying.
+    """
+    images = [image for image in images if image]
+    keys = {derivatives_key(image.name): image.name for image in images if image.name != PLACEHOLDER_IMAGE}
+    derivatives = {keys[key]: value for key, value in (await cache.aget_many(keys)).items()}
+    missing = set(keys.values()) - derivatives.keys()
+    if missing:
+        rows = [row async for row in ready_derivatives(missing)]
+        loaded = group_derivatives(rows, missing)
+        await cache.aset_many(
+            {derivatives_key(source): value for source, value in loaded.items()},
+            settings.PRODUCT_IMAGE_CACHE_TIMEOUT,
+        )
+        derivatives.update(loaded)
+    for image in images:
+        image.derivatives = derivatives.get(image.name, {})
+
+
+def resize(image, width, format):
+    height = max(round(image.height * width / image.width), 1)
+    resized = image.resize((width, height), Image.LANCZOS)
+    if format == ImageDerivative.JPEG and resized.mode != 'RGB':
+        resized = resized.convert('RGB')
+    elif resized.mode not in ('RGB', 'RGBA'):
+        resized = resized.convert('RGBA')
+    buffer = BytesIO()
+    resized.save(buffer, **SAVE_OPTIONS[format])
+    return buffer.getvalue()
+
+
+def generate_derivatives(source, derivatives):
+    """
+    Write the given pending derivatives of one source image under
+    content-hash names, so identical output is only stored once.
+    Widths the original doesn't reach are dropped instead.
+    """
+    with default_storage.open(source) as file:
+        image = Image.open(file)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    done, too_wide = [], []
+    for derivative in derivatives:
+        if derivative.width >= image.width:
+            too_wide.append(derivative.pk)
+            continue
+        content = resize(image, derivative.width, derivative.format)
+        name = f'derivatives/{hashlib.sha256(content).hexdigest()[:32]}.{EXTENSIONS[derivative.format]}'
+        if not default_storage.exists(name):
+            name = default_storage.save(name, ContentFile(content))
+        derivative.file.name = name
+        done.append(derivative)
+
+    ImageDerivative.objects.bulk_update(done, ['file'])
+    ImageDerivative.objects.filter(pk__in=too_wide).delete()
+    return len(done)
+
+
+def generate_pending_derivatives(batch_size=50):
+    """
+    Generate every queued derivative, one source image at a time, then
+    drop the cached derivative lists, and the product and category
+    pages, of the images that changed. Images that can't be read are
+    logged and dequeued, and keep being served as uploaded. Returns
+    the number written.
+    """
+    total = 0
+    while True:
+        sources = list(dict.fromkeys(
+                    ImageDerivative.objects.filter(file='')
+                    .order_by('id').values_list('source', flat=True)[:batch_size]
+                    ))
+        if not sources:
+            return total
+
+        for source in sources:
+            derivatives = list(ImageDerivative.objects.filter(source=source, file=''))
+            try:
+                total += generate_derivatives(source, derivatives)
+            except (OSError, Image.DecompressionBombError) as error:
+                logger.warning('Could not generate derivatives of %s: %s', source, error)
+                ImageDerivative.objects.filter(pk__in=[derivative.pk for derivative in derivatives]).delete()
+
+        cache.delete_many([derivatives_key(source) for source in sources])
+        product_ids = set(Product.objects.filter(cover_image__in=sources).values_list('pk', flat=True))
+        product_ids.update(Variant.objects.filter(image__in=sources).values_list('product_id', flat=True))
+        bump_products(product_ids)
+        bump_product_categories(product_ids)
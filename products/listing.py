@@ -0,0 +1,158 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Prefetch
+
+from .models import Product, ProductListing, Variant
+
+
+def build_listing(product):
+    """
+    Return an unsaved listing row for a product whose
+    variants (with their colors) are already loaded.
+    """
+    variants = list(product.variants.all())
+    prices = [variant.price for variant in variants]
+    total_stock = sum(variant.stock for variant in variants)
+
+    colors = []
+    for variant in sorted(variants, key=lambda variant: variant.price):
+        color = {'name': variant.color.name, 'code': variant.color.code}
+        if color not in colors:
+            colors.append(color)
+
+    return ProductListing(
+        product=product,
+        min_price=min(prices) if prices else None,
+        max_price=max(prices) if prices else None,
+        total_stock=total_stock,
+        in_stock=total_stock > 0,
+        colors=colors,
+        cover_image_url=product.cover_image.url if product.cover_image else '',
+        is_active=product.is_active,
+        created_at=product.created_at,
+    )
+
+
+def _products_with_variants(product_ids):
+    return Product.objects.filter(pk__in=product_ids).prefetch_related(
+        Prefetch('variants', queryset=Variant.objects.select_related('color')),
+    )
+
+
+def refresh_listings(product_ids):
+    """
+    Recompute the listing rows of the given products.
+    """
+    listings = [build_listing(product) for product in _products_with_variants(product_ids)]
+    _save_listings(listings)
+
+
+def rebuild_listings(batch_size=500):
+    """
+    Recompute the listing row of every product, walking the
+    products by primary key ``batch_size`` at a time.
+    Returns the number of rows written.
+    """
+    total = 0
+    last_pk = 0
+    while True:
+        product_ids = list(
+                        Product.objects.filter(pk__gt=last_pk)
+                        .order_by('pk')
+                        .values_list('pk', flat=True)[:batch_size]
+                        )
+        if not product_ids:
+            return total
+        refresh_listings(product_ids)
+        total += len(product_ids)
+        last_pk = product_ids[-1]
+
+
+def _save_listings(listings):
+    if not listings:
+        return
+    ProductListing.objects.bulk_create(
+        listings,
+        update_conflicts=True,
+        unique_fields=['product'],
+        update_fields=[
+            'min_price', 'max_price', 'total_stock', 'in_stock',
+            'colors', 'cover_image_url', 'is_active', 'created_at',
+        ],
+    )
+
+
+def product_views_key(product_id):
+    return f'products:product:{product_id}:views'
+
+
+def record_product_view(product_id):
+    """
+    Count a view of the product for the most viewed sort order.
+    Views are buffered in the cache, so cached pages can count them
+    too. The request that fills a product's buffer to
+    ``PRODUCT_VIEW_FLUSH_THRESHOLD`` writes it to the database, and
+    ``flush_product_views()`` writes whatever is left over.
+    """
+    key = product_views_key(product_id)
+    try:
+        views = cache.incr(key)
+    except ValueError:
+        views = 1 if cache.add(key, 1, timeout=None) else cache.incr(key)
+    if views == settings.PRODUCT_VIEW_FLUSH_THRESHOLD:
+        write_product_views(product_id, views)
+
+
+async def arecord_product_view(product_id):
+    key = product_views_key(product_id)
+    try:
+        views = await cache.aincr(key)
+    except ValueError:
+        views = 1 if await cache.aadd(key, 1, timeout=None) else await cache.aincr(key)
+    if views == settings.PRODUCT_VIEW_FLUSH_THRESHOLD:
+        await sync_to_async(write_product_views)(product_id, views)
+
+
+def write_product_views(product_id, views):
+    """
+    Move up to ``views`` buffered views of the product to its listing
+    row. Only what is taken off the buffer is written, so views
+    counted meanwhile survive and concurrent writers never count a
+    view twice. Returns the number written.
+    """
+    key = product_views_key(product_id)
+    try:
+        remaining = cache.decr(key, views)
+    except ValueError:
+        return 0
+    if remaining < 0:
+        # Someone else wrote part of them first; put that part back.
+        cache.incr(key, -remaining)
+        views += remaining
+    if views > 0:
+        ProductListing.objects.filter(pk=product_id).update(view_count=F('view_count') + views)
+    return max(views, 0)
+
+
+def flush_product_views(batch_size=500):
+    """
+    Add the buffered view counts to the listing rows, walking
+    the listings by primary key ``batch_size`` at a time.
+    Returns the number of views written.
+    """
+    total = 0
+    last_pk = 0
+    while True:
+        product_ids = list(
+                        ProductListing.objects.filter(pk__gt=last_pk)
+                        .order_by('pk')
+                        .values_list('pk', flat=True)[:batch_size]
+                        )
+        if not product_ids:
+            return total
+        keys = {product_views_key(product_id): product_id for product_id in product_ids}
+        for key, views in cache.get_many(keys).items():
+            if views > 0:
+                total += write_product_views(keys[key], views)
+        last_pk = product_ids[-1]
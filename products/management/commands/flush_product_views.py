@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from products.listing import flush_product_views
+
+
+class Command(BaseCommand):
+    help = 'Write the product views buffered in the cache to the listing rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        total = flush_product_views(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{total} product view(s) flushed.'))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.images import generate_pending_derivatives
+
+
+class Command(BaseCommand):
+    help = 'Generate the queued thumbnails and WebP copies of uploaded images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument(
+            '--loop', type=int, metavar='SECONDS',
+            help='Keep running, checking for new images every SECONDS.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            total = generate_pending_derivatives(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'{total} image derivative(s) generated.'))
+            if not options['loop']:
+                return
+            time.sleep(options['loop'])
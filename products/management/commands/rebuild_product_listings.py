@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from products.listing import rebuild_listings
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized listing row of every product.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        total = rebuild_listings(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{total} product listing(s) rebuilt.'))
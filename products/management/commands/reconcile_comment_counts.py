@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from products.comments import reconcile_comment_counts
+
+
+class Command(BaseCommand):
+    help = 'Recount the comment reply and product review counters.'
+
+    def handle(self, *args, **options):
+        comments, products = reconcile_comment_counts()
+        self.stdout.write(self.style.SUCCESS(
+            f'{comments} comment(s) and {products} product(s) corrected.'
+        ))
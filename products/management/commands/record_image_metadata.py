@@ -0,0 +1,31 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from products.images import IMAGE_FIELDS, PLACEHOLDER_IMAGE, read_image_metadata
+
+
+class Command(BaseCommand):
+    help = 'Record the size and color of images uploaded before they were stored on upload.'
+
+    def handle(self, *args, **options):
+        total = 0
+        for model, field in IMAGE_FIELDS.items():
+            missing = (
+                model.objects.filter(**{f'{field}_width__isnull': True})
+                .exclude(**{f'{field}__in': ['', PLACEHOLDER_IMAGE]})
+                .values_list('pk', field)
+            )
+            for pk, name in missing.iterator():
+                if not default_storage.exists(name):
+                    continue
+                with default_storage.open(name) as file:
+                    width, height, color = read_image_metadata(file)
+                if width is None:
+                    continue
+                model.objects.filter(pk=pk).update(**{
+                    f'{field}_width': width,
+                    f'{field}_height': height,
+                    f'{field}_color': color,
+                })
+                total += 1
+        self.stdout.write(self.style.SUCCESS(f'{total} image(s) recorded.'))
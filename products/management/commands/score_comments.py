@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.scoring import score_pending_comments
+
+
+class Command(BaseCommand):
+    help = 'Score waiting comments and auto-moderate the clear cases.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--loop', type=int, metavar='SECONDS',
+            help='Keep running, checking for new comments every SECONDS.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            total = score_pending_comments(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'{total} comment(s) scored.'))
+            if not options['loop']:
+                return
+            time.sleep(options['loop'])
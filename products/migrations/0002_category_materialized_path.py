@@ -0,0 +1,50 @@
+# Generated by Django 5.1.1 on 2026-10-16 09:12
+
+from django.db import migrations, models
+
+
+def populate_category_paths(apps, schema_editor):
+    Category = apps.get_model('products', 'Category')
+    categories = {category.pk: category for category in Category.objects.all()}
+
+    def fill(category):
+        if category.path:
+            return category
+        if category.parent_id is None:
+            category.path, category.ancestor_ids = [category.title.lower()], []
+        else:
+            parent = fill(categories[category.parent_id])
+            category.path = parent.path + [category.title.lower()]
+            category.ancestor_ids = parent.ancestor_ids + [parent.pk]
+        category.depth = len(category.ancestor_ids)
+        return category
+
+    for category in categories.values():
+        fill(category)
+    Category.objects.bulk_update(categories.values(), ['path', 'ancestor_ids', 'depth'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='ancestor_ids',
+            field=models.JSONField(default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.JSONField(default=list, editable=False),
+        ),
+        migrations.RunPython(populate_category_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.1 on 2026-10-16 10:40
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX products_product_search_vector_gin '
+            'ON products_product USING gin (search_vector)'
+        )
+        schema_editor.execute(
+            "UPDATE products_product SET search_vector = "
+            "setweight(to_tsvector(%s::regconfig, coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector(%s::regconfig, coalesce(description, '')), 'B')",
+            params=[settings.PRODUCT_SEARCH_CONFIG] * 2,
+        )
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE products_product_fts '
+            "USING fts5(name, description, tokenize='unicode61')"
+        )
+        schema_editor.execute(
+            'INSERT INTO products_product_fts (rowid, name, description) '
+            'SELECT id, name, description FROM products_product'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS products_product_search_vector_gin')
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS products_product_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_category_materialized_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
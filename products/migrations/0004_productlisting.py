@@ -0,0 +1,26 @@
+# Generated by Django 5.1.1 on 2026-10-16 12:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_product_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductListing',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='listing', serialize=False, to='products.product')),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('max_price', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('total_stock', models.PositiveIntegerField(default=0)),
+                ('in_stock', models.BooleanField(default=False)),
+                ('colors', models.JSONField(default=list)),
+                ('cover_image_url', models.CharField(blank=True, max_length=500)),
+            ],
+        ),
+    ]
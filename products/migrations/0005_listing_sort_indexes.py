@@ -0,0 +1,52 @@
+# Generated by Django 5.1.1 on 2026-10-16 13:20
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_product_fields(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductListing = apps.get_model('products', 'ProductListing')
+    product = Product.objects.filter(pk=OuterRef('product_id'))
+    ProductListing.objects.update(
+        is_active=Subquery(product.values('is_active')[:1]),
+        created_at=Subquery(product.values('created_at')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_productlisting'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productlisting',
+            name='created_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='productlisting',
+            name='is_active',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='productlisting',
+            name='view_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(copy_product_fields, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_active', '-created_at', '-id'], name='product_active_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productlisting',
+            index=models.Index(fields=['is_active', 'min_price', 'product'], name='listing_active_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productlisting',
+            index=models.Index(fields=['is_active', '-view_count', '-product'], name='listing_active_views_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-16 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_listing_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='variant',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.1 on 2026-10-16 16:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_variant_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('parent__isnull', True)), fields=['product', 'status', '-created_at', '-id'], name='comment_thread_idx'),
+        ),
+    ]
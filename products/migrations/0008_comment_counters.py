@@ -0,0 +1,41 @@
+# Generated by Django 5.1.1 on 2026-10-16 17:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_comments(apps, schema_editor):
+    Comment = apps.get_model('products', 'Comment')
+    Product = apps.get_model('products', 'Product')
+    replies = (
+        Comment.objects.filter(parent=OuterRef('pk'))
+        .order_by().values('parent').annotate(total=Count('id')).values('total')
+    )
+    Comment.objects.update(reply_count=Coalesce(Subquery(replies), 0))
+    reviews = (
+        Comment.objects.filter(product=OuterRef('pk'), status='p', parent__isnull=True)
+        .order_by().values('product').annotate(total=Count('id')).values('total')
+    )
+    Product.objects.update(published_comment_count=Coalesce(Subquery(reviews), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_comment_thread_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='published_comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_comments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.1 on 2026-10-16 17:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_comment_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='comment_moderation_idx'),
+        ),
+    ]
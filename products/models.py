@@ -1,12 +1,29 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.urls import reverse
 from django.utils.text import slugify
 from django.core.exceptions import ValidationError
 
 from colorfield.fields import ColorField
 
-from .custom_managers import PublishedCommentsManger
+from .custom_managers import CategoryManager, CommentManager, ProductQuerySet, PublishedCommentsManger
+
+
+class CounterFieldsMixin:
+    """
+    Leave denormalized counters out of regular saves, so saving a stale
+    instance never overwrites the increments made with F() expressions.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
 
 
 class CategoryType(models.Model):
@@ -21,7 +38,13 @@ class CategoryType(models.Model):
 class Category(models.Model):
     """
     Model representing a product category.
+
+    The title path, depth and ancestor ids are denormalized onto every
+    row and kept up to date on save, so printing a category or
+    validating its depth never walks the parent chain.
     """
+    MAX_LEVELS = 3
+
     title = models.CharField(max_length=250)
     slug = models.SlugField(unique=True, blank=True)
     category_type = models.ForeignKey(
@@ -35,39 +58,104 @@ class Category(models.Model):
                                 on_delete=models.CASCADE
                                 )
     is_active = models.BooleanField(default=True)
+    path = models.JSONField(default=list, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    ancestor_ids = models.JSONField(default=list, editable=False)
+
+    objects = CategoryManager()
 
     class Meta:
         verbose_name_plural = "categories"
         unique_together = ('title', 'category_type', 'parent')
-    
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_tree = (instance.__dict__.get('path'), instance.__dict__.get('ancestor_ids'))
+        return instance
+
+    def build_tree_fields(self):
+        """
+        Return the title path and ancestor ids computed from the stored
+        fields of the parent, which costs at most one query.
+        """
+        if self.parent is None:
+            return [self.title.lower()], []
+        parent = self.parent
+        return parent.path + [self.title.lower()], parent.ancestor_ids + [parent.id]
+
     def category_full_path(self):
         """
         Return full path category.
         """
-        full_path = [self.title.lower()]
-        parent_name = self.parent
-        while parent_name is not None:
-            full_path.append(parent_name.title.lower())
-            parent_name = parent_name.parent
-        return full_path[::-1]
-    
+        return self.build_tree_fields()[0]
+
     def clean(self):
-        category_path = self.category_full_path()
+        category_path, ancestor_ids = self.build_tree_fields()
         self.slug = slugify(category_path)
 
         if Category.objects.filter(slug=self.slug).exclude(id=self.id).exists():
             raise ValidationError(f'A category with slug "{self.slug}" is already exists.')  
          
-        if len(category_path) != len(set(category_path)):
+        if len(category_path) != len(set(category_path)) or (self.id is not None and self.id in ancestor_ids):
             raise ValidationError(f"Category '{self.title}' can't be its own subcategory due to a conflict with '{self.parent}'.")
-        
-        if len(category_path) > 3:
+
+        levels = len(category_path)
+        if self.id is not None:
+            deepest = Category.objects.subtree(self).aggregate(deepest=models.Max('depth'))['deepest']
+            levels += deepest - self.depth
+        if levels > self.MAX_LEVELS:
             raise ValidationError(f"You can't make category '{self.title}' as 4th subcategory, Use tags to make subcategories.'")
 
         return super().clean()
 
+    def save(self, *args, **kwargs):
+        self.path, self.ancestor_ids = self.build_tree_fields()
+        self.depth = len(self.ancestor_ids)
+        stored_tree = getattr(self, '_stored_tree', None)
+        moved = stored_tree is not None and stored_tree != (self.path, self.ancestor_ids)
+
+        super().save(*args, **kwargs)
+        self._stored_tree = (self.path, self.ancestor_ids)
+        if moved:
+            self.rebuild_subtree()
+
+    def rebuild_subtree(self):
+        """
+        Rewrite the path, depth, ancestors and slug of every descendant
+        in bulk after this category was renamed or moved.
+        """
+        descendants = list(
+                        Category.objects.subtree(self)
+                        .exclude(pk=self.pk)
+                        .order_by('depth')
+                        )
+        nodes = {self.pk: self}
+        for category in descendants:
+            parent = nodes[category.parent_id]
+            category.path = parent.path + [category.title.lower()]
+            category.ancestor_ids = parent.ancestor_ids + [parent.pk]
+            category.depth = len(category.ancestor_ids)
+            category.slug = slugify(category.path)
+            category._stored_tree = (category.path, category.ancestor_ids)
+            nodes[category.pk] = category
+        Category.objects.bulk_update(descendants, ['path', 'ancestor_ids', 'depth', 'slug'])
+
+    def breadcrumbs(self):
+        """
+        Return the ancestors of the category, root first,
+        followed by the category itself.
+        """
+        return [*self.ancestors(), self]
+
+    async def abreadcrumbs(self):
+        return [*[ancestor async for ancestor in self.ancestors()], self]
+
+    def ancestors(self):
+        return Category.objects.filter(pk__in=self.ancestor_ids).order_by('depth')
+
     def __str__(self):
-        full_path = self.category_full_path()
+        full_path = self.path or self.category_full_path()
         return ' -> '.join(full_path)
 
 
@@ -75,12 +163,15 @@ class Brand(models.Model):
     title = models.CharField(max_length=250)
     slug = models.SlugField(unique=True, blank=True)
     logo = models.ImageField(upload_to='brands_logo/')
+    logo_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    logo_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    logo_color = models.CharField(max_length=7, blank=True, editable=False)
 
     def __str__(self):
         return self.title
     
 
-class Product(models.Model):
+class Product(CounterFieldsMixin, models.Model):
     """
     Model representing a product in the online shop.
     """
@@ -93,9 +184,22 @@ class Product(models.Model):
                                     upload_to='products_cover_image/',
                                     default='alternative_image'
                                     )
+    cover_image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    cover_image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    cover_image_color = models.CharField(max_length=7, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+    published_comment_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = ProductQuerySet.as_manager()
+    counter_fields = ('published_comment_count',)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_active', '-created_at', '-id'], name='product_active_newest_idx'),
+        ]
 
     def get_absolute_url(self):
         return reverse("products:product_details",
@@ -105,6 +209,36 @@ class Product(models.Model):
         return self.name
     
 
+class ProductListing(models.Model):
+    """
+    Denormalized read model with one row per product, holding
+    everything a product card needs so list pages don't have to
+    aggregate variants per card.
+    """
+    product = models.OneToOneField(
+                                Product, on_delete=models.CASCADE,
+                                primary_key=True, related_name='listing'
+                                )
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    total_stock = models.PositiveIntegerField(default=0)
+    in_stock = models.BooleanField(default=False)
+    colors = models.JSONField(default=list)
+    cover_image_url = models.CharField(max_length=500, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(null=True)
+    view_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_active', 'min_price', 'product'], name='listing_active_price_idx'),
+            models.Index(fields=['is_active', '-view_count', '-product'], name='listing_active_views_idx'),
+        ]
+
+    def __str__(self):
+        return f"Listing of product {self.product_id}"
+
+
 class Color(models.Model):
     """
      Model representing a color that can be associated with product variants.
@@ -130,8 +264,12 @@ class Variant(models.Model):
                             upload_to='products_images/',
                             default='alternative_image'
                             )
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_color = models.CharField(max_length=7, blank=True, editable=False)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.PositiveIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('color', 'product')
@@ -175,7 +313,7 @@ class ProductAttributeValue(models.Model):
         return ""
 
 
-class Comment(models.Model):
+class Comment(CounterFieldsMixin, models.Model):
     PUBLISHED = 'p'
     WAITING = 'w'
     CANCELED = 'c'
@@ -192,12 +330,29 @@ class Comment(models.Model):
     content = models.TextField()
     status = models.CharField(max_length=1, choices=PUBLISH_STATUS, default=WAITING)
     created_at = models.DateTimeField(auto_now_add=True)
+    reply_count = models.PositiveIntegerField(default=0, editable=False)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
+    spam_score = models.FloatField(null=True, blank=True, editable=False)
 
-    objects = models.Manager()
+    objects = CommentManager()
     published_comments_manager = PublishedCommentsManger()
+    counter_fields = ('reply_count',)
 
     class Meta:
         ordering = ['-created_at']  # Show latest comments first
+        indexes = [
+            models.Index(fields=['status', 'created_at', 'id'], name='comment_moderation_idx'),
+            models.Index(
+                fields=['id'],
+                condition=models.Q(status='w', spam_score__isnull=True),
+                name='comment_unscored_idx',
+            ),
+            models.Index(
+                fields=['product', 'status', '-created_at', '-id'],
+                condition=models.Q(parent__isnull=True),
+                name='comment_thread_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Comment by {self.user.username} on {self.product.name}"
@@ -210,3 +365,32 @@ class Comment(models.Model):
     
     def get_absolute_url(self):
         return reverse("products:product_details", kwargs={"product_slug": self.product.slug})
+
+
+class ImageDerivative(models.Model):
+    """
+    A resized copy of an uploaded image, generated in the background.
+    ``file`` stays empty until the worker has written it.
+    """
+    WEBP = 'webp'
+    JPEG = 'jpeg'
+
+    FORMATS = [
+        (WEBP, 'WebP'),
+        (JPEG, 'JPEG'),
+    ]
+
+    source = models.CharField(max_length=255)
+    width = models.PositiveIntegerField()
+    format = models.CharField(max_length=4, choices=FORMATS)
+    file = models.ImageField(upload_to='derivatives/', blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('source', 'width', 'format')
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(file=''), name='image_derivative_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.source} ({self.width}w {self.format})"
@@ -0,0 +1,87 @@
+import json
+
+from django.conf import settings
+from django.db import connections
+
+from .comments import set_comments_status
+from .models import Comment
+from .pagination import KeysetPaginator
+
+
+def estimated_count(queryset):
+    """
+    Return the planner's row estimate for the queryset on PostgreSQL,
+    which costs nothing compared to a COUNT(*) over a huge table.
+    Other databases get an exact count.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']['Plan Rows']
+
+
+class ModerationQueue:
+    """
+    Comments of one status, oldest first, keyset paginated over
+    the (status, created_at, id) index.
+    """
+    ordering = ('created_at', 'id')
+
+    def __init__(self, status=Comment.WAITING, per_page=None):
+        self.status = status
+        self.queryset = (
+            Comment.objects.filter(status=status)
+            .select_related('user', 'product', 'parent')
+        )
+        self.paginator = KeysetPaginator(
+                                        self.queryset, self.ordering,
+                                        per_page or settings.PRODUCT_MODERATION_PER_PAGE
+                                        )
+
+    def page(self, cursor=None):
+        return self.paginator.page(cursor)
+
+    def estimated_count(self):
+        return estimated_count(Comment.objects.filter(status=self.status))
+
+    def moderate_all(self, status, until, chunk_size=None):
+        """
+        Move every comment in the queue created up to ``until`` to
+        ``status``, a chunk at a time from the front of the queue.
+        Returns the number of comments changed.
+        """
+        if status == self.status:
+            return 0
+        chunk_size = chunk_size or settings.PRODUCT_MODERATION_CHUNK_SIZE
+        front = (
+            Comment.objects.filter(status=self.status, created_at__lte=until)
+            .order_by(*self.ordering)
+            .values_list('pk', flat=True)
+        )
+        changed = 0
+        while True:
+            chunk = list(front[:chunk_size])
+            if not chunk:
+                return changed
+            changed += set_comments_status(Comment.objects.filter(pk__in=chunk), status)
+
+
+def moderate_comments(comment_ids, status, chunk_size=None):
+    """
+    Set the status of the given comments in chunks, each its own short
+    transaction, so a large backlog never holds locks for long.
+    Returns the number of comments changed.
+    """
+    chunk_size = chunk_size or settings.PRODUCT_MODERATION_CHUNK_SIZE
+    comment_ids = list(comment_ids)
+    changed = 0
+    for start in range(0, len(comment_ids), chunk_size):
+        chunk = comment_ids[start:start + chunk_size]
+        changed += set_comments_status(Comment.objects.filter(pk__in=chunk), status)
+    return changed
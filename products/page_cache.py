@@ -0,0 +1,221 @@
+import asyncio
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse, QueryDict
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe, urlencode
+
+from .versioning import CATALOG_VERSION_KEY, aget_versions, get_versions
+
+
+def page_cache_key(request):
+    """
+    Key a page on its path and query params, in a fixed order, so the
+    same page is stored once however its params are ordered.
+    """
+    params = sorted((name, sorted(values)) for name, values in request.GET.lists())
+    url = f'{request.path}?{urlencode(params, doseq=True)}'
+    return f'products:page:{hashlib.md5(url.encode()).hexdigest()}'
+
+
+class AnonymousPageCacheMixin:
+    """
+    Serve anonymous GET requests from a shared full-page cache.
+
+    Every entry remembers the version counters it was rendered
+    from. Once one of them is bumped, or the entry is older than
+    ``PRODUCT_PAGE_CACHE_TIMEOUT``, the entry goes stale: one request
+    takes a short lock and renders the page again, while everyone
+    else keeps getting the stale copy. A page that isn't cached at
+    all is rendered under the same lock, and the other requests wait
+    up to ``page_cache_lock_wait`` seconds for it before rendering it
+    themselves. Async views go through the same steps with the
+    cache's async methods.
+    """
+    page_cache_lock_timeout = 30
+    # The query params the page depends on. Any others are dropped
+    # before the view runs, so junk and tracking params can neither
+    # bypass the cache nor fill it with copies of the same page.
+    page_cache_params = ()
+    page_cache_lock_wait = 2
+    page_cache_poll_interval = 0.05
+
+    def get_page_cache_version_keys(self):
+        """
+        Return the version keys the rendered page depends on.
+        Called after rendering, so the view's objects are loaded.
+        """
+        return [CATALOG_VERSION_KEY]
+
+    def get_page_cache_meta(self):
+        """
+        Return extra data stored with the entry and handed
+        back to ``page_cache_hit()`` when it is served.
+        """
+        return {}
+
+    def page_cache_hit(self, meta):
+        pass
+
+    async def apage_cache_hit(self, meta):
+        self.page_cache_hit(meta)
+
+    def is_page_cache_param(self, name):
+        return name in self.page_cache_params
+
+    def get_page_cache_query(self, query):
+        params = QueryDict(mutable=True)
+        for name, values in query.lists():
+            if self.is_page_cache_param(name):
+                params.setlist(name, values)
+        params._mutable = False
+        return params
+
+    def can_cache_page(self, request):
+        return (
+            request.method == 'GET'
+            and not request.user.is_authenticated
+            and not len(get_messages(request))
+        )
+
+    def can_store_page(self, request, response):
+        # A page that used the CSRF token or sets cookies
+        # belongs to a single visitor.
+        return (
+            response.status_code == 200
+            and not response.cookies
+            and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+        )
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self.apage_cache_dispatch(request, *args, **kwargs)
+        if not self.can_cache_page(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        request.GET = self.get_page_cache_query(request.GET)
+        key = page_cache_key(request)
+        lock_key = f'{key}:lock'
+        entry = cache.get(key)
+        if entry is not None and self.is_fresh(entry):
+            return self.serve_page(request, entry)
+        locked = cache.add(lock_key, 1, self.page_cache_lock_timeout)
+        if not locked:
+            entry = entry or self.wait_for_page(key)
+            if entry is not None:
+                return self.serve_page(request, entry)
+
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+            if self.can_store_page(request, response):
+                self.store_page(key, response)
+        finally:
+            if locked:
+                cache.delete(lock_key)
+        return response
+
+    async def apage_cache_dispatch(self, request, *args, **kwargs):
+        if not self.can_cache_page(request):
+            return await super().dispatch(request, *args, **kwargs)
+
+        request.GET = self.get_page_cache_query(request.GET)
+        key = page_cache_key(request)
+        lock_key = f'{key}:lock'
+        entry = await cache.aget(key)
+        if entry is not None and await self.ais_fresh(entry):
+            return await self.aserve_page(request, entry)
+        locked = await cache.aadd(lock_key, 1, self.page_cache_lock_timeout)
+        if not locked:
+            entry = entry or await self.await_for_page(key)
+            if entry is not None:
+                return await self.aserve_page(request, entry)
+
+        try:
+            response = await super().dispatch(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+            if self.can_store_page(request, response):
+                await self.astore_page(key, response)
+        finally:
+            if locked:
+                await cache.adelete(lock_key)
+        return response
+
+    def serve_page(self, request, entry):
+        self.page_cache_hit(entry['meta'])
+        return self.build_cached_response(request, entry)
+
+    async def aserve_page(self, request, entry):
+        await self.apage_cache_hit(entry['meta'])
+        return self.build_cached_response(request, entry)
+
+    def wait_for_page(self, key):
+        """
+        Poll for the entry another request is rendering. Returns None
+        if it doesn't show up in time, e.g. because the page turned
+        out not to be cacheable.
+        """
+        deadline = time.monotonic() + self.page_cache_lock_wait
+        while time.monotonic() < deadline:
+            time.sleep(self.page_cache_poll_interval)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry
+        return None
+
+    async def await_for_page(self, key):
+        """
+        Async version of ``wait_for_page()``.
+        """
+        deadline = time.monotonic() + self.page_cache_lock_wait
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.page_cache_poll_interval)
+            entry = await cache.aget(key)
+            if entry is not None:
+                return entry
+        return None
+
+    def is_fresh(self, entry):
+        if entry['expires'] < time.time():
+            return False
+        return get_versions(list(entry['versions'])) == entry['versions']
+
+    async def ais_fresh(self, entry):
+        if entry['expires'] < time.time():
+            return False
+        return await aget_versions(list(entry['versions'])) == entry['versions']
+
+    def store_page(self, key, response):
+        entry = self.page_cache_entry(response, get_versions(self.get_page_cache_version_keys()))
+        cache.set(key, entry, settings.PRODUCT_PAGE_CACHE_STALE_TIMEOUT)
+
+    async def astore_page(self, key, response):
+        entry = self.page_cache_entry(response, await aget_versions(self.get_page_cache_version_keys()))
+        await cache.aset(key, entry, settings.PRODUCT_PAGE_CACHE_STALE_TIMEOUT)
+
+    def page_cache_entry(self, response, versions):
+        return {
+            'content': response.content,
+            'headers': dict(response.headers),
+            'versions': versions,
+            'meta': self.get_page_cache_meta(),
+            'expires': time.time() + settings.PRODUCT_PAGE_CACHE_TIMEOUT,
+        }
+
+    def build_cached_response(self, request, entry):
+        response = HttpResponse(entry['content'])
+        for header, value in entry['headers'].items():
+            response[header] = value
+        last_modified = response.get('Last-Modified')
+        return get_conditional_response(
+            request,
+            etag=response.get('ETag'),
+            last_modified=last_modified and parse_http_date_safe(last_modified),
+            response=response,
+        )
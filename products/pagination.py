@@ -0,0 +1,172 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """
+    JSON encoder that keeps full microsecond precision on datetimes,
+    which DjangoJSONEncoder truncates to milliseconds.
+    """
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class InvalidCursor(Exception):
+    """
+    Raised when a cursor token can't be decoded or
+    was issued for a different ordering.
+    """
+
+
+class KeysetPage:
+    """
+    A single page of a keyset paginated queryset.
+    """
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset by seeking past the ordering key of the last
+    row seen instead of using OFFSET, so deep pages cost the same as
+    the first one.
+
+    ``ordering`` must end with a unique field (usually ``id``) to make
+    the order total. Cursors are opaque url-safe tokens that carry the
+    key values of the boundary row and the direction to move in.
+    """
+    NEXT = 'n'
+    PREVIOUS = 'p'
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+
+    @property
+    def signature(self):
+        return ','.join(self.ordering)
+
+    def page(self, cursor=None):
+        """
+        Return the page that starts after (or ends before) ``cursor``.
+        """
+        queryset, backwards = self._page_queryset(cursor)
+        return self._build_page(list(queryset), cursor, backwards)
+
+    async def apage(self, cursor=None):
+        """
+        Async version of ``page()``.
+        """
+        queryset, backwards = self._page_queryset(cursor)
+        return self._build_page([row async for row in queryset], cursor, backwards)
+
+    def _page_queryset(self, cursor):
+        if not cursor:
+            return self.queryset.order_by(*self.ordering)[:self.per_page + 1], False
+
+        direction, values = self.decode_cursor(cursor)
+        backwards = direction == self.PREVIOUS
+        ordering = self._reverse(self.ordering) if backwards else self.ordering
+        queryset = self.queryset.filter(self._seek_filter(ordering, values))
+        return queryset.order_by(*ordering)[:self.per_page + 1], backwards
+
+    def _build_page(self, rows, cursor, backwards):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if not cursor:
+            next_cursor = self.encode_cursor(rows[-1], self.NEXT) if has_more else None
+            return KeysetPage(rows, next_cursor=next_cursor)
+        if backwards:
+            rows.reverse()
+            next_cursor = self.encode_cursor(rows[-1], self.NEXT) if rows else None
+            previous_cursor = self.encode_cursor(rows[0], self.PREVIOUS) if has_more else None
+        else:
+            next_cursor = self.encode_cursor(rows[-1], self.NEXT) if has_more else None
+            previous_cursor = self.encode_cursor(rows[0], self.PREVIOUS) if rows else None
+        return KeysetPage(rows, next_cursor=next_cursor, previous_cursor=previous_cursor)
+
+    def encode_cursor(self, obj, direction):
+        values = [self._get_value(obj, field.lstrip('-')) for field in self.ordering]
+        payload = json.dumps(
+                            {'o': self.signature, 'd': direction, 'v': values},
+                            cls=CursorEncoder, separators=(',', ':')
+                            )
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            direction, values = payload['d'], payload['v']
+            signature = payload['o']
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise InvalidCursor('Malformed cursor.')
+
+        if signature != self.signature:
+            raise InvalidCursor('Cursor was issued for a different ordering.')
+        if direction not in (self.NEXT, self.PREVIOUS):
+            raise InvalidCursor('Unknown cursor direction.')
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise InvalidCursor('Cursor does not match the ordering.')
+        return direction, values
+
+    @staticmethod
+    def _get_value(obj, field):
+        value = obj
+        for attr in field.split('__'):
+            value = getattr(value, attr)
+        return value
+
+    @staticmethod
+    def _reverse(ordering):
+        return tuple(
+                    field[1:] if field.startswith('-') else f'-{field}'
+                    for field in ordering
+                    )
+
+    @staticmethod
+    def _seek_filter(ordering, values):
+        """
+        Build ``(a, b, c) > (x, y, z)`` as an OR of prefix equalities,
+        honouring the direction of every field. The leading non-strict
+        bound lets the database range-scan the index on the first field.
+        """
+        fields = [field.lstrip('-') for field in ordering]
+        lookups = ['lt' if field.startswith('-') else 'gt' for field in ordering]
+
+        seek = Q()
+        for position, (field, lookup) in enumerate(zip(fields, lookups)):
+            condition = Q(**{f'{field}__{lookup}': values[position]})
+            for previous_field, previous_value in zip(fields[:position], values[:position]):
+                condition &= Q(**{previous_field: previous_value})
+            seek |= condition
+
+        leading = Q(**{f'{fields[0]}__{lookups[0]}e': values[0]})
+        return leading & seek
@@ -0,0 +1,213 @@
+import hashlib
+import re
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils.module_loading import import_string
+
+from .comments import set_comments_status
+from .models import Comment
+
+
+def content_hash(content):
+    """
+    Hash the comment text with case and whitespace normalized, so
+    trivially edited copies of the same text still collide.
+    """
+    normalized = ' '.join(content.lower().split())
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+class Scorer:
+    """
+    Base class of the comment scorers. ``prepare()`` runs once per batch
+    so a scorer can load what it needs in bulk, then ``score()`` returns
+    a spam score between 0 (clean) and 1 (certainly spam) per comment.
+    """
+    def prepare(self, comments):
+        pass
+
+    def score(self, comment):
+        raise NotImplementedError
+
+
+class DuplicateScorer(Scorer):
+    """
+    Flag comments whose text was already posted before, in this batch
+    or earlier. Short texts such as "thanks!" are allowed to repeat.
+    """
+    min_length = 20
+
+    def prepare(self, comments):
+        hashes = {comment.content_hash for comment in comments}
+        self.first_ids = dict(
+            Comment.objects.filter(content_hash__in=hashes)
+            .order_by().values('content_hash').annotate(first=Min('id'))
+            .values_list('content_hash', 'first')
+        )
+        for comment in comments:
+            first = self.first_ids.get(comment.content_hash)
+            if first is None or comment.id < first:
+                self.first_ids[comment.content_hash] = comment.id
+
+    def score(self, comment):
+        if len(comment.content.strip()) < self.min_length:
+            return 0.0
+        return 1.0 if self.first_ids[comment.content_hash] < comment.id else 0.0
+
+
+class LinkDensityScorer(Scorer):
+    """
+    Score by the share of words that are links; one link in every
+    ``words_per_link`` words or more scores 1.
+    """
+    link_pattern = re.compile(r'https?://|www\.', re.IGNORECASE)
+    words_per_link = 5
+
+    def score(self, comment):
+        links = len(self.link_pattern.findall(comment.content))
+        words = max(len(comment.content.split()), 1)
+        return min(1.0, links * self.words_per_link / words)
+
+
+class UserRateScorer(Scorer):
+    """
+    Score users posting more than ``PRODUCT_COMMENT_RATE_LIMIT``
+    comments in the hour up to each comment, reaching 1 at twice the
+    limit. The window follows ``created_at`` rather than the clock, so
+    an old backlog is scored by how fast it was written.
+    """
+    window = timedelta(hours=1)
+
+    def prepare(self, comments):
+        self.limit = settings.PRODUCT_COMMENT_RATE_LIMIT
+        self.times = defaultdict(list)
+        if not comments:
+            return
+        rows = (
+            Comment.objects.filter(
+                user__in={comment.user_id for comment in comments},
+                created_at__gte=min(comment.created_at for comment in comments) - self.window,
+                created_at__lte=max(comment.created_at for comment in comments),
+            )
+            .order_by('created_at').values_list('user', 'created_at')
+        )
+        for user_id, created_at in rows:
+            self.times[user_id].append(created_at)
+
+    def score(self, comment):
+        times = self.times[comment.user_id]
+        total = (
+            bisect_right(times, comment.created_at)
+            - bisect_left(times, comment.created_at - self.window)
+        )
+        excess = total - self.limit
+        return min(1.0, max(excess, 0) / self.limit)
+
+
+class PhraseAutomaton:
+    """
+    Aho-Corasick automaton that counts the occurrences of many
+    phrases in a single pass over the text, case-insensitively.
+    """
+    def __init__(self, phrases):
+        self.goto = [{}]
+        self.fail = [0]
+        self.matches = [0]
+        for phrase in phrases:
+            node = 0
+            for char in phrase.lower():
+                if char not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.matches.append(0)
+                    self.goto[node][char] = len(self.goto) - 1
+                node = self.goto[node][char]
+            self.matches[node] += 1
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.matches[child] += self.matches[self.fail[child]]
+
+    def count(self, text):
+        node = 0
+        found = 0
+        for char in text.lower():
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            found += self.matches[node]
+        return found
+
+
+class BannedPhraseScorer(Scorer):
+    """
+    Score 1 for any comment containing one of
+    ``PRODUCT_COMMENT_BANNED_PHRASES``.
+    """
+    def __init__(self):
+        self.automaton = PhraseAutomaton(settings.PRODUCT_COMMENT_BANNED_PHRASES)
+
+    def score(self, comment):
+        return 1.0 if self.automaton.count(comment.content) else 0.0
+
+
+def get_scorers():
+    return [import_string(path)() for path in settings.PRODUCT_COMMENT_SCORERS]
+
+
+def score_comments(comments, scorers):
+    """
+    Hash and score the comments in place, keeping the worst score any
+    scorer gave. Returns the ids to auto-publish and to auto-cancel.
+    """
+    for comment in comments:
+        comment.content_hash = content_hash(comment.content)
+    for scorer in scorers:
+        scorer.prepare(comments)
+
+    publish, cancel = [], []
+    for comment in comments:
+        comment.spam_score = max((scorer.score(comment) for scorer in scorers), default=0.0)
+        if comment.spam_score >= settings.PRODUCT_COMMENT_CANCEL_SCORE:
+            cancel.append(comment.id)
+        elif comment.spam_score <= settings.PRODUCT_COMMENT_PUBLISH_SCORE:
+            publish.append(comment.id)
+    return publish, cancel
+
+
+def score_pending_comments(batch_size=500):
+    """
+    Score every waiting comment that has no score yet, a batch at a time,
+    and publish or cancel the ones past the thresholds. Comments in
+    between stay waiting for a moderator. Returns the number scored.
+    """
+    scorers = get_scorers()
+    total = 0
+    while True:
+        comments = list(
+                    Comment.objects.filter(status=Comment.WAITING, spam_score__isnull=True)
+                    .order_by('id')
+                    .only('id', 'user_id', 'content', 'created_at')[:batch_size]
+                    )
+        if not comments:
+            return total
+        publish, cancel = score_comments(comments, scorers)
+        with transaction.atomic():
+            Comment.objects.bulk_update(comments, ['content_hash', 'spam_score'])
+            # A moderator may have got there first; leave those alone.
+            waiting = Comment.objects.filter(status=Comment.WAITING)
+            set_comments_status(waiting.filter(pk__in=publish), Comment.PUBLISHED)
+            set_comments_status(waiting.filter(pk__in=cancel), Comment.CANCELED)
+        total += len(comments)
@@ -0,0 +1,86 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, FloatField
+from django.db.models.expressions import RawSQL
+
+from .models import Product
+
+
+class PostgresSearchBackend:
+    """
+    Full-text search over the ``search_vector`` column of products,
+    backed by a GIN index.
+    """
+    def update(self, product):
+        config = settings.PRODUCT_SEARCH_CONFIG
+        Product.objects.filter(pk=product.pk).update(
+            search_vector=(
+                SearchVector('name', weight='A', config=config)
+                + SearchVector('description', weight='B', config=config)
+            )
+        )
+
+    def remove(self, product_id):
+        pass
+
+    def search(self, queryset, query):
+        search_query = SearchQuery(query, search_type='websearch', config=settings.PRODUCT_SEARCH_CONFIG)
+        return (
+            queryset.filter(search_vector=search_query)
+            .annotate(rank=SearchRank(F('search_vector'), search_query))
+            .order_by('-rank', '-id')
+        )
+
+
+class SqliteSearchBackend:
+    """
+    FTS5 fallback used for local runs and tests. The index lives in the
+    ``products_product_fts`` virtual table, keyed by product id.
+    """
+    table = 'products_product_fts'
+
+    def update(self, product):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [product.pk])
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, name, description) VALUES (%s, %s, %s)',
+                [product.pk, product.name, product.description],
+            )
+
+    def remove(self, product_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [product_id])
+
+    @staticmethod
+    def match_expression(query):
+        """
+        Quote every word so user input can't inject FTS5 query syntax.
+        """
+        return ' '.join('"%s"' % word for word in re.findall(r'\w+', query))
+
+    def search(self, queryset, query):
+        match = self.match_expression(query)
+        if not match:
+            return queryset.none()
+        # bm25() is lower for better matches and weighs name over description.
+        rank = RawSQL(
+            f'SELECT -bm25({self.table}, 10.0, 1.0) FROM {self.table} '
+            f'WHERE {self.table} MATCH %s AND rowid = products_product.id',
+            [match],
+            output_field=FloatField(),
+        )
+        matches = RawSQL(f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s', [match])
+        return (
+            queryset.filter(pk__in=matches)
+            .annotate(rank=rank)
+            .order_by('-rank', '-id')
+        )
+
+
+def get_search_backend():
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return SqliteSearchBackend()
@@ -0,0 +1,185 @@
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .comments import adjust_published_comment_count, adjust_reply_count, counts_as_review
+from .images import IMAGE_FIELDS, enqueue_image_derivatives, image_metadata, record_image_metadata
+from .listing import refresh_listings
+from .models import Attribute, Brand, Category, Color, Comment, Product, ProductAttributeValue, Variant
+from .search import get_search_backend
+from .versioning import (
+                        CATALOG_VERSION_KEY,
+                        bump_categories,
+                        bump_product_categories,
+                        bump_products,
+                        bump_version
+                        )
+
+
+@receiver(post_save, sender=Product)
+@receiver(pre_delete, sender=Product)
+def product_changed(sender, instance, **kwargs):
+    bump_product_categories([instance.pk])
+    bump_products([instance.pk])
+
+
+@receiver(post_save, sender=Product)
+def update_search_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        get_search_backend().update(instance)
+
+
+@receiver(post_delete, sender=Product)
+def remove_from_search_index(sender, instance, **kwargs):
+    get_search_backend().remove(instance.pk)
+
+
+@receiver(post_save, sender=Variant)
+@receiver(post_delete, sender=Variant)
+@receiver(post_save, sender=ProductAttributeValue)
+@receiver(post_delete, sender=ProductAttributeValue)
+def product_detail_changed(sender, instance, **kwargs):
+    bump_product_categories([instance.product_id])
+    previous_product_id = getattr(instance, '_previous_product_id', None)
+    bump_products([product_id for product_id in (instance.product_id, previous_product_id) if product_id])
+
+
+@receiver(m2m_changed, sender=Product.category.through)
+def product_categories_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        if reverse:
+            bump_categories([instance.pk])
+        else:
+            bump_product_categories([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        bump_categories([instance.pk] if reverse else pk_set)
+
+
+def deleted_with_product(origin):
+    """
+    Return True if a deletion cascades from deleting products,
+    in which case there is nothing left to refresh.
+    """
+    if isinstance(origin, QuerySet):
+        return origin.model is Product
+    return isinstance(origin, Product)
+
+
+@receiver(post_save, sender=Product)
+def product_listing_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        refresh_listings([instance.pk])
+
+
+@receiver(pre_save, sender=Product)
+@receiver(pre_save, sender=Variant)
+@receiver(pre_save, sender=Brand)
+def image_uploaded(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record_image_metadata(getattr(instance, IMAGE_FIELDS[sender]))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Variant)
+@receiver(post_save, sender=Brand)
+def queue_image_derivatives(sender, instance, raw=False, **kwargs):
+    if not raw:
+        image = getattr(instance, IMAGE_FIELDS[sender])
+        enqueue_image_derivatives(image.name, image_metadata(image)[0])
+
+
+@receiver(pre_save, sender=Variant)
+def remember_variant_product(sender, instance, raw=False, **kwargs):
+    if not raw and instance.pk is not None:
+        instance._previous_product_id = (
+            Variant.objects.filter(pk=instance.pk)
+            .values_list('product_id', flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Variant)
+@receiver(post_delete, sender=Variant)
+def variant_listing_changed(sender, instance, raw=False, origin=None, **kwargs):
+    if raw or deleted_with_product(origin):
+        return
+    product_ids = {instance.product_id, getattr(instance, '_previous_product_id', None)}
+    refresh_listings([product_id for product_id in product_ids if product_id])
+
+
+@receiver(post_save, sender=Color)
+def color_listing_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        product_ids = list(instance.color_variants.values_list('product_id', flat=True))
+        refresh_listings(product_ids)
+        bump_products(product_ids)
+
+
+@receiver(post_save, sender=Attribute)
+def attribute_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_products(instance.values.values_list('product_id', flat=True))
+
+
+@receiver(pre_save, sender=Comment)
+def remember_comment_state(sender, instance, raw=False, **kwargs):
+    if not raw and instance.pk is not None:
+        previous = Comment.objects.filter(pk=instance.pk).values_list('status', 'parent_id').first()
+        if previous is not None:
+            instance._previous_status, instance._previous_parent_id = previous
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, raw=False, origin=None, **kwargs):
+    """
+    Only published comments are rendered, so waiting ones
+    can come and go without invalidating the product. Reviews
+    also change the count on the product cards of the listings.
+    """
+    if raw or deleted_with_product(origin):
+        return
+    statuses = {instance.status, getattr(instance, '_previous_status', None)}
+    if Comment.PUBLISHED in statuses:
+        bump_products([instance.product_id])
+        parent_ids = {instance.parent_id, getattr(instance, '_previous_parent_id', instance.parent_id)}
+        if None in parent_ids:
+            bump_product_categories([instance.product_id])
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved_counts(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        previous_status = previous_parent_id = None
+    else:
+        previous_status = getattr(instance, '_previous_status', instance.status)
+        previous_parent_id = getattr(instance, '_previous_parent_id', instance.parent_id)
+
+    if instance.parent_id != previous_parent_id:
+        if previous_parent_id is not None:
+            adjust_reply_count(previous_parent_id, -1)
+        if instance.parent_id is not None:
+            adjust_reply_count(instance.parent_id, 1)
+    adjust_published_comment_count(
+        instance.product_id,
+        counts_as_review(instance.status, instance.parent_id)
+        - counts_as_review(previous_status, previous_parent_id),
+    )
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted_counts(sender, instance, origin=None, **kwargs):
+    if deleted_with_product(origin):
+        return
+    if instance.parent_id is not None:
+        adjust_reply_count(instance.parent_id, -1)
+    if counts_as_review(instance.status, instance.parent_id):
+        adjust_published_comment_count(instance.product_id, -1)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    bump_version(CATALOG_VERSION_KEY)
@@ -1,9 +1,76 @@
-# from django import template
+from django import template
+from django.utils.html import format_html
 
+from ..category_tree import get_category_product_counts, get_category_tree
+from ..images import PLACEHOLDER_IMAGE, get_image_derivatives, image_metadata
+from ..models import ImageDerivative
 
-# register = template.Library()
 
+register = template.Library()
 
-# @register.filter
-# def get_item(dictionary, key):
-#     return dictionary.get(key)
\ No newline at end of file
+
+@register.inclusion_tag('products/category_menu.html', takes_context=True)
+def category_menu(context):
+    """
+    Render the nested category menu with product counts, from the
+    request when an async view has loaded them already.
+    """
+    request = context.get('request')
+    tree = getattr(request, 'category_tree', None)
+    if tree is None:
+        tree = get_category_tree()
+    counts = getattr(request, 'category_counts', None)
+    if counts is None:
+        counts = get_category_product_counts()
+    return {
+        'menu': [_menu_item(node, counts) for node in tree.roots],
+    }
+
+
+def _menu_item(node, counts):
+    return {
+        'node': node,
+        'count': counts.get(node.id, 0),
+        'children': [_menu_item(child, counts) for child in node.children],
+    }
+
+
+def _srcset(derivatives):
+    return ', '.join(f'{url} {width}w' for width, url in derivatives)
+
+
+@register.simple_tag
+def responsive_image(image, alt='', sizes='100vw'):
+    """
+    Render a lazy-loaded image with WebP and JPEG ``srcset``s of its
+    derivatives, or just the original until they are generated. The
+    recorded size and color reserve its space while it loads.
+    Derivatives an async view loaded onto the image are used as is.
+    """
+    if not image:
+        return ''
+    width, height, color = image_metadata(image)
+    placeholder = format_html(
+        '{}{}',
+        format_html(' width="{}" height="{}"', width, height) if width and height else '',
+        format_html(' style="background-color: {}"', color) if color else '',
+    )
+    derivatives = getattr(image, 'derivatives', None)
+    if derivatives is None:
+        derivatives = {} if image.name == PLACEHOLDER_IMAGE else get_image_derivatives(image.name)
+    if not derivatives:
+        return format_html(
+            '<img src="{}"{} alt="{}" loading="lazy" decoding="async">', image.url, placeholder, alt
+        )
+
+    webp = derivatives.get(ImageDerivative.WEBP)
+    jpeg = derivatives.get(ImageDerivative.JPEG)
+    return format_html(
+        '<picture>{}<img src="{}"{} sizes="{}"{} alt="{}" loading="lazy" decoding="async"></picture>',
+        format_html('<source type="image/webp" srcset="{}" sizes="{}">', _srcset(webp), sizes) if webp else '',
+        image.url,
+        format_html(' srcset="{}"', _srcset(jpeg)) if jpeg else '',
+        sizes,
+        placeholder,
+        alt,
+    )
@@ -0,0 +1,14 @@
+from django.urls import include, path
+
+from core.views import csrf_token
+
+from ..urls import app_name, get_urlpatterns
+
+
+ASYNC_VIEWS = ['home', 'product_list', 'product_list_by_brand', 'product_details', 'comment_create']
+
+urlpatterns = [
+    path('', include((get_urlpatterns(ASYNC_VIEWS), app_name))),
+    path('accounts/', include('accounts.urls')),
+    path('csrf-token/', csrf_token, name='csrf_token'),
+]
@@ -0,0 +1,136 @@
+import asyncio
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from ..async_views import AsyncHomeView, AsyncProductListView
+from ..models import Comment, Variant
+from ..page_cache import page_cache_key
+from ..urls import get_urlpatterns
+from ..views import HomeView, ProductListView
+from . test_mixins import ColorModelSetupMixin, CommentModelSetupMixin
+
+
+@override_settings(ROOT_URLCONF='products.tests.async_urls')
+class AsyncViewsTest(ColorModelSetupMixin, CommentModelSetupMixin, TestCase):
+    """
+    Tests for the async catalog views. Any synchronous query they make
+    on the event loop fails the request.
+    """
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.comment_1.status = Comment.PUBLISHED
+        self.comment_1.save()
+        Variant.objects.create(product=self.product, color=self.color, price=120, stock=1)
+        self.list_url = reverse('products:product_list', kwargs={'cat_slug': self.category.slug})
+        self.detail_url = reverse('products:product_details', kwargs={'product_slug': self.product.slug})
+        self.comment_url = reverse('products:comment_create', kwargs={'product_slug': self.product.slug})
+
+    def test_urls_select_the_async_views(self):
+        views = {pattern.name: pattern.callback.view_class for pattern in get_urlpatterns(['home'])}
+        self.assertIs(views['home'], AsyncHomeView)
+        self.assertIs(views['product_list'], ProductListView)
+        views = {pattern.name: pattern.callback.view_class for pattern in get_urlpatterns()}
+        self.assertIs(views['home'], HomeView)
+
+    def test_pages_match_the_sync_views(self):
+        for url in (reverse('products:home'), self.list_url, self.detail_url):
+            with override_settings(ROOT_URLCONF='config.urls'):
+                cache.clear()
+                expected = self.client.get(url)
+            cache.clear()
+            response = async_to_sync(self.async_client.get)(url)
+            self.assertTrue(response.resolver_match.func.view_class.view_is_async)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.content, expected.content)
+
+    async def test_list_view(self):
+        response = await self.async_client.get(self.list_url, {'sort': 'price_asc'})
+        self.assertIs(response.resolver_match.func.view_class, AsyncProductListView)
+        self.assertEqual(list(response.context['products']), [self.product])
+        self.assertEqual(response.context['breadcrumbs'], [self.category])
+        self.assertIn('</static/css/main.css>; rel=preload; as=style', response.headers['Link'])
+
+        response = await self.async_client.get(self.list_url, {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.get(reverse('products:product_list', kwargs={'cat_slug': 'missing'}))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_templates_render_off_the_event_loop(self):
+        def render(*args, **kwargs):
+            with self.assertRaises(RuntimeError):
+                asyncio.get_running_loop()
+            return render_to_string(*args, **kwargs)
+
+        with mock.patch('products.async_views.render_to_string', side_effect=render) as patched:
+            response = await self.async_client.get(self.list_url)
+        self.assertEqual(response.status_code, 200)
+        patched.assert_called_once()
+
+    async def test_home_skips_the_menu_queries(self):
+        response = await self.async_client.get(reverse('products:home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(hasattr(response.asgi_request, 'category_tree'))
+        response = await self.async_client.get(self.list_url)
+        self.assertTrue(hasattr(response.asgi_request, 'category_tree'))
+
+    async def test_anonymous_pages_are_cached(self):
+        await self.async_client.get(self.list_url)
+        self.assertIsNotNone(await cache.aget(page_cache_key(RequestFactory().get(self.list_url))))
+
+    async def test_cold_page_waits_for_the_request_rendering_it(self):
+        key = page_cache_key(RequestFactory().get(self.list_url))
+        await self.async_client.get(self.list_url)
+        entry = await cache.aget(key)
+        await cache.adelete(key)
+        await cache.aadd(f'{key}:lock', 1)
+
+        async def render_elsewhere(delay):
+            await cache.aset(key, entry)
+
+        with mock.patch('products.page_cache.asyncio.sleep', side_effect=render_elsewhere):
+            response = await self.async_client.get(self.list_url)
+        self.assertEqual(response.content, entry['content'])
+        self.assertIsNone(response.context)
+
+    async def test_detail_view(self):
+        await self.async_client.aforce_login(self.user_1)
+        response = await self.async_client.get(self.detail_url)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        comments = list(response.context['comment_thread'].page)
+        self.assertEqual(comments, [self.comment_1])
+        self.assertEqual(comments[0].thread_replies, [self.comment_2])
+
+        response = await self.async_client.get(self.detail_url, headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_comment_creation(self):
+        await self.async_client.aforce_login(self.user_1)
+        response = await self.async_client.post(self.comment_url, {'content': 'An async comment.'})
+        self.assertRedirects(response, self.detail_url, fetch_redirect_response=False)
+        comment = await Comment.objects.select_related('user').aget(content='An async comment.')
+        self.assertEqual((comment.product_id, comment.user), (self.product.pk, self.user_1))
+        self.assertEqual([str(message) for message in get_messages(response.asgi_request)], [
+            'Comment successfully created',
+        ])
+
+        response = await self.async_client.post(self.comment_url, {'content': ''})
+        self.assertRedirects(response, self.detail_url, fetch_redirect_response=False)
+
+    async def test_anonymous_comments_are_sent_to_login(self):
+        response = await self.async_client.post(self.comment_url, {'content': 'An async comment.'})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(await Comment.objects.filter(content='An async comment.').aexists())
+
+    @override_settings(PRODUCT_COMMENT_POST_RATE=(1, 60))
+    async def test_comments_are_rate_limited(self):
+        await self.async_client.aforce_login(self.user_1)
+        await self.async_client.post(self.comment_url, {'content': 'First.'})
+        response = await self.async_client.post(self.comment_url, {'content': 'Second.'})
+        self.assertEqual(response.status_code, 429)
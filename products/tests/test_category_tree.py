@@ -0,0 +1,134 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import TestCase
+from django.urls import reverse
+
+from ..category_tree import (
+                            MENU_COUNTS_KEY,
+                            CategoryTree,
+                            count_category_products,
+                            get_category_product_counts,
+                            get_category_tree
+                            )
+from ..versioning import CATALOG_VERSION_KEY, incr_version
+from . test_mixins import CategoryModelSetupMixin, ProductModelSetupMixin
+
+
+class CategoryTreeTest(CategoryModelSetupMixin, TestCase):
+    """
+    Tests for the process-local category tree behind the header menu.
+    """
+    def test_tree_links_parents_and_children(self):
+        tree = get_category_tree()
+        mobile = tree.by_id[self.category.pk]
+
+        self.assertIn(mobile, tree.roots)
+        self.assertEqual([node.slug for node in mobile.children], ['mobile-samsung', 'mobile-xiaomi'])
+        self.assertIs(tree.by_slug['mobile-samsung'].parent, mobile)
+        self.assertEqual(
+                        mobile.url,
+                        reverse('products:product_list', kwargs={'cat_slug': self.category.slug})
+                        )
+        self.assertNotIn(self.inactive_category.pk, tree.by_id)
+
+    def test_warm_tree_costs_no_queries(self):
+        get_category_tree()
+        with self.assertNumQueries(0):
+            self.assertIs(get_category_tree(), get_category_tree())
+
+    def test_tree_is_rebuilt_after_change(self):
+        tree = get_category_tree()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.child_category.title = 'Galaxy'
+            self.child_category.save()
+
+        rebuilt = get_category_tree()
+        self.assertIsNot(rebuilt, tree)
+        self.assertEqual(rebuilt.by_id[self.child_category.pk].title, 'Galaxy')
+
+    def test_uncommitted_change_keeps_the_tree(self):
+        tree = get_category_tree()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.child_category.title = 'Galaxy'
+            self.child_category.save()
+            # Another request inside the window still gets the committed tree.
+            self.assertIs(get_category_tree(), tree)
+        self.assertEqual(get_category_tree().by_id[self.child_category.pk].title, 'Galaxy')
+
+    def test_change_during_build_forces_another_build(self):
+        build = CategoryTree.build
+
+        def build_racing_a_change(version):
+            tree = build(version)
+            incr_version(CATALOG_VERSION_KEY)
+            return tree
+
+        with mock.patch.object(CategoryTree, 'build', side_effect=build_racing_a_change):
+            tree = get_category_tree()
+        self.assertIsNot(get_category_tree(), tree)
+
+
+class CategoryMenuTagTest(ProductModelSetupMixin, TestCase):
+    """
+    Tests for the nested category menu tag.
+    """
+    template = Template('{% load custom_tags %}{% category_menu %}')
+
+    def setUp(self):
+        super().setUp()
+        self.new_product.category.add(self.child_category, self.new_child_category)
+
+    def test_counts_include_the_subtree_once(self):
+        counts = count_category_products(get_category_tree())
+        self.assertEqual(counts[self.category.pk], 2)
+        self.assertEqual(counts[self.child_category.pk], 1)
+        self.assertEqual(counts[self.new_category.pk], 1)
+        self.assertNotIn(self.inactive_category.pk, counts)
+
+    def test_counts_take_one_query(self):
+        tree = get_category_tree()
+        with self.assertNumQueries(1):
+            count_category_products(tree)
+
+    def test_stale_counts_are_served_while_another_request_recounts(self):
+        cache.clear()
+        get_category_product_counts()
+        self.product.delete()
+        cache.add(f'{MENU_COUNTS_KEY}:lock', 1, None)
+
+        later = time.time() + 60 * 60
+        with mock.patch('products.category_tree.time.time', return_value=later):
+            with self.assertNumQueries(0):
+                self.assertEqual(get_category_product_counts()[self.category.pk], 2)
+            cache.delete(f'{MENU_COUNTS_KEY}:lock')
+            self.assertEqual(get_category_product_counts()[self.category.pk], 1)
+
+    def test_cold_counts_wait_for_the_request_counting_them(self):
+        cache.clear()
+        counts = get_category_product_counts()
+        entry = cache.get(MENU_COUNTS_KEY)
+        cache.clear()
+        cache.add(f'{MENU_COUNTS_KEY}:lock', 1)
+
+        with mock.patch('products.category_tree.time.sleep', side_effect=lambda _: cache.set(MENU_COUNTS_KEY, entry)):
+            with self.assertNumQueries(0):
+                self.assertEqual(get_category_product_counts(), counts)
+
+    def test_menu_renders_nested_categories(self):
+        html = self.template.render(Context())
+        self.assertInHTML('<a href="%s" class="megamenu__link">Samsung <span class="mm-count">(1)</span></a>' % (
+            reverse('products:product_list', kwargs={'cat_slug': self.child_category.slug})
+        ), html)
+
+    def test_warm_menu_costs_no_queries(self):
+        self.template.render(Context())
+        with self.assertNumQueries(0):
+            self.template.render(Context())
+
+    def test_counts_are_not_recounted_per_request(self):
+        self.template.render(Context())
+        self.product.delete()
+        self.assertEqual(get_category_product_counts()[self.category.pk], 2)
@@ -0,0 +1,149 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..comments import CommentThread, set_comments_status
+from ..models import Comment, Product
+from . test_mixins import CommentModelSetupMixin
+
+
+class CommentThreadTest(CommentModelSetupMixin, TestCase):
+    """
+    Tests for the threaded, paginated comment loader.
+    """
+    def setUp(self):
+        super().setUp()
+        self.comment_1.status = Comment.PUBLISHED
+        self.comment_1.save()
+        self.nested_reply = self.reply_to(self.comment_2, 'nested reply')
+        self.url = reverse('products:product_details', kwargs={'product_slug': self.product.slug})
+
+    def reply_to(self, parent, content, status=Comment.PUBLISHED):
+        return Comment.objects.create(
+                                    user=self.user_2, product=self.product,
+                                    parent=parent, content=content, status=status
+                                    )
+
+    def test_replies_are_nested_at_every_depth(self):
+        hidden = self.reply_to(self.comment_2, 'waiting reply', status=Comment.WAITING)
+        self.reply_to(hidden, 'reply under a waiting one')
+
+        comment, = CommentThread(self.product).page
+        self.assertEqual(comment.thread_replies, [self.comment_2])
+        self.assertEqual(comment.thread_replies[0].thread_replies, [self.nested_reply])
+
+    def test_page_loads_in_two_queries(self):
+        for index in range(3):
+            parent = Comment.objects.create(
+                                            user=self.user_1, product=self.product,
+                                            content=f'top {index}', status=Comment.PUBLISHED
+                                            )
+            self.reply_to(parent, f'reply {index}')
+
+        thread = CommentThread(self.product)
+        with self.assertNumQueries(2):
+            for comment in thread.page:
+                for reply in comment.thread_replies:
+                    str(reply.user)
+
+    def test_load_more_follows_the_cursor(self):
+        newer = Comment.objects.create(
+                                    user=self.user_1, product=self.product,
+                                    content='newer', status=Comment.PUBLISHED
+                                    )
+        first = CommentThread(self.product, per_page=1).page
+        self.assertEqual(list(first), [newer])
+
+        second = CommentThread(self.product, first.next_cursor, per_page=1).page
+        self.assertEqual(list(second), [self.comment_1])
+        self.assertFalse(second.has_next())
+
+    def test_detail_page_shows_the_thread(self):
+        response = self.client.get(self.url)
+        self.assertContains(response, 'comment 1 reply')
+        self.assertContains(response, 'nested reply')
+        self.assertNotContains(response, 'second comment')
+
+    def test_detail_rejects_invalid_cursor(self):
+        response = self.client.get(self.url, {'comments': 'garbage'})
+        self.assertEqual(response.status_code, 404)
+
+
+class CommentCountersTest(CommentModelSetupMixin, TestCase):
+    """
+    Tests for the denormalized reply and review counters.
+    """
+    def counts(self):
+        self.product.refresh_from_db()
+        self.comment_1.refresh_from_db()
+        return self.product.published_comment_count, self.comment_1.reply_count
+
+    def test_counters_follow_creates_and_deletes(self):
+        # comment_2 is a published reply, so only the reply counter moves.
+        self.assertEqual(self.counts(), (0, 1))
+
+        reply = Comment.objects.create(user=self.user_1, product=self.product, parent=self.comment_1, content='x')
+        review = Comment.objects.create(
+                                        user=self.user_1, product=self.product,
+                                        content='y', status=Comment.PUBLISHED
+                                        )
+        self.assertEqual(self.counts(), (1, 2))
+
+        reply.delete()
+        review.delete()
+        self.assertEqual(self.counts(), (0, 1))
+
+    def test_counters_follow_status_changes(self):
+        self.comment_1.status = Comment.PUBLISHED
+        self.comment_1.save()
+        self.assertEqual(self.counts(), (1, 1))
+
+        self.comment_1.status = Comment.CANCELED
+        self.comment_1.save()
+        self.assertEqual(self.counts(), (0, 1))
+
+    def test_stale_instance_keeps_counters(self):
+        stale = Product.objects.get(pk=self.product.pk)
+        self.comment_1.status = Comment.PUBLISHED
+        self.comment_1.save()
+        stale.name = 'Asus Zenbook'
+        stale.save()
+        self.assertEqual(self.counts(), (1, 1))
+
+    def test_bulk_status_change(self):
+        queryset = Comment.objects.filter(parent__isnull=True)
+        self.assertEqual(set_comments_status(queryset, Comment.PUBLISHED), 2)
+        self.assertEqual(self.counts(), (2, 1))
+        self.assertEqual(set_comments_status(queryset, Comment.PUBLISHED), 0)
+
+        self.assertEqual(set_comments_status(queryset, Comment.CANCELED), 2)
+        self.assertEqual(self.counts(), (0, 1))
+
+    def test_admin_actions_keep_counters(self):
+        admin = get_user_model().objects.create_user(phone='09120000000', password='admin')
+        admin.is_staff = admin.is_superuser = True
+        admin.save()
+        self.client.force_login(admin)
+        self.client.post(reverse('admin:products_comment_changelist'), {
+            'action': 'publish_comments',
+            '_selected_action': [self.comment_1.pk, self.comment_3.pk],
+        })
+        self.assertEqual(self.counts(), (2, 1))
+
+    def test_product_delete_cascades_cleanly(self):
+        self.comment_1.status = Comment.PUBLISHED
+        self.comment_1.save()
+        self.product.delete()
+        self.assertFalse(Comment.objects.exists())
+
+    def test_reconcile_fixes_drift(self):
+        Product.objects.update(published_comment_count=7)
+        Comment.objects.update(reply_count=3)
+        out = StringIO()
+        call_command('reconcile_comment_counts', stdout=out)
+
+        self.assertEqual(self.counts(), (0, 1))
+        self.assertIn('3 comment(s) and 2 product(s) corrected.', out.getvalue())
@@ -0,0 +1,112 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.middleware.csrf import _get_new_csrf_string
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+
+from ..comments import set_comments_status
+from ..models import Comment, Variant
+from . test_mixins import ColorModelSetupMixin, CommentModelSetupMixin
+
+
+class ConditionalGetTest(
+                        ColorModelSetupMixin,
+                        CommentModelSetupMixin,
+                        TestCase
+                        ):
+    """
+    Tests for the ETag validators of catalog pages.
+    """
+    def setUp(self):
+        super().setUp()
+        self.variant = Variant.objects.create(product=self.product, color=self.color, price=120, stock=1)
+        self.list_url = reverse('products:product_list', kwargs={'cat_slug': self.category.slug})
+        self.detail_url = reverse('products:product_details', kwargs={'product_slug': self.product.slug})
+        user = get_user_model().objects.create_user(phone='09120000000', password='pass')
+        # Logged in, so the page cache stays out of the way.
+        self.client.force_login(user)
+
+    def test_detail_answers_if_none_match(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        # The session and the validators; the user comes from the cache
+        # and nothing is rendered.
+        with self.assertNumQueries(2):
+            response = self.client.get(self.detail_url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_detail_ignores_if_modified_since(self):
+        response = self.client.get(self.detail_url)
+        self.assertFalse(response.has_header('Last-Modified'))
+        with self.captureOnCommitCallbacks(execute=True):
+            set_comments_status(Comment.objects.filter(pk=self.comment_1.pk), Comment.PUBLISHED)
+        response = self.client.get(self.detail_url, headers={'If-Modified-Since': http_date()})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'asus comment 1')
+
+    def test_detail_etag_changes_with_content(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.variant.delete()
+        response = self.client.get(self.detail_url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.comment_1.status = Comment.PUBLISHED
+            self.comment_1.save()
+        response = self.client.get(self.detail_url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_differs_per_visitor(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        self.client.logout()
+        response = self.client.get(self.detail_url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_changes_when_the_csrf_secret_rotates(self):
+        response = self.client.get(self.detail_url)
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+        etag = response['ETag']
+        # Logging in again rotates the secret behind the comment form's token.
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = _get_new_csrf_string()
+        response = self.client.get(self.detail_url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_answers_if_none_match(self):
+        etag = self.client.get(self.list_url)['ETag']
+        response = self.client.get(self.list_url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.variant.price = 95
+            self.variant.save()
+        response = self.client.get(self.list_url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_etag_changes_with_review_counts(self):
+        etag = self.client.get(self.list_url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.comment_1.status = Comment.PUBLISHED
+            self.comment_1.save()
+        response = self.client.get(self.list_url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '1 review')
+
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            set_comments_status(Comment.objects.filter(pk=self.comment_1.pk), Comment.CANCELED)
+        response = self.client.get(self.list_url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, '1 review')
+
+    def test_cached_page_answers_if_none_match(self):
+        self.client.logout()
+        etag = self.client.get(self.detail_url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.detail_url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_missing_product_is_not_found(self):
+        url = reverse('products:product_details', kwargs={'product_slug': 'missing'})
+        self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,96 @@
+from django.core.cache import cache
+from django.http import QueryDict
+from django.test import TestCase
+from django.urls import reverse
+
+from ..facets import ProductFacets
+from ..models import Product, ProductAttributeValue, Variant
+from . test_mixins import (
+                        AttributeModelSetupMixin,
+                        ColorModelSetupMixin,
+                        ProductModelSetupMixin
+                        )
+
+
+class ProductFacetsTest(
+                        AttributeModelSetupMixin,
+                        ColorModelSetupMixin,
+                        ProductModelSetupMixin,
+                        TestCase
+                        ):
+    """
+    Tests for the product listing facets.
+    """
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.new_product.category.add(self.category)
+        Variant.objects.create(product=self.product, color=self.color, price=50, stock=0)
+        Variant.objects.create(product=self.product, color=self.new_color, price=150, stock=2)
+        Variant.objects.create(product=self.new_product, color=self.color, price=700, stock=0)
+        ProductAttributeValue.objects.create(product=self.product, attribute=self.attribute, value='6.2')
+        ProductAttributeValue.objects.create(product=self.new_product, attribute=self.attribute, value='6.7')
+        self.queryset = Product.objects.in_category_subtree(self.category)
+
+    def get_facets(self, query=''):
+        return ProductFacets(self.queryset, QueryDict(query))
+
+    def get_counts(self, facets, name):
+        facet = next(facet for facet in facets.counts() if facet['name'] == name)
+        return {option['value']: option['count'] for option in facet['options']}
+
+    def test_unfiltered_counts(self):
+        facets = self.get_facets()
+        self.assertEqual(self.get_counts(facets, 'brand'), {'asus': 1, 'lenovo': 1})
+        self.assertEqual(
+                        self.get_counts(facets, 'color'),
+                        {str(self.color.pk): 2, str(self.new_color.pk): 1}
+                        )
+        self.assertEqual(self.get_counts(facets, 'price'), {0: 1, 1: 1, 2: 1, 3: 0, 4: 0})
+        self.assertEqual(self.get_counts(facets, 'in_stock'), {'1': 1})
+        self.assertEqual(
+                        self.get_counts(facets, f'attr_{self.attribute.pk}'),
+                        {'6.2': 1, '6.7': 1}
+                        )
+
+    def test_filters_apply(self):
+        self.assertCountEqual(self.get_facets('brand=lenovo').apply(), [self.new_product])
+        self.assertCountEqual(self.get_facets('in_stock=1').apply(), [self.product])
+        self.assertCountEqual(self.get_facets('price=2').apply(), [self.new_product])
+        self.assertCountEqual(
+                            self.get_facets(f'color={self.new_color.pk}').apply(),
+                            [self.product]
+                            )
+        self.assertCountEqual(
+                            self.get_facets(f'attr_{self.attribute.pk}=6.7').apply(),
+                            [self.new_product]
+                            )
+
+    def test_facet_ignores_its_own_selection(self):
+        facets = self.get_facets('brand=lenovo')
+        self.assertEqual(self.get_counts(facets, 'brand'), {'asus': 1, 'lenovo': 1})
+        self.assertEqual(self.get_counts(facets, 'color'), {str(self.color.pk): 1})
+
+    def test_counts_use_bounded_queries(self):
+        facets = self.get_facets(f'brand=asus&attr_{self.attribute.pk}=6.2')
+        with self.assertNumQueries(6):
+            facets.counts()
+
+    def test_unfiltered_counts_are_cached(self):
+        url = reverse('products:product_list', kwargs={'cat_slug': self.category.slug})
+        first = self.client.get(url).context['facets']
+        facets = ProductFacets(self.queryset, QueryDict(), cache_key='facets-test')
+        facets.counts()
+        with self.assertNumQueries(0):
+            facets.counts()
+        # A different query string, so the page cache is bypassed.
+        self.assertEqual(self.client.get(url, {'sort': 'newest'}).context['facets'], first)
+
+    def test_cached_counts_are_invalidated_on_change(self):
+        url = reverse('products:product_list', kwargs={'cat_slug': self.category.slug})
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Variant.objects.create(product=self.new_product, color=self.new_color, price=10, stock=1)
+        facets = self.client.get(url).context['facets']
+        stock = next(facet for facet in facets if facet['name'] == 'in_stock')
+        self.assertEqual(stock['options'][0]['count'], 2)
@@ -0,0 +1,92 @@
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from ..models import Attribute, Comment, ProductListing, Variant
+from ..page_cache import page_cache_key
+from ..versioning import get_version, product_version_key
+from . test_mixins import ColorModelSetupMixin, CommentModelSetupMixin
+
+
+class ProductFragmentCacheTest(
+                            ColorModelSetupMixin,
+                            CommentModelSetupMixin,
+                            TestCase
+                            ):
+    """
+    Tests for the versioned product card and detail fragments.
+    """
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.variant = Variant.objects.create(product=self.product, color=self.color, price=120, stock=1)
+        self.list_url = reverse('products:product_list', kwargs={'cat_slug': self.category.slug})
+        self.detail_url = reverse('products:product_details', kwargs={'product_slug': self.product.slug})
+
+    def get_version(self):
+        return get_version(product_version_key(self.product.pk))
+
+    def test_card_is_served_from_cache(self):
+        self.client.get(self.list_url)
+        # Bypass the signals, so only a cache hit can explain the old price.
+        ProductListing.objects.filter(product=self.product).update(min_price=999)
+        # A different query string, so the page cache is bypassed.
+        response = self.client.get(self.list_url, {'sort': 'newest'})
+        self.assertContains(response, '120')
+        self.assertNotContains(response, '999')
+
+    def test_card_is_rendered_again_after_change(self):
+        self.client.get(self.list_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.variant.price = 80
+            self.variant.save()
+        self.assertContains(self.client.get(self.list_url), '80.00')
+
+    def test_detail_skips_queries_on_cache_hit(self):
+        self.client.get(self.detail_url)
+        # Only the validators and the product, once the page itself
+        # is gone from the page cache.
+        cache.delete(page_cache_key(RequestFactory().get(self.detail_url)))
+        with self.assertNumQueries(2):
+            self.client.get(self.detail_url)
+
+    def test_detail_is_rendered_again_after_change(self):
+        self.client.get(self.detail_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.variant.price = 95
+            self.variant.save()
+            self.comment_1.status = Comment.PUBLISHED
+            self.comment_1.save()
+
+        response = self.client.get(self.detail_url)
+        self.assertContains(response, '95.00')
+        self.assertContains(response, 'asus comment 1')
+
+    def test_version_is_bumped_on_commit(self):
+        version = self.get_version()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.variant.price = 90
+            self.variant.save()
+            self.assertEqual(self.get_version(), version)
+        self.assertTrue(callbacks)
+        self.assertGreater(self.get_version(), version)
+
+    def test_waiting_comments_keep_the_version(self):
+        version = self.get_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(user=self.user_1, product=self.product, content='new', status=Comment.WAITING)
+        self.assertEqual(self.get_version(), version)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.comment_2.status = Comment.CANCELED
+            self.comment_2.save()
+        self.assertEqual(self.get_version(), version + 1)
+
+    def test_attribute_rename_bumps_version(self):
+        attribute = Attribute.objects.create(name='Screen')
+        self.product.attribute_values.create(attribute=attribute, value='6.1')
+        version = self.get_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            attribute.name = 'Display'
+            attribute.save()
+        self.assertEqual(self.get_version(), version + 1)
@@ -0,0 +1,133 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from ..images import generate_pending_derivatives, load_image_derivatives
+from ..models import ImageDerivative, Product
+from ..versioning import category_version_key, get_version, product_version_key
+from . test_mixins import ProductModelSetupMixin
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def png_upload(width=800, height=600, color='red'):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, format='PNG')
+    return SimpleUploadedFile('photo.png', buffer.getvalue(), content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, PRODUCT_IMAGE_WIDTHS=[160, 320, 1280])
+class ImageDerivativeTest(ProductModelSetupMixin, TestCase):
+    """
+    Tests for the background thumbnail and WebP pipeline.
+    """
+    template = Template('{% load custom_tags %}{% responsive_image image alt="Photo" sizes="50vw" %}')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        super().setUp()
+        # The fixtures upload a few bytes that are no image at all.
+        ImageDerivative.objects.all().delete()
+        self.product.cover_image = png_upload()
+        self.product.save()
+
+    def render(self, image):
+        return self.template.render(Context({'image': image}))
+
+    def test_upload_records_size_and_color(self):
+        product = Product.objects.get(pk=self.product.pk)
+        self.assertEqual((product.cover_image_width, product.cover_image_height), (800, 600))
+        self.assertEqual(product.cover_image_color, '#ff0000')
+
+    def test_unreadable_upload_records_nothing(self):
+        self.assertEqual((self.new_product.cover_image_width, self.new_product.cover_image_color), (None, ''))
+
+    def test_command_records_older_uploads(self):
+        Product.objects.update(cover_image_width=None, cover_image_height=None, cover_image_color='')
+        call_command('record_image_metadata', stdout=StringIO())
+        product = Product.objects.get(pk=self.product.pk)
+        self.assertEqual((product.cover_image_width, product.cover_image_color), (800, '#ff0000'))
+
+    def test_upload_queues_the_widths_it_reaches(self):
+        queued = ImageDerivative.objects.filter(source=self.product.cover_image.name, file='')
+        self.assertEqual(sorted(queued.values_list('width', flat=True)), [160, 160, 320, 320])
+
+    def test_worker_writes_content_hash_files(self):
+        self.assertEqual(generate_pending_derivatives(), 4)
+
+        derivatives = ImageDerivative.objects.filter(source=self.product.cover_image.name)
+        self.assertEqual(sorted(derivatives.values_list('width', 'format')), [
+            (160, 'jpeg'), (160, 'webp'), (320, 'jpeg'), (320, 'webp'),
+        ])
+        for derivative in derivatives:
+            self.assertRegex(derivative.file.name, r'^derivatives/[0-9a-f]{32}\.(jpg|webp)$')
+            with Image.open(derivative.file) as image:
+                self.assertEqual(image.size, (derivative.width, derivative.width * 3 // 4))
+
+    def test_identical_uploads_are_stored_once(self):
+        self.new_product.cover_image = png_upload()
+        self.new_product.save()
+        self.assertEqual(self.new_product.cover_image.name, self.product.cover_image.name)
+        generate_pending_derivatives()
+        self.assertEqual(ImageDerivative.objects.count(), 4)
+
+    def test_tag_falls_back_to_the_original(self):
+        html = self.render(self.product.cover_image)
+        self.assertInHTML(
+            f'<img src="{self.product.cover_image.url}" width="800" height="600" '
+            'style="background-color: #ff0000" alt="Photo" loading="lazy" decoding="async">',
+            html,
+        )
+
+    def test_tag_renders_srcsets_once_generated(self):
+        self.render(self.product.cover_image)
+        version = get_version(product_version_key(self.product.pk))
+        category_version = get_version(category_version_key(self.category.pk))
+        with self.captureOnCommitCallbacks(execute=True):
+            generate_pending_derivatives()
+        self.assertGreater(get_version(product_version_key(self.product.pk)), version)
+        self.assertGreater(get_version(category_version_key(self.category.pk)), category_version)
+
+        html = self.render(Product.objects.get(pk=self.product.pk).cover_image)
+        webp = ImageDerivative.objects.filter(format=ImageDerivative.WEBP).order_by('width')
+        self.assertIn(
+            f'<source type="image/webp" srcset="{webp[0].file.url} 160w, {webp[1].file.url} 320w" sizes="50vw">', html
+        )
+        self.assertIn('loading="lazy"', html)
+        self.assertIn(f'src="{self.product.cover_image.url}"', html)
+
+    def test_grid_derivatives_are_loaded_together(self):
+        self.new_product.cover_image = png_upload(color='blue')
+        self.new_product.save()
+        generate_pending_derivatives()
+        products = Product.objects.filter(pk__in=[self.product.pk, self.new_product.pk])
+        images = [product.cover_image for product in products]
+        with self.assertNumQueries(1):
+            load_image_derivatives(images)
+        with self.assertNumQueries(0):
+            html = ''.join(self.render(image) for image in images)
+        self.assertEqual(html.count('type="image/webp"'), 2)
+
+        images = [product.cover_image for product in products.all()]
+        with self.assertNumQueries(0):
+            load_image_derivatives(images)
+
+    def test_unreadable_images_are_dequeued(self):
+        self.new_product.save()
+        with self.assertLogs('products.images', 'WARNING'):
+            generate_pending_derivatives()
+        self.assertFalse(ImageDerivative.objects.filter(source=self.new_product.cover_image.name).exists())
+        self.assertInHTML(
+            f'<img src="{self.new_product.cover_image.url}" alt="Photo" loading="lazy" decoding="async">',
+            self.render(self.new_product.cover_image),
+        )
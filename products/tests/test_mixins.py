@@ -1,3 +1,4 @@
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.auth import get_user_model
 from django.test import Client
@@ -9,6 +10,9 @@ from ..models import Attribute, Brand, Category, Color, Product, Comment, Catego
 class CtaegoryTypeModelSetupMixin:
     def setUp(self):
         super().setUp()
+        # Cached pages and version counters are keyed by ids
+        # that every test reuses.
+        cache.clear()
 
         self.category_type = CategoryType.objects.create(
             title = 'Main',
@@ -1,3 +1,8 @@
+import hashlib
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
 from django.db.utils import IntegrityError
 from django.core.exceptions import ValidationError
@@ -7,7 +12,7 @@ from django.contrib.auth import get_user_model
 from ..models import (
                     Category, Color,
                     Product, ProductAttributeValue,
-                    Variant, Comment
+                    ProductListing, Variant, Comment
                     )
 from . test_mixins import (
                         AttributeModelSetupMixin,
@@ -90,6 +95,97 @@ class CategoryModelTest(
         """Test the __str__ method of the category model."""
         self.assertEqual(str(self.category), 'mobile')
 
+    def test_category_tree_fields(self):
+        """Test that path, depth and ancestors are stored on save."""
+        self.assertEqual(self.child_category.path, ['mobile', 'samsung'])
+        self.assertEqual(self.child_category.depth, 1)
+        self.assertEqual(self.child_category.ancestor_ids, [self.category.id])
+
+    def test_category_str_does_not_query(self):
+        """Test that __str__ uses the stored path instead of walking parents."""
+        category = Category.objects.get(pk=self.child_category.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(str(category), 'mobile -> samsung')
+
+    def test_renaming_parent_rewrites_subtree(self):
+        """Test that renaming a category rewrites its descendants."""
+        grandchild = self.create_valid_category(
+            title = 'Galaxy',
+            category_type = self.category_type,
+            parent = self.child_category,
+        )
+        category = Category.objects.get(pk=self.category.pk)
+        category.title = 'Phones'
+        category.full_clean()
+        category.save()
+
+        grandchild.refresh_from_db()
+        self.assertEqual(grandchild.path, ['phones', 'samsung', 'galaxy'])
+        self.assertEqual(grandchild.slug, 'phones-samsung-galaxy')
+        self.assertEqual(str(grandchild), 'phones -> samsung -> galaxy')
+
+    def test_moving_category_rewrites_subtree(self):
+        """Test that moving a category updates depth and ancestors below it."""
+        grandchild = self.create_valid_category(
+            title = 'Galaxy',
+            category_type = self.category_type,
+            parent = self.child_category,
+        )
+        child = Category.objects.get(pk=self.child_category.pk)
+        child.parent = self.new_category
+        child.save()
+
+        grandchild.refresh_from_db()
+        self.assertEqual(grandchild.ancestor_ids, [self.new_category.id, child.id])
+        self.assertEqual(grandchild.depth, 2)
+
+    def test_moving_subtree_below_max_depth_is_invalid(self):
+        """Test that a move is rejected if its descendants would exceed the depth limit."""
+        self.create_valid_category(
+            title = 'Galaxy',
+            category_type = self.category_type,
+            parent = self.child_category,
+        )
+        child = Category.objects.get(pk=self.child_category.pk)
+        child.parent = self.new_child_category
+        with self.assertRaises(ValidationError):
+            child.clean()
+
+    def test_category_cannot_be_moved_under_descendant(self):
+        """Test that a category can't become a child of its own subcategory."""
+        category = Category.objects.get(pk=self.category.pk)
+        category.parent = self.child_category
+        with self.assertRaises(ValidationError):
+            category.clean()
+
+    def test_breadcrumbs(self):
+        """Test that breadcrumbs list ancestors root first."""
+        self.assertEqual(
+                        self.child_category.breadcrumbs(),
+                        [self.category, self.child_category]
+                        )
+
+    def test_subtree_includes_descendants(self):
+        """Test that subtree returns the category and all its descendants."""
+        grandchild = self.create_valid_category(
+            title = 'Galaxy',
+            category_type = self.category_type,
+            parent = self.child_category,
+        )
+        subtree = Category.objects.subtree(self.category)
+        self.assertCountEqual(
+                            subtree,
+                            [self.category, self.child_category,
+                             self.new_child_category, grandchild]
+                            )
+
+    def test_subtree_of_leaf(self):
+        """Test that the subtree of a leaf category is the category itself."""
+        self.assertQuerySetEqual(
+                                Category.objects.subtree(self.child_category),
+                                [self.child_category]
+                                )
+
 
 
 class ProductModelTest(
@@ -176,11 +272,9 @@ class VariantModelTest(
         """Test product creation."""
         self.assertEqual(self.variant.product, self.product)
         self.assertEqual(self.variant.color, self.color)
-        self.assertTrue(
-                        self.variant.image.name.\
-                        startswith('products_images/test_image')
-                        )
-        self.assertTrue(self.variant.image.name.endswith('.jpg'))
+        # Uploads are named after their content.
+        digest = hashlib.sha256(b'\x47\x49\x46\x38\x39\x61').hexdigest()[:32]
+        self.assertEqual(self.variant.image.name, f'products_images/{digest}.jpg')
         self.assertEqual(self.variant.price, 140.00)
         self.assertEqual(self.variant.stock, 1)
 
@@ -452,3 +546,79 @@ class CommentModelTest(
         self.assertNotIn(self.comment_1, published_comments)
         self.assertNotIn(self.comment_3, published_comments)
 
+
+
+class ProductListingModelTest(
+                            ProductModelSetupMixin,
+                            ColorModelSetupMixin,
+                            TestCase
+                            ):
+    """
+    Tests for the denormalized ProductListing read model.
+    """
+    def setUp(self):
+        super().setUp()
+        self.variant = Variant.objects.create(
+            product = self.product,
+            color = self.color,
+            price = 140.00,
+            stock = 0
+        )
+        self.new_variant = Variant.objects.create(
+            product = self.product,
+            color = self.new_color,
+            price = 120.00,
+            stock = 3
+        )
+
+    def test_listing_created_with_product(self):
+        """Test that every saved product gets a listing row."""
+        listing = ProductListing.objects.get(product=self.new_product)
+        self.assertIsNone(listing.min_price)
+        self.assertFalse(listing.in_stock)
+        self.assertEqual(listing.cover_image_url, self.new_product.cover_image.url)
+
+    def test_listing_aggregates_variants(self):
+        """Test that the listing holds prices, stock and colors of variants."""
+        listing = ProductListing.objects.get(product=self.product)
+        self.assertEqual(listing.min_price, Decimal('120.00'))
+        self.assertEqual(listing.max_price, Decimal('140.00'))
+        self.assertEqual(listing.total_stock, 3)
+        self.assertTrue(listing.in_stock)
+        self.assertEqual(
+                        [color['name'] for color in listing.colors],
+                        ['White', 'Red']
+                        )
+
+    def test_listing_updated_on_variant_delete(self):
+        """Test that deleting a variant refreshes the listing."""
+        self.new_variant.delete()
+        listing = ProductListing.objects.get(product=self.product)
+        self.assertEqual(listing.min_price, Decimal('140.00'))
+        self.assertFalse(listing.in_stock)
+
+    def test_listing_updated_when_variant_moves(self):
+        """Test that both products are refreshed when a variant changes product."""
+        self.new_variant.product = self.new_product
+        self.new_variant.save()
+        self.assertEqual(ProductListing.objects.get(product=self.product).total_stock, 0)
+        self.assertEqual(ProductListing.objects.get(product=self.new_product).total_stock, 3)
+
+    def test_listing_updated_on_color_change(self):
+        """Test that renaming a color refreshes listings that use it."""
+        self.color.name = 'Crimson'
+        self.color.save()
+        listing = ProductListing.objects.get(product=self.product)
+        self.assertIn('Crimson', [color['name'] for color in listing.colors])
+
+    def test_listing_deleted_with_product(self):
+        """Test that deleting a product removes its listing."""
+        self.product.delete()
+        self.assertFalse(ProductListing.objects.filter(product_id=self.variant.product_id).exists())
+
+    def test_rebuild_command(self):
+        """Test that the rebuild command recreates missing listings."""
+        ProductListing.objects.all().delete()
+        call_command('rebuild_product_listings', stdout=StringIO())
+        self.assertEqual(ProductListing.objects.count(), Product.objects.count())
+        self.assertEqual(ProductListing.objects.get(product=self.product).total_stock, 3)
@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment
+from ..moderation import ModerationQueue, moderate_comments
+from . test_mixins import CommentModelSetupMixin
+
+
+class ModerationQueueTest(CommentModelSetupMixin, TestCase):
+    """
+    Tests for the comment moderation queue.
+    """
+    def setUp(self):
+        super().setUp()
+        self.waiting = [self.comment_1] + [
+            Comment.objects.create(user=self.user_1, product=self.product, content=f'waiting {index}')
+            for index in range(3)
+        ]
+        self.url = reverse('admin:comment_moderation')
+        admin = get_user_model().objects.create_user(phone='09120000000', password='admin')
+        admin.is_staff = admin.is_superuser = True
+        admin.save()
+        self.client.force_login(admin)
+
+    def statuses(self):
+        return set(Comment.objects.filter(pk__in=[c.pk for c in self.waiting]).values_list('status', flat=True))
+
+    def test_queue_is_oldest_first(self):
+        queue = ModerationQueue(per_page=2)
+        first = queue.page()
+        self.assertEqual(list(first), self.waiting[:2])
+        self.assertEqual(list(queue.page(first.next_cursor)), self.waiting[2:])
+        self.assertEqual(queue.estimated_count(), 4)
+
+    def test_moderate_in_chunks(self):
+        changed = moderate_comments([c.pk for c in self.waiting], Comment.PUBLISHED, chunk_size=3)
+        self.assertEqual(changed, 4)
+        self.assertEqual(self.statuses(), {Comment.PUBLISHED})
+
+    def test_moderate_all_stops_at_until(self):
+        until = timezone.now()
+        late = Comment.objects.create(user=self.user_1, product=self.product, content='late')
+        changed = ModerationQueue().moderate_all(Comment.CANCELED, until, chunk_size=1)
+
+        self.assertEqual(changed, 4)
+        self.assertEqual(self.statuses(), {Comment.CANCELED})
+        late.refresh_from_db()
+        self.assertEqual(late.status, Comment.WAITING)
+
+    def test_view_lists_queue(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['page']), self.waiting)
+        self.assertContains(response, 'waiting 2')
+
+    def test_view_publishes_selected(self):
+        response = self.client.post(self.url, {
+            'action': 'publish',
+            'scope': 'selected',
+            'ids': [self.comment_1.pk],
+            'until': timezone.now().isoformat(),
+        })
+        self.assertRedirects(response, self.url)
+        self.comment_1.refresh_from_db()
+        self.assertEqual(self.comment_1.status, Comment.PUBLISHED)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.published_comment_count, 1)
+
+    def test_view_cancels_whole_queue(self):
+        self.client.post(self.url, {'action': 'cancel', 'scope': 'all', 'until': timezone.now().isoformat()})
+        self.assertEqual(self.statuses(), {Comment.CANCELED})
+
+    def test_view_requires_staff(self):
+        self.client.logout()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,128 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from ..listing import flush_product_views, product_views_key, write_product_views
+from ..models import Category, ProductListing, Variant
+from ..page_cache import page_cache_key
+from . test_mixins import ColorModelSetupMixin, ProductModelSetupMixin
+
+
+class AnonymousPageCacheTest(
+                            ColorModelSetupMixin,
+                            ProductModelSetupMixin,
+                            TestCase
+                            ):
+    """
+    Tests for the full-page cache of anonymous catalog pages.
+    """
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.variant = Variant.objects.create(product=self.product, color=self.color, price=120, stock=1)
+        self.list_url = reverse('products:product_list', kwargs={'cat_slug': self.category.slug})
+        self.detail_url = reverse('products:product_details', kwargs={'product_slug': self.product.slug})
+
+    def hold_render_lock(self, url):
+        request = RequestFactory().get(url)
+        cache.add(f'{page_cache_key(request)}:lock', 1)
+
+    def test_anonymous_pages_are_served_without_queries(self):
+        for url in (reverse('products:home'), self.list_url, self.detail_url):
+            first = self.client.get(url)
+            with self.assertNumQueries(0):
+                response = self.client.get(url)
+            self.assertEqual(response.content, first.content)
+
+    def test_unused_params_share_the_cached_page(self):
+        first = self.client.get(self.list_url, {'sort': 'newest', 'brand': 'asus', 'utm_source': 'mail'})
+        self.assertNotIn('utm_source', first.context['request'].GET)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.list_url, {'fbclid': 'x1', 'brand': 'asus', 'sort': 'newest'})
+        self.assertEqual(response.content, first.content)
+        self.assertIsNotNone(self.client.get(self.list_url, {'sort': 'price_asc'}).context)
+
+    def test_authenticated_pages_are_not_cached(self):
+        user = get_user_model().objects.create_user(phone='09120000000', password='pass')
+        self.client.force_login(user)
+        self.client.get(self.detail_url)
+        self.assertIsNotNone(self.client.get(self.detail_url).context)
+
+    def test_changed_product_is_rendered_again(self):
+        self.client.get(self.detail_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.variant.price = 95
+            self.variant.save()
+        self.assertContains(self.client.get(self.detail_url), '95.00')
+
+    def test_stale_page_is_served_while_another_request_renders(self):
+        self.client.get(self.list_url)
+        # Bypass the signals for the content, then mark the page stale.
+        ProductListing.objects.filter(product=self.product).update(min_price=999)
+        self.variant.stock = 5
+        self.variant.save()
+        self.hold_render_lock(self.list_url)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.list_url)
+        self.assertNotContains(response, '999')
+
+    def test_cold_page_waits_for_the_request_rendering_it(self):
+        self.client.get(self.list_url)
+        key = page_cache_key(RequestFactory().get(self.list_url))
+        entry = cache.get(key)
+        cache.delete(key)
+        self.hold_render_lock(self.list_url)
+
+        with mock.patch('products.page_cache.time.sleep', side_effect=lambda _: cache.set(key, entry)):
+            with self.assertNumQueries(0):
+                response = self.client.get(self.list_url)
+        self.assertEqual(response.content, entry['content'])
+
+    def test_cold_page_is_rendered_when_the_wait_runs_out(self):
+        self.hold_render_lock(self.list_url)
+        with mock.patch('products.page_cache.AnonymousPageCacheMixin.page_cache_lock_wait', 0):
+            response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.context)
+
+    def test_cached_forms_fetch_their_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+        client.get(self.list_url)
+        response = client.get(self.list_url)
+        self.assertIsNone(response.context)
+        self.assertContains(response, f'data-csrf-url="{reverse("csrf_token")}"')
+        self.assertEqual(client.post(self.list_url).status_code, 403)
+
+        token = client.get(reverse('csrf_token')).json()['token']
+        # The list view takes no POST yet, but the token gets it past the CSRF check.
+        self.assertEqual(client.post(self.list_url, {'csrfmiddlewaretoken': token}).status_code, 405)
+
+    def test_category_change_purges_pages(self):
+        self.client.get(self.detail_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(title='Tablets', slug='tablets', category_type=self.category_type)
+        self.assertContains(self.client.get(self.detail_url), 'Tablets')
+
+    def test_cached_views_are_counted(self):
+        self.client.get(self.detail_url)
+        self.client.get(self.detail_url)
+        flush_product_views()
+        self.assertEqual(ProductListing.objects.get(product=self.product).view_count, 2)
+
+    @override_settings(PRODUCT_VIEW_FLUSH_THRESHOLD=2)
+    def test_full_view_buffers_are_written_without_the_command(self):
+        for _ in range(3):
+            self.client.get(self.detail_url)
+        self.assertEqual(ProductListing.objects.get(product=self.product).view_count, 2)
+        self.assertEqual(cache.get(product_views_key(self.product.pk)), 1)
+
+    def test_views_are_never_written_twice(self):
+        cache.set(product_views_key(self.product.pk), 3)
+        self.assertEqual(write_product_views(self.product.pk, 5), 3)
+        self.assertEqual(write_product_views(self.product.pk, 3), 0)
+        self.assertEqual(cache.get(product_views_key(self.product.pk)), 0)
+        self.assertEqual(ProductListing.objects.get(product=self.product).view_count, 3)
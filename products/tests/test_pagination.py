@@ -0,0 +1,56 @@
+from django.test import TestCase
+
+from ..models import Product
+from ..pagination import InvalidCursor, KeysetPaginator
+from . test_mixins import ProductModelSetupMixin
+
+
+class KeysetPaginatorTest(ProductModelSetupMixin, TestCase):
+    """
+    Tests for the keyset paginator used by product listings.
+    """
+    def setUp(self):
+        super().setUp()
+        for index in range(5):
+            Product.objects.create(
+                name = f'Product {index}',
+                slug = f'product-{index}',
+                brand = self.brand,
+                description = 'description',
+            )
+        self.queryset = Product.objects.all()
+        self.ordering = ('-created_at', '-id')
+        self.expected = list(self.queryset.order_by(*self.ordering))
+
+    def test_pages_cover_every_row_once(self):
+        paginator = KeysetPaginator(self.queryset, self.ordering, 3)
+        page = paginator.page()
+        seen = list(page)
+        while page.has_next():
+            page = paginator.page(page.next_cursor)
+            seen.extend(page)
+        self.assertEqual(seen, self.expected)
+
+    def test_previous_cursor_returns_previous_page(self):
+        paginator = KeysetPaginator(self.queryset, self.ordering, 3)
+        first = paginator.page()
+        second = paginator.page(first.next_cursor)
+        self.assertTrue(second.has_previous())
+        back = paginator.page(second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_first_page_has_no_previous(self):
+        page = KeysetPaginator(self.queryset, self.ordering, 3).page()
+        self.assertFalse(page.has_previous())
+        self.assertTrue(page.has_next())
+
+    def test_malformed_cursor(self):
+        paginator = KeysetPaginator(self.queryset, self.ordering, 3)
+        with self.assertRaises(InvalidCursor):
+            paginator.page('not-a-cursor')
+
+    def test_cursor_from_other_ordering_is_rejected(self):
+        cursor = KeysetPaginator(self.queryset, ('name', 'id'), 3).page().next_cursor
+        with self.assertRaises(InvalidCursor):
+            KeysetPaginator(self.queryset, self.ordering, 3).page(cursor)
@@ -0,0 +1,87 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..models import Comment
+from ..scoring import (
+                    BannedPhraseScorer,
+                    DuplicateScorer,
+                    LinkDensityScorer,
+                    PhraseAutomaton,
+                    UserRateScorer,
+                    score_comments,
+                    score_pending_comments
+                    )
+from . test_mixins import CommentModelSetupMixin
+
+
+@override_settings(PRODUCT_COMMENT_BANNED_PHRASES=['cheap pills', 'casino'], PRODUCT_COMMENT_RATE_LIMIT=3)
+class CommentScoringTest(CommentModelSetupMixin, TestCase):
+    """
+    Tests for the comment spam scoring pipeline.
+    """
+    def comment(self, content, user=None):
+        return Comment.objects.create(user=user or self.user_1, product=self.product, content=content)
+
+    def scores(self, scorer, comments):
+        score_comments(comments, [scorer])
+        return [comment.spam_score for comment in comments]
+
+    def test_phrase_automaton(self):
+        automaton = PhraseAutomaton(['he', 'she', 'his', 'hers'])
+        self.assertEqual(automaton.count('ushers'), 3)
+        self.assertEqual(automaton.count('USHERS'), 3)
+        self.assertEqual(automaton.count('nothing'), 0)
+
+    def test_duplicates_are_flagged_after_the_first(self):
+        text = 'Best laptop I have ever owned, buy it now'
+        original = self.comment(text)
+        copies = [self.comment(text.upper() + '  '), self.comment('Thanks!'), self.comment('Thanks!')]
+        self.assertEqual(self.scores(DuplicateScorer(), [original, *copies]), [0.0, 1.0, 0.0, 0.0])
+
+    def test_link_density(self):
+        comments = [self.comment('see http://spam.example now'), self.comment('a calm review of the product')]
+        self.assertEqual(self.scores(LinkDensityScorer(), comments), [1.0, 0.0])
+
+    def test_user_rate(self):
+        comments = [self.comment(f'review {index}', user=self.user_2) for index in range(5)]
+        # user_2 also wrote comment_3 in the setup, so the last one is the sixth in an hour.
+        self.assertEqual(self.scores(UserRateScorer(), comments[-1:]), [1.0])
+        self.assertEqual(self.scores(UserRateScorer(), [self.comment('one', user=self.user_3)]), [0.0])
+
+    def test_user_rate_is_windowed_by_creation_time(self):
+        spread = [self.comment(f'old review {index}', user=self.user_3) for index in range(6)]
+        burst = [self.comment(f'old burst {index}', user=self.user_3) for index in range(6)]
+        start = timezone.now() - timedelta(days=30)
+        for index, comment in enumerate(spread):
+            Comment.objects.filter(pk=comment.pk).update(created_at=start + timedelta(hours=2 * index))
+        for index, comment in enumerate(burst):
+            Comment.objects.filter(pk=comment.pk).update(created_at=start + timedelta(days=1, minutes=index))
+        comments = list(Comment.objects.filter(pk__in=[comment.pk for comment in spread + burst]).order_by('created_at'))
+        # Six comments two hours apart stay under the limit, the sixth of a burst does not.
+        self.assertEqual(self.scores(UserRateScorer(), comments), [0.0] * 6 + [0.0, 0.0, 0.0, 1 / 3, 2 / 3, 1.0])
+
+    def test_banned_phrases(self):
+        comments = [self.comment('Win at the CASINO'), self.comment('Nice phone')]
+        self.assertEqual(self.scores(BannedPhraseScorer(), comments), [1.0, 0.0])
+
+    def test_pending_comments_are_moderated(self):
+        clean = self.comment('Solid build quality and a good screen')
+        spam = self.comment('cheap pills at http://spam.example')
+        self.assertEqual(score_pending_comments(), 3)
+
+        clean.refresh_from_db()
+        spam.refresh_from_db()
+        self.assertEqual(clean.status, Comment.PUBLISHED)
+        self.assertEqual(spam.status, Comment.CANCELED)
+        self.assertEqual(spam.spam_score, 1.0)
+        self.assertTrue(clean.content_hash)
+        self.assertEqual(score_pending_comments(), 0)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('score_comments', stdout=out)
+        self.assertIn('1 comment(s) scored.', out.getvalue())
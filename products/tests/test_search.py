@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Product
+from ..search import get_search_backend
+from . test_mixins import ProductModelSetupMixin
+
+
+class ProductSearchTest(ProductModelSetupMixin, TestCase):
+    """
+    Tests for the product full-text search.
+    """
+    def search(self, query):
+        return list(get_search_backend().search(Product.objects.all(), query))
+
+    def test_search_matches_name_and_description(self):
+        self.assertEqual(self.search('asus'), [self.product])
+        self.assertEqual(self.search('Lenovo description'), [self.new_product])
+
+    def test_name_matches_rank_first(self):
+        self.new_product.description = 'works like an asus'
+        self.new_product.save()
+        self.assertEqual(self.search('asus'), [self.product, self.new_product])
+
+    def test_index_is_updated_on_save(self):
+        self.product.name = 'Zenbook'
+        self.product.save()
+        self.assertEqual(self.search('zenbook'), [self.product])
+
+    def test_deleted_product_is_removed_from_index(self):
+        self.product.delete()
+        self.assertEqual(self.search('asus'), [])
+
+    def test_query_syntax_is_escaped(self):
+        self.assertEqual(self.search('asus" *'), [self.product])
+
+    def test_search_view(self):
+        response = self.client.get(reverse('products:product_search'), {'q': 'lenovo'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'products/search.html')
+        self.assertEqual(list(response.context['products']), [self.new_product])
+
+    def test_search_view_without_query(self):
+        response = self.client.get(reverse('products:product_search'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['products']), [])
+
+    def test_admin_search_uses_index(self):
+        admin = get_user_model().objects.create_user(phone='09120000000', password='admin')
+        admin.is_staff = admin.is_superuser = True
+        admin.save()
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin:products_product_changelist'), {'q': 'lenovo'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['cl'].result_list), [self.new_product])
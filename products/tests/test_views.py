@@ -1,3 +1,5 @@
+from unittest import mock
+
 from django.forms import ValidationError
 from django.test import TestCase, Client
 from django.urls import reverse
@@ -7,6 +9,8 @@ from django.contrib.auth import get_user_model
 from accounts.models import CustomUser
 
 from ..forms import ReplyForm
+from ..listing import flush_product_views
+from ..views import ProductListView
 
 from ..models import (
                     Category, Color,
@@ -37,7 +41,17 @@ class ProductListViewTest(
         self.assertEqual(response.status_code, 200)
         self.assertIn('products', response.context)
         products = response.context['products']
-        self.assertEqual(products.count(), 1)
+        self.assertEqual(len(products), 1)
+        self.assertIn(self.new_product, products)
+
+    def test_view_includes_products_from_subcategories(self):
+        self.new_product.category.add(self.child_category, self.new_child_category)
+        url = reverse('products:product_list', kwargs={'cat_slug': self.category.slug})
+        response = self.client.get(url)
+
+        products = response.context['products']
+        self.assertEqual(len(products), 2)
+        self.assertIn(self.product, products)
         self.assertIn(self.new_product, products)
 
     def test_view_returns_correct_products_by_brand(self):
@@ -47,7 +61,7 @@ class ProductListViewTest(
         self.assertEqual(response.status_code, 200)
         self.assertIn('products', response.context)
         products = response.context['products']
-        self.assertEqual(products.count(), 1)
+        self.assertEqual(len(products), 1)
         self.assertIn(self.new_product, products)
 
     def test_view_uses_correct_template(self):
@@ -56,27 +70,116 @@ class ProductListViewTest(
 
         self.assertTemplateUsed(response, 'products/list.html')
 
+    def test_view_preloads_stylesheets(self):
+        url = reverse('products:product_list', kwargs={'cat_slug': self.new_category.slug})
+        response = self.client.get(url)
+
+        self.assertIn('</static/css/main.css>; rel=preload; as=style', response.headers['Link'])
+
     def test_view_handles_invalid_category(self):
         url = reverse('products:product_list', kwargs={'cat_slug': 'invalid-category'})
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, 404)
 
+    def test_view_paginates_with_cursor(self):
+        url = reverse('products:product_list', kwargs={'cat_slug': self.new_category.slug})
+        for index in range(3):
+            product = Product.objects.create(
+                name = f'Product {index}',
+                slug = f'product-{index}',
+                brand = self.brand,
+                description = 'description',
+            )
+            product.category.add(self.new_category)
+
+        with mock.patch.object(ProductListView, 'paginate_by', 2):
+            response = self.client.get(url)
+            page = response.context['page_obj']
+            self.assertEqual(len(response.context['products']), 2)
+            self.assertTrue(page.has_next())
+
+            response = self.client.get(url, {'cursor': page.next_cursor})
+            self.assertEqual(len(response.context['products']), 2)
+            self.assertFalse(response.context['page_obj'].has_next())
+
+    def test_view_rejects_invalid_cursor(self):
+        url = reverse('products:product_list', kwargs={'cat_slug': self.new_category.slug})
+        response = self.client.get(url, {'cursor': 'garbage'})
+
+        self.assertEqual(response.status_code, 404)
+
+
+class ProductListSortTest(
+                        ColorModelSetupMixin,
+                        ProductModelSetupMixin,
+                        TestCase
+                        ):
+    """
+    Tests for the sort orders of the product list.
+    """
+    def setUp(self):
+        super().setUp()
+        self.new_product.category.add(self.category)
+        Variant.objects.create(product=self.product, color=self.color, price=500, stock=1)
+        Variant.objects.create(product=self.new_product, color=self.color, price=100, stock=1)
+        self.url = reverse('products:product_list', kwargs={'cat_slug': self.category.slug})
+
+    def get_products(self, **params):
+        return list(self.client.get(self.url, params).context['products'])
+
+    def test_default_sort_is_newest(self):
+        self.assertEqual(self.get_products(), [self.new_product, self.product])
+        self.assertEqual(self.get_products(sort='bogus'), [self.new_product, self.product])
+
+    def test_sort_by_price(self):
+        self.assertEqual(self.get_products(sort='price_asc'), [self.new_product, self.product])
+        self.assertEqual(self.get_products(sort='price_desc'), [self.product, self.new_product])
+
+    def test_price_sort_skips_products_without_price(self):
+        self.new_product.variants.all().delete()
+        self.assertEqual(self.get_products(sort='price_asc'), [self.product])
+
+    def test_sort_by_views(self):
+        self.client.get(reverse('products:product_details', kwargs={'product_slug': self.product.slug}))
+        flush_product_views()
+        self.assertEqual(self.get_products(sort='most_viewed'), [self.product, self.new_product])
+
+    def test_inactive_products_are_hidden(self):
+        self.product.is_active = False
+        self.product.save()
+        self.assertEqual(self.get_products(), [self.new_product])
+        self.assertEqual(self.get_products(sort='price_desc'), [self.new_product])
+
+    def test_cursor_follows_sort(self):
+        with mock.patch.object(ProductListView, 'paginate_by', 1):
+            response = self.client.get(self.url, {'sort': 'price_desc'})
+            self.assertEqual(list(response.context['products']), [self.product])
+            cursor = response.context['page_obj'].next_cursor
+
+            response = self.client.get(self.url, {'sort': 'price_desc', 'cursor': cursor})
+            self.assertEqual(list(response.context['products']), [self.new_product])
+
+            response = self.client.get(self.url, {'sort': 'newest', 'cursor': cursor})
+            self.assertEqual(response.status_code, 404)
+
 
 class ProductDetailViewTest(
                             CommentModelSetupMixin,
                             TestCase
                             ):
     def test_view_returns_correct_product(self):
+        self.comment_1.status = Comment.PUBLISHED
+        self.comment_1.save()
         url = reverse('products:product_details', kwargs={'product_slug': self.product.slug})
 
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, 200)
         self.assertIn('product', response.context)
-        comments = response.context['comments']
-        self.assertEqual(comments.count(), 1)
-        self.assertIn(self.comment_2, comments)
+        comments = list(response.context['comment_thread'].page)
+        self.assertEqual(comments, [self.comment_1])
+        self.assertEqual(comments[0].thread_replies, [self.comment_2])
         self.assertIn('comment_form', response.context)
         self.assertIsInstance(response.context['comment_form'], ReplyForm)
 
@@ -1,16 +1,44 @@
+from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import async_views, views
 
 
 app_name = 'products'
 
 
-urlpatterns = [
-    path('', views.HomeView.as_view(), name='home'),
-    path('search/category/<slug:cat_slug>/', views.ProductListView.as_view(), name='product_list'),
-    path('search/category/<slug:cat_slug>/brand-<slug:brand_slug>/', views.ProductListView.as_view(), name='product_list_by_brand'),
-    path('<slug:product_slug>', views.ProductDetailView.as_view(), name='product_details'),
-    path('comment/<slug:product_slug>', views.CommentCreateView.as_view(), name='comment_create'),
-]
+def get_urlpatterns(async_names=()):
+    """
+    Return the product URLs, using the async view for every URL
+    whose name is in ``async_names``.
+    """
+    def view(name, sync_view, async_view):
+        return (async_view if name in async_names else sync_view).as_view()
 
+    return [
+        path('', view('home', views.HomeView, async_views.AsyncHomeView), name='home'),
+        path('search/', views.ProductSearchView.as_view(), name='product_search'),
+        path(
+            'search/category/<slug:cat_slug>/',
+            view('product_list', views.ProductListView, async_views.AsyncProductListView),
+            name='product_list',
+        ),
+        path(
+            'search/category/<slug:cat_slug>/brand-<slug:brand_slug>/',
+            view('product_list_by_brand', views.ProductListView, async_views.AsyncProductListView),
+            name='product_list_by_brand',
+        ),
+        path(
+            '<slug:product_slug>',
+            view('product_details', views.ProductDetailView, async_views.AsyncProductDetailView),
+            name='product_details',
+        ),
+        path(
+            'comment/<slug:product_slug>',
+            view('comment_create', views.CommentCreateView, async_views.AsyncCommentCreateView),
+            name='comment_create',
+        ),
+    ]
+
+
+urlpatterns = get_urlpatterns(settings.PRODUCT_ASYNC_VIEWS)
@@ -0,0 +1,130 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Category, Product
+
+# Bumped on any category change, since every page renders the category menu.
+CATALOG_VERSION_KEY = 'products:catalog:version'
+
+
+def category_version_key(category_id):
+    return f'products:category:{category_id}:version'
+
+
+def product_version_key(product_id):
+    return f'products:product:{product_id}:version'
+
+
+def initial_version():
+    """
+    Counters start from the current time in milliseconds, so after the
+    cache is flushed they never repeat a version handed out before.
+    """
+    return time.time_ns() // 1_000_000
+
+
+def get_versions(keys):
+    """
+    Return the current version of every key, starting missing counters.
+    """
+    stored = cache.get_many(keys)
+    missing = [key for key in keys if key not in stored]
+    version = initial_version()
+    if missing:
+        for key in missing:
+            cache.add(key, version, timeout=None)
+        stored.update(cache.get_many(missing))
+    return {key: stored.get(key, version) for key in keys}
+
+
+def get_version(key):
+    return get_versions([key])[key]
+
+
+async def aget_versions(keys):
+    """
+    Async version of ``get_versions()``.
+    """
+    stored = await cache.aget_many(keys)
+    missing = [key for key in keys if key not in stored]
+    version = initial_version()
+    if missing:
+        for key in missing:
+            await cache.aadd(key, version, timeout=None)
+        stored.update(await cache.aget_many(missing))
+    return {key: stored.get(key, version) for key in keys}
+
+
+async def aget_version(key):
+    return (await aget_versions([key]))[key]
+
+
+def bump_version(key):
+    """
+    Increment a version counter once the current transaction commits,
+    so every cache entry built from the old version stops being used.
+    Bumping any earlier would let a concurrent request cache the old,
+    still committed data under the new version.
+    """
+    transaction.on_commit(lambda: incr_version(key))
+
+
+def incr_version(key):
+    """
+    Atomically increment a version counter and return the new version.
+    """
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = initial_version()
+        if cache.add(key, version, timeout=None):
+            return version
+        return cache.incr(key)
+
+
+def bump_categories(category_ids):
+    """
+    Bump the version of the given categories and all of their ancestors,
+    since a parent category lists everything filed under its children.
+    """
+    category_ids = set(category_ids)
+    if not category_ids:
+        return
+    ancestors = Category.objects.filter(pk__in=category_ids).values_list('ancestor_ids', flat=True)
+    for ancestor_ids in ancestors:
+        category_ids.update(ancestor_ids)
+    for category_id in category_ids:
+        bump_version(category_version_key(category_id))
+
+
+def bump_product_categories(product_ids):
+    """
+    Bump the versions of every category the given products are filed under.
+    """
+    through = Product.category.through
+    category_ids = through.objects.filter(product_id__in=product_ids).values_list('category_id', flat=True)
+    bump_categories(category_ids)
+
+
+def get_product_versions(product_ids):
+    """
+    Return a ``{product_id: version}`` dict fetched in one cache round trip.
+    """
+    versions = get_versions([product_version_key(product_id) for product_id in product_ids])
+    return {product_id: versions[product_version_key(product_id)] for product_id in product_ids}
+
+
+async def aget_product_versions(product_ids):
+    versions = await aget_versions([product_version_key(product_id) for product_id in product_ids])
+    return {product_id: versions[product_version_key(product_id)] for product_id in product_ids}
+
+
+def bump_products(product_ids):
+    """
+    Bump the versions of the given products so their cached
+    card and detail fragments are rendered again.
+    """
+    for product_id in set(product_ids):
+        bump_version(product_version_key(product_id))
@@ -1,56 +1,229 @@
+from django.conf import settings
 from django.views.generic import ListView, DetailView, CreateView, TemplateView
 from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
 from django.contrib import messages
+from django.http import Http404
+
+from core.preload import PreloadLinksMixin
+from core.ratelimit import RateLimit, RateLimitMixin, user_or_ip
 
 from .models import Brand, Product, Category, Comment
+from .comments import CommentThread
+from .conditional import ConditionalGetMixin
+from .facets import ProductFacets
 from .forms import ReplyForm
+from .images import load_image_derivatives
+from .listing import record_product_view
+from .page_cache import AnonymousPageCacheMixin
+from .pagination import InvalidCursor, KeysetPaginator
+from .search import get_search_backend
+from .versioning import (
+                        CATALOG_VERSION_KEY,
+                        category_version_key,
+                        get_product_versions,
+                        get_version,
+                        get_versions,
+                        product_version_key
+                        )
 
 
 
-class HomeView(TemplateView):
+class HomeView(AnonymousPageCacheMixin, TemplateView):
     template_name = 'products/home.html'
 
 
-class ProductListView(ListView):
+class ProductListView(PreloadLinksMixin, AnonymousPageCacheMixin, ConditionalGetMixin, ListView):
     model = Product
     template_name = 'products/list.html'
     context_object_name = 'products'
+    paginate_by = 24
+    default_sort = 'newest'
+    page_cache_params = ('cursor', 'sort')
+    # Listing sorts also filter on the mirrored listing__is_active
+    # so the composite (is_active, key, product) indexes can be used.
+    sort_options = {
+        'newest': {
+            'label': 'Newest',
+            'ordering': ('-created_at', '-id'),
+            'filters': {},
+        },
+        'price_asc': {
+            'label': 'Price: low to high',
+            'ordering': ('listing__min_price', 'listing__product_id'),
+            'filters': {'listing__is_active': True, 'listing__min_price__isnull': False},
+        },
+        'price_desc': {
+            'label': 'Price: high to low',
+            'ordering': ('-listing__min_price', '-listing__product_id'),
+            'filters': {'listing__is_active': True, 'listing__min_price__isnull': False},
+        },
+        'most_viewed': {
+            'label': 'Most viewed',
+            'ordering': ('-listing__view_count', '-listing__product_id'),
+            'filters': {'listing__is_active': True},
+        },
+    }
+
+    category = None
+
+    def get_category(self):
+        if self.category is None:
+            self.category = get_object_or_404(Category, slug=self.kwargs['cat_slug'])
+        return self.category
+
+    def get_validators(self):
+        keys = self.get_page_cache_version_keys()
+        versions = get_versions(keys)
+        return ':'.join(str(versions[key]) for key in keys), None
+
+    def get_sort(self):
+        sort = self.request.GET.get('sort')
+        return sort if sort in self.sort_options else self.default_sort
+
+    def get_ordering(self):
+        return self.sort_options[self.get_sort()]['ordering']
 
     def get_queryset(self):
-        category_slug = self.kwargs.get('cat_slug')
+        category = self.get_category() if self.kwargs.get('cat_slug') else None
         brand_slug = self.kwargs.get('brand_slug')
-        products = Product.objects.all()
+        brand = get_object_or_404(Brand, slug=brand_slug) if brand_slug else None
+        version = get_version(category_version_key(category.pk)) if category else None
+        return self.filter_products(category, brand, version)
+
+    def filter_products(self, category, brand, category_version):
+        products = Product.objects.filter(is_active=True).select_related('listing')
 
-        if category_slug:
-            category = get_object_or_404(Category, slug=category_slug)
-            products = products.filter(category=category)
+        if category:
+            products = products.in_category_subtree(category)
 
-        if brand_slug :
-            brand = get_object_or_404(Brand, slug=brand_slug)
+        if brand:
             products = products.filter(brand=brand)
-        return products
 
-class ProductDetailView(DetailView):
+        self.facets = ProductFacets(products, self.request.GET, cache_key=self.get_facets_cache_key(category_version))
+        return self.facets.apply().filter(**self.sort_options[self.get_sort()]['filters'])
+
+    def get_facets_cache_key(self, category_version):
+        if self.category is None:
+            return None
+        brand_slug = self.kwargs.get('brand_slug', '')
+        return f'products:facets:{self.category.pk}:{brand_slug}:{category_version}'
+
+    def get_page_cache_version_keys(self):
+        return [CATALOG_VERSION_KEY, category_version_key(self.get_category().pk)]
+
+    def is_page_cache_param(self, name):
+        return super().is_page_cache_param(name) or ProductFacets.is_param(name)
+
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Paginate with opaque keyset cursors instead of page numbers,
+        so deep pages never turn into OFFSET scans.
+        """
+        paginator = KeysetPaginator(queryset, self.get_ordering(), page_size)
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidCursor:
+            raise Http404('Invalid page cursor.')
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['category'] = self.category
+        context['breadcrumbs'] = self.category.breadcrumbs() if self.category else []
+        context['facets'] = self.facets.counts()
+        context.update(self.get_sort_context())
+        versions = get_product_versions([product.pk for product in context['products']])
+        for product in context['products']:
+            product.cache_version = versions[product.pk]
+        load_image_derivatives([product.cover_image for product in context['products']])
+        return context
+
+    def get_sort_context(self):
+        return {
+            'current_sort': self.get_sort(),
+            'sort_options': [(key, option['label']) for key, option in self.sort_options.items()],
+            'fragment_cache_timeout': settings.PRODUCT_FRAGMENT_CACHE_TIMEOUT,
+        }
+
+class ProductSearchView(PreloadLinksMixin, ListView):
+    model = Product
+    template_name = 'products/search.html'
+    context_object_name = 'products'
+    paginate_by = 24
+
+    def get_queryset(self):
+        self.query = self.request.GET.get('q', '').strip()
+        if not self.query:
+            return Product.objects.none()
+        products = Product.objects.filter(is_active=True)
+        return get_search_backend().search(products, self.query)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.query
+        load_image_derivatives([product.cover_image for product in context['products']])
+        return context
+
+
+class ProductDetailView(PreloadLinksMixin, AnonymousPageCacheMixin, ConditionalGetMixin, DetailView):
     model = Product
     template_name = 'products/detail.html'
     context_object_name = 'product'
     slug_url_kwarg = 'product_slug'
+    page_cache_params = ('comments',)
 
-    def get_queryset(self):
-        return super().get_queryset().prefetch_related('variants__color', 'attribute_values__attribute')
+    def get(self, request, *args, **kwargs):
+        response = super().get(request, *args, **kwargs)
+        record_product_view(self.object.pk)
+        return response
+
+    def get_page_cache_version_keys(self):
+        return [CATALOG_VERSION_KEY, product_version_key(self.object.pk)]
+
+    def get_validators(self):
+        product = self.get_validators_queryset().first()
+        if product is None:
+            return None, None
+        versions = get_versions([CATALOG_VERSION_KEY, product_version_key(product['pk'])])
+        return self.build_validators(product, versions)
+
+    def get_validators_queryset(self):
+        return Product.objects.filter(slug=self.kwargs['product_slug']).values('pk')
+
+    def build_validators(self, product, versions):
+        # No Last-Modified: deletions, status changes and attribute edits
+        # leave no newer timestamp behind, but they all bump a version.
+        return ':'.join(str(version) for version in versions.values()), None
+
+    def get_page_cache_meta(self):
+        return {'product_id': self.object.pk}
+
+    def page_cache_hit(self, meta):
+        record_product_view(meta['product_id'])
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['comment_form'] = ReplyForm()
-        context['comments'] = Comment.published_comments_manager.filter(product=self.object).select_related('user')
+        try:
+            context['comment_thread'] = CommentThread(self.object, self.request.GET.get('comments'))
+        except InvalidCursor:
+            raise Http404('Invalid comments cursor.')
+        # Left lazy so they are only queried when the cached fragments miss.
+        context['variants'] = self.object.variants.select_related('color')
+        context['attribute_values'] = self.object.attribute_values.select_related('attribute')
+        context['cache_version'] = get_version(product_version_key(self.object.pk))
+        context['fragment_cache_timeout'] = settings.PRODUCT_FRAGMENT_CACHE_TIMEOUT
         return context
 
 
-class CommentCreateView(CreateView):
+class CommentCreateView(RateLimitMixin, CreateView):
     model = Comment
     form_class = ReplyForm
 
+    def get_rate_limits(self):
+        return [RateLimit('comment', *settings.PRODUCT_COMMENT_POST_RATE, key=user_or_ip)]
+
     def form_valid(self, form):
         obj = form.save(commit=False)
         obj.user = self.request.user
@@ -778,6 +778,26 @@
 	});
 
 
+	/**********************
+	*CSRF token of cached pages
+	***********************/
+
+	// Pages from the shared cache can't carry the visitor's token,
+	// so their forms fetch it when they are submitted.
+	$(document).on('submit', 'form[data-csrf-url]', function(event){
+		var form = this,
+			$token = $(form).find('input[name="csrfmiddlewaretoken"]');
+		if ( $token.val() ) {
+			return;
+		}
+		event.preventDefault();
+		$.getJSON($(form).data('csrf-url'), function(data){
+			$token.val(data.token);
+			form.submit();
+		});
+	});
+
+
 
 
 })(jQuery);